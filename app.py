@@ -8,11 +8,27 @@ import csv
 import io
 import tempfile
 from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
 import openpyxl
-from models import db, User, Department, Course, Classroom, Schedule, UnavailableTime, course_department, student_course
-from sqlalchemy import inspect, text
+from models import db, User, Department, Course, Classroom, Schedule, UnavailableTime, ScheduleJob, ScheduleVersion, CourseWaitlist, course_department, student_course, time_fields, time_range_valid, create_indexes, DAYS
+from sqlalchemy import inspect, text, insert, update, delete, func
+from sqlalchemy.orm import selectinload, joinedload
+from timetable import (load_schedule_items, cohort_index, department_timetable, GRADES, GRID_HOURS, grade_of, cached_timetable,
+                       course_grid, instructor_week, cached_instructor_occupancy,
+                       free_instructors, bump_schedule_version, active_version_id, version_filter,
+                       live_schedule, publish_version, schedule_diff, lock_schedule_state)
+from identity import load_cached_user, invalidate_user
+from enrollment import (StudentTimetable, course_blocks, check_courses, MAX_CHECK_COURSES, enroll, drop,
+                        leave_waitlist, waitlist_position, student_waitlist, promote_waitlist, sync_enrolled_counts,
+                        ENROLLED, WAITLISTED, ALREADY_WAITLISTED)
+from excel_import import (read_rows, import_course_rows, parse_class_list, import_class_list,
+                          collect_class_list_files, parse_class_list_files, import_class_lists)
+from scheduler import (ScheduleModel, SOLVERS, load_snapshot, cohort_phases, repair_placements, course_sessions,
+                       improve_schedule, CourseInfo, RoomInfo, UnavailableInfo)
 import random
+import threading
 from dotenv import load_dotenv
 load_dotenv()
 DB_USER = os.getenv("DB_USER")
@@ -40,6 +56,7 @@ app = Flask(__name__, template_folder=TEMPLATE_DIR)
 app.config['SECRET_KEY'] = 'gizli-anahtar-buraya'  # Güvenlik için session anahtarı
 app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024  # İstek başına en fazla yükleme boyutu (64 MB)
 
 # Veritabanı ve giriş yöneticisini başlat
 db.init_app(app)
@@ -54,7 +71,8 @@ def load_user(user_id):
     :param user_id: Kullanıcı kimlik numarası
     :return: Kullanıcı nesnesi veya None
     """
-    return User.query.get(int(user_id))
+    # Kullanıcı bilgileri kısa süreli önbellekten gelir (bkz. identity.py)
+    return load_cached_user(int(user_id))
 
 # Admin yetkisi gerektiren sayfalar için dekoratör
 def admin_required(f):
@@ -72,6 +90,13 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# MAX_CONTENT_LENGTH'i aşan yüklemeler
+@app.errorhandler(413)
+def upload_too_large(e):
+    """Çok büyük dosya yüklemelerinde hata sayfası yerine formu mesajla yeniden gösterir"""
+    flash(f"Yüklenen dosyalar çok büyük (en fazla {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)} MB).", 'error')
+    return redirect(request.url)
+
 # Ana sayfa - Ders programına yönlendirir
 @app.route('/')
 def index():
@@ -140,6 +165,7 @@ def departments():
         # Yeni bölüm oluştur ve kaydet
         department = Department(code=code, name=name)
         db.session.add(department)
+        bump_schedule_version()
         db.session.commit()
         
         flash('Bölüm başarıyla eklendi!', 'success')
@@ -203,6 +229,7 @@ def courses():
                 course.departments.append(department)
         
         db.session.add(course)
+        bump_schedule_version()
         db.session.commit()
         
         flash('Ders başarıyla eklendi!', 'success')
@@ -236,6 +263,7 @@ def classrooms():
         # Yeni derslik oluştur ve kaydet
         classroom = Classroom(code=code, capacity=capacity)
         db.session.add(classroom)
+        bump_schedule_version()
         db.session.commit()
         
         flash('Derslik başarıyla eklendi!', 'success')
@@ -297,6 +325,8 @@ def users():
             user.current_semester = int(current_semester)
             user.student_number = extra_info
         db.session.add(user)
+        if role == 'instructor':
+            bump_schedule_version()
         db.session.commit()
         
         flash('Kullanıcı başarıyla eklendi!', 'success')
@@ -325,6 +355,8 @@ def edit_user(user_id):
                 user.student_number = extra_info
             if request.form.get('password'):
                 user.set_password(request.form.get('password'))
+            bump_schedule_version()
+            invalidate_user(user.id)
             db.session.commit()
             flash('Kullanıcı başarıyla güncellendi!', 'success')
             return redirect(url_for('users'))
@@ -357,8 +389,20 @@ def delete_user(user_id):
                 flash('Son admin kullanıcıyı silemezsiniz!', 'error')
                 return redirect(url_for('users'))
         
+        # Kullanıcının bekleme listesi kayıtlarını ve ders kayıtlarını temizle
+        course_ids = [course.id for course in user.selected_courses]
+        CourseWaitlist.query.filter_by(student_id=user.id).delete()
+        
         # Kullanıcıyı sil
         db.session.delete(user)
+        db.session.flush()
+        
+        # Boşalan koltukları sayaçlara yansıt ve bekleme listesinden doldur
+        sync_enrolled_counts(course_ids)
+        for course_id in course_ids:
+            promote_waitlist(course_id)
+        bump_schedule_version()
+        invalidate_user(user_id)
         db.session.commit()
         flash('Kullanıcı başarıyla silindi!', 'success')
     except Exception as e:
@@ -378,69 +422,48 @@ def view_schedule():
     Ders programını görüntüleme sayfası
     Tüm dersleri, derslikleri ve ders programını gösterir
     """
-    # Haftanın günleri
-    days = ['Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma']
+    # Sayfa verisi program sürümüne göre önbellekten gelir; yalnızca sürüm değiştiğinde yeniden oluşturulur
+    page = cached_timetable('view_schedule', build_view_schedule_page)
+    
+    # Devam eden program oluşturma işi (sadece admin için ilerleme gösterilir)
+    schedule_job = active_schedule_job() if current_user.role == 'admin' else None
     
+    # Şablonu render et
+    return render_template('view_schedule.html',
+                         schedule_job=schedule_job,
+                         grades=GRADES,
+                         days=DAYS,
+                         **page)
+
+def build_view_schedule_page():
+    """
+    Ders programı sayfasının veritabanına bağlı tüm verisini düz sözlükler olarak oluşturur
+    (ilişkiler önceden yüklenir, sorgu sayısı sabittir; sonuç önbelleğe alınabilir)
+    """
     # Veritabanından gerekli verileri çek
-    schedule_items = Schedule.query.all()
+    schedule_items = load_schedule_items()
     courses = Course.query.order_by(Course.code).all()  # Dersleri kod sırasına göre sırala
     classrooms = Classroom.query.order_by(Classroom.code).all()  # Derslikleri kod sırasına göre sırala
     
-    # Bölümleri bul
-    blm_dept = Department.query.filter_by(code='BLM').first()
-    yzm_dept = Department.query.filter_by(code='YZM').first()
-    
-    # Bölümlere göre dersleri ayır (bir ders birden fazla bölüme ait olabilir)
-    blm_courses = []
-    yzm_courses = []
-    
-    for course in courses:
-        # Her dersin bölümlerini kontrol et
-        dept_ids = [d.id for d in course.departments]
-        
-        if blm_dept and blm_dept.id in dept_ids:
-            blm_courses.append(course)
-        
-        if yzm_dept and yzm_dept.id in dept_ids:
-            yzm_courses.append(course)
-    
-    # Bölümlere göre programları ayır
-    blm_schedule_items = []
-    yzm_schedule_items = []
+    # Ders -> (bölüm, yarıyıl) ilişki dizini; bölüm sayısından bağımsız olarak tek sorgu
+    index = cohort_index()
     
-    for item in schedule_items:
-        course = Course.query.get(item.course_id)
-        if course:
-            # Dersin bölümlerini kontrol et
-            dept_ids = [d.id for d in course.departments]
-            
-            if blm_dept and blm_dept.id in dept_ids:
-                blm_schedule_items.append(item)
-            
-            if yzm_dept and yzm_dept.id in dept_ids:
-                yzm_schedule_items.append(item)
+    # Program öğelerini bölüm -> gün -> sınıf olarak grupla; şablon yalnızca dolaşır
+    timetable = department_timetable(schedule_items, index, DAYS)
     
     # Debug için konsola bilgi yazdır
     print("\n=== Debug Bilgileri ===")
     print(f"Toplam ders sayısı: {len(courses)}")
-    print(f"BLM ders sayısı: {len(blm_courses)}")
-    print(f"YZM ders sayısı: {len(yzm_courses)}")
+    print(f"Bölüm sayısı: {len(index['departments'])}")
     print(f"Toplam derslik sayısı: {len(classrooms)}")
-    print(f"BLM program öğesi sayısı: {len(blm_schedule_items)}")
-    print(f"YZM program öğesi sayısı: {len(yzm_schedule_items)}")
-    
-    # Şablonu render et
-    return render_template('view_schedule.html',
-                         blm_schedule_items=blm_schedule_items,
-                         yzm_schedule_items=yzm_schedule_items,
-                         schedule_items=schedule_items,
-                         courses=courses,
-                         blm_courses=blm_courses,
-                         yzm_courses=yzm_courses,
-                         classrooms=classrooms,
-                         days=days,
-                         blm_dept=blm_dept,
-                         yzm_dept=yzm_dept)
+    print(f"Toplam program öğesi sayısı: {len(schedule_items)}")
+    
+    return {
+        'timetable': timetable,
+        'courses': [{'id': c.id, 'code': c.code, 'name': c.name} for c in courses],
+        'classrooms': [{'id': c.id, 'code': c.code, 'capacity': c.capacity} for c in classrooms],
+        'departments': index['departments']
+    }
 
 # Program ekle endpoint'i
 @app.route('/schedule/add', methods=['GET', 'POST'])
@@ -475,6 +498,12 @@ def add_schedule():
         course = Course.query.get(course_id)
         classroom = Classroom.query.get(classroom_id)
         
+        # Çakışma sorguları tamsayı sütunlar (gün sırası, dakika) üzerinden yapılır
+        times = time_fields(day, start_time, end_time)
+        if not time_range_valid(times):
+            flash('Geçersiz gün veya saat aralığı!', 'error')
+            return redirect(url_for('view_schedule'))
+        
         # Derslik kapasitesi kontrolü
         if course.capacity > classroom.capacity:
             flash(f'Derslik kapasitesi ({classroom.capacity}) dersin kontenjanından ({course.capacity}) küçük. Bu derslik bu ders için uygun değil.', 'error')
@@ -488,10 +517,9 @@ def add_schedule():
             # Öğretim üyesinin bu gün ve saatte müsait olmama durumu var mı kontrol et
             unavailable_times = UnavailableTime.query.filter(
                 UnavailableTime.instructor_id == course.instructor_id,
-                UnavailableTime.day == day,
-                ((UnavailableTime.start_time <= start_time) & (UnavailableTime.end_time > start_time)) | 
-                ((UnavailableTime.start_time < end_time) & (UnavailableTime.end_time >= end_time)) |
-                ((UnavailableTime.start_time >= start_time) & (UnavailableTime.end_time <= end_time))
+                UnavailableTime.day_index == times['day_index'],
+                UnavailableTime.start_minute < times['end_minute'],
+                UnavailableTime.end_minute > times['start_minute']
             ).all()
             
             if unavailable_times:
@@ -500,9 +528,10 @@ def add_schedule():
             
             # Öğretim üyesinin bu zaman diliminde başka dersi var mı kontrol et
             instructor_conflicts = Schedule.query.join(Course).filter(
-                Schedule.day == day,
-                Schedule.start_time < end_time,
-                Schedule.end_time > start_time,
+                live_schedule(),
+                Schedule.day_index == times['day_index'],
+                Schedule.start_minute < times['end_minute'],
+                Schedule.end_minute > times['start_minute'],
                 Course.instructor_id == course.instructor_id
             ).all()
             
@@ -520,10 +549,11 @@ def add_schedule():
 
         # Seçilen derslik ve zamanda başka ders var mı kontrol et
         classroom_conflicts = Schedule.query.filter(
-            Schedule.day == day,
-            Schedule.start_time < end_time,
-            Schedule.end_time > start_time,
-            Schedule.classroom_id == classroom_id
+            live_schedule(),
+            Schedule.classroom_id == classroom_id,
+            Schedule.day_index == times['day_index'],
+            Schedule.start_minute < times['end_minute'],
+            Schedule.end_minute > times['start_minute']
         ).all()
         
         if classroom_conflicts:
@@ -538,8 +568,9 @@ def add_schedule():
             flash(f'Derslik {conflict_classroom.code} bu saatte dolu: {conflict_message}', 'error')
             return redirect(url_for('view_schedule'))
         
-        # Yeni program öğesi oluştur ve kaydet
+        # Yeni program öğesi oluştur ve yayındaki sürüme kaydet
         schedule_item = Schedule(
+            version_id=active_version_id(),
             course_id=course_id,
             classroom_id=classroom_id,
             day=day,
@@ -548,6 +579,7 @@ def add_schedule():
         )
         
         db.session.add(schedule_item)
+        bump_schedule_version()
         db.session.commit()
         
         flash('Ders programı başarıyla güncellendi!', 'success')
@@ -570,9 +602,10 @@ def delete_schedule(schedule_id):
     :param schedule_id: Silinecek program öğesinin ID'si
     """
     try:
-        # Program öğesini bul ve sil
-        schedule_item = Schedule.query.get_or_404(schedule_id)
+        # Program öğesini yayındaki sürümde bul ve sil
+        schedule_item = Schedule.query.filter(Schedule.id == schedule_id, live_schedule()).first_or_404()
         db.session.delete(schedule_item)
+        bump_schedule_version()
         db.session.commit()
         flash('Program öğesi başarıyla silindi!', 'success')
     except Exception as e:
@@ -605,6 +638,7 @@ def delete_department(department_id):
         # Bölümü bul ve sil
         department = Department.query.get_or_404(department_id)
         db.session.delete(department)
+        bump_schedule_version()
         db.session.commit()
         flash('Bölüm başarıyla silindi!', 'success')
     except Exception as e:
@@ -625,19 +659,24 @@ def delete_course(course_id):
     :param course_id: Silinecek dersin ID'si
     """
     try:
-        # Dersin kullanıldığı program öğeleri var mı kontrol et
-        schedule_count = Schedule.query.filter_by(course_id=course_id).count()
+        # Dersin yayındaki programda kullanıldığı öğeler var mı kontrol et
+        schedule_count = Schedule.query.filter(Schedule.course_id == course_id, live_schedule()).count()
         
         # İlişkili kayıtlar varsa silme
         if schedule_count > 0:
             flash(f'Bu ders silinemez: {schedule_count} program öğesi bu derse bağlı!', 'error')
             return redirect(url_for('courses'))
             
-        # Dersi bul ve sil
+        # Dersi bul ve sil (bekleme listesi kayıtları ve taslak/eski sürümlerdeki öğeleriyle birlikte)
         course = Course.query.get_or_404(course_id)
+        CourseWaitlist.query.filter_by(course_id=course.id).delete()
+        draft_items = Schedule.query.filter_by(course_id=course.id).delete()
         db.session.delete(course)
+        bump_schedule_version()
         db.session.commit()
         flash('Ders başarıyla silindi!', 'success')
+        if draft_items:
+            flash(f'Dersin taslak/eski program sürümlerindeki {draft_items} öğesi de silindi.', 'info')
     except Exception as e:
         # Hata durumunda logla ve kullanıcıya bildir
         flash('Ders silinirken bir hata oluştu!', 'error')
@@ -696,12 +735,36 @@ def edit_course(course_id):
                 department = Department.query.get(dept_id)
                 if department:
                     course.departments.append(department)
-            
+            db.session.flush()
+            
+            # Formdan gelen metin değerleri (teori, uygulama, kontenjan...) veritabanı türleriyle
+            # yeniden yüklenir; onarım aşağıda dersi bu değerlerle modele çevirir
+            db.session.refresh(course)
+            
+            # Kontenjan artırıldıysa boşalan koltukları bekleme listesinden doldur. Kontenjan
+            # mevcut kayıt sayısının altına düşürüldüyse kayıtlı öğrenciler dersten çıkarılmaz;
+            # kayıt sayısı yeni kontenjanın altına inene kadar yeni kayıt ve terfi yapılmaz.
+            promoted = promote_waitlist(course_id)
+            db.session.refresh(course, ['capacity', 'enrolled_count'])
+            over_capacity = course.capacity is not None and course.enrolled_count > course.capacity
+            
+            # Değişikliğin geçersiz kıldığı program öğelerini aynı işlemde onar; onarım
+            # başarısız olursa ders değişikliği de geri alınır
+            message = repair_message(*repair_schedule(changed_course_ids=[course_id]))
+            bump_schedule_version()
             db.session.commit()
             flash('Ders başarıyla güncellendi!', 'success')
+            if promoted:
+                flash(f'Bekleme listesindeki {len(promoted)} öğrenci derse kaydedildi.', 'info')
+            if over_capacity:
+                flash('Kayıtlı öğrenci sayısı yeni kontenjanı aşıyor. Mevcut kayıtlar korundu; '
+                      'kayıt sayısı kontenjanın altına inene kadar yeni kayıt alınmayacak.', 'warning')
+            if message:
+                flash(message, 'info')
             return redirect(url_for('courses'))
         except Exception as e:
-            # Hata durumunda logla ve kullanıcıya bildir
+            # Hata durumunda değişiklikleri geri al, logla ve kullanıcıya bildir
+            db.session.rollback()
             flash('Ders güncellenirken bir hata oluştu!', 'error')
             print(f"\n=== Hata ===")
             print(f"Hata mesajı: {str(e)}")
@@ -726,21 +789,38 @@ def delete_classroom(classroom_id):
     :param classroom_id: Silinecek dersliğin ID'si
     """
     try:
-        # Dersliğin kullanıldığı program öğeleri var mı kontrol et
-        schedule_count = Schedule.query.filter_by(classroom_id=classroom_id).count()
-        
-        # İlişkili kayıtlar varsa silme
-        if schedule_count > 0:
-            flash(f'Bu derslik silinemez: {schedule_count} program öğesi bu dersliğe bağlı!', 'error')
-            return redirect(url_for('classrooms'))
-            
-        # Dersliği bul ve sil
         classroom = Classroom.query.get_or_404(classroom_id)
+        
+        # Dersliğe bağlı program öğeleri varsa önce bu dersler başka yerlere taşınır;
+        # yerleştirilemeyen derslerin öğeleri programdan çıkarılır
+        message = None
+        if Schedule.query.filter(Schedule.classroom_id == classroom_id, live_schedule()).count() > 0:
+            message = repair_message(*repair_schedule(removed_classroom_id=classroom_id))
+        
+        # Taslak ve eski sürümler de aynı şekilde onarılır; yerleştirilemeyen dersler sürümün
+        # yerleştirilemeyen dersler listesine eklenir (yayınlamadan önce görünür)
+        current_id = active_version_id()
+        other_versions = ScheduleVersion.query.join(Schedule, Schedule.version_id == ScheduleVersion.id).filter(
+            Schedule.classroom_id == classroom_id
+        ).distinct().all()
+        for version in other_versions:
+            if version.id == current_id:
+                continue
+            _, unplaced = repair_schedule(removed_classroom_id=classroom_id, version_id=version.id)
+            if unplaced:
+                version.unplaced = ','.join(dict.fromkeys(version.unplaced_codes + [c.code for c in unplaced]))
+        
+        # Dersliği sil (onarım ile aynı işlemde); onarımda taşınamayan elle eklenmiş öğeler de silinir
+        Schedule.query.filter_by(classroom_id=classroom_id).delete()
         db.session.delete(classroom)
+        bump_schedule_version()
         db.session.commit()
         flash('Derslik başarıyla silindi!', 'success')
+        if message:
+            flash(message, 'info')
     except Exception as e:
         # Hata durumunda logla ve kullanıcıya bildir
+        db.session.rollback()
         flash('Derslik silinirken bir hata oluştu!', 'error')
         print(f"\n=== Hata ===")
         print(f"Hata mesajı: {str(e)}")
@@ -769,6 +849,7 @@ def edit_classroom(classroom_id):
             # Dersliği güncelle
             classroom.capacity = capacity
             
+            bump_schedule_version()
             db.session.commit()
             flash('Derslik başarıyla güncellendi!', 'success')
             return redirect(url_for('classrooms'))
@@ -781,150 +862,139 @@ def edit_classroom(classroom_id):
     
     return render_template('edit_classroom.html', classroom=classroom)
 
+# Dışa aktarılan Excel dosyalarının ortak MIME türü
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def schedule_export_styles():
+    """
+    Ders programı çalışma kitabında kullanılan adlandırılmış stilleri oluşturur
+    Stiller çalışma kitabına bir kez eklenir ve hücreler adlarıyla paylaşır.
+    """
+    # İnce kenarlık stili
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    
+    header = NamedStyle(name='program_baslik')
+    header.font = Font(bold=True, color="FFFFFF")
+    header.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header.alignment = Alignment(horizontal='center', vertical='center')
+    header.border = thin_border
+    
+    day = NamedStyle(name='program_gun')
+    day.font = Font(bold=True)
+    day.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
+    day.alignment = Alignment(horizontal='center', vertical='center')
+    day.border = thin_border
+    
+    cell = NamedStyle(name='program_hucre')
+    cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    cell.border = thin_border
+    
+    return header, day, cell
+
+
+def styled_cell(ws, value, style):
+    """Yalnızca yazma (write_only) kipindeki sayfa için adlandırılmış stilli hücre oluşturur"""
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def schedule_export_text(item, dept_codes):
+    """
+    Bir program öğesinin Excel hücresinde gösterilecek metnini oluşturur
+    :param dept_codes: Dersin ait olduğu bölümlerin kodları (cohort_index dizininden)
+    """
+    course = item.course
+    
+    course_info = (
+        f"{course.code} - {course.name} ({', '.join(dept_codes)}, {course.semester}. Yarıyıl)\n"
+        f"Derslik: {item.classroom.code if item.classroom else 'Belirtilmemiş'}\n"
+        f"Saat: {item.start_time}-{item.end_time}"
+    )
+    
+    if course.instructor:
+        course_info += f"\nÖğr. Üyesi: {course.instructor.name}"
+    
+    return course_info
+
+
+def build_schedule_workbook(output):
+    """
+    Ders programını yalnızca yazma (write_only) kipinde Excel olarak output'a yazar
+    Her bölüm ayrı bir sayfadır. Program öğeleri tek seferde (ilişkileriyle birlikte)
+    yüklenir ve ders -> bölüm ilişki dizini (cohort_index) üzerinden bölümlere dağıtılır;
+    sorgu sayısı bölüm sayısından bağımsızdır.
+    :param output: Çalışma kitabının yazılacağı dosya benzeri nesne
+    """
+    index = cohort_index()
+    
+    # Program öğelerini bölüm, gün ve sınıfa göre grupla (öğeler gün ve saate göre sıralı gelir)
+    cells = {dept['code']: {day: {grade: [] for grade in GRADES} for day in DAYS}
+             for dept in index['departments']}
+    for item in load_schedule_items():
+        cohorts = index['courses'].get(item.course_id)
+        if not cohorts or item.day not in DAYS:
+            continue
+        text = schedule_export_text(item, [code for code, _ in cohorts])
+        for code, semester in cohorts:
+            cells[code][item.day][grade_of(semester)].append(text)
+    
+    # Excel çalışma kitabı oluştur
+    wb = Workbook(write_only=True)
+    header_style, day_style, cell_style = schedule_export_styles()
+    for style in (header_style, day_style, cell_style):
+        wb.add_named_style(style)
+    
+    # Bölüme atanmış ders yoksa boş bir program sayfası yazılır
+    sheets = [(dept['code'], cells[dept['code']]) for dept in index['departments']]
+    for title, dept_cells in sheets or [("Ders Programı", None)]:
+        ws = wb.create_sheet(title[:31])  # Excel sayfa adı en fazla 31 karakter olabilir
+        
+        # Sütun genişliklerini ayarla (satırlar yazılmadan önce yapılmalı)
+        ws.column_dimensions['A'].width = 15  # Günler için
+        for grade in GRADES:  # 1-4 sınıflar için
+            ws.column_dimensions[get_column_letter(grade + 1)].width = 30
+        
+        # Başlık satırı - Sınıf seviyeleri (1. Sınıf, 2. Sınıf, vb.)
+        ws.append([styled_cell(ws, "Gün/Sınıf", header_style.name)] +
+                  [styled_cell(ws, f"{grade}. Sınıf", header_style.name) for grade in GRADES])
+        
+        # Gün satırları
+        for row, day in enumerate(DAYS, start=2):
+            # Satır yüksekliğini ayarla
+            ws.row_dimensions[row].height = 150
+            texts = [dept_cells[day][grade] if dept_cells else [] for grade in GRADES]
+            ws.append([styled_cell(ws, day, day_style.name)] +
+                      [styled_cell(ws, "\n\n".join(text), cell_style.name) for text in texts])
+    
+    wb.save(output)
+
+
 # Ders programını Excel'e aktarma endpoint'i
 @app.route('/export_schedule', methods=['GET'])
 @admin_required  # Sadece adminler programı dışa aktarabilir
 def export_schedule():
     """
     Mevcut ders programını Excel formatında dışa aktarır
+    Dosya diske yazılmadan bellekteki tampondan gönderilir.
     """
     try:
-        # Excel çalışma kitabı oluştur
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Ders Programı"
-        
-        # Sütun genişliklerini ayarla
-        ws.column_dimensions['A'].width = 15  # Günler için
-        for col in range(2, 6):  # 1-4 sınıflar için
-            ws.column_dimensions[chr(64 + col)].width = 30
-            
-        # Haftanın günleri
-        days = ['Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma']
-        
-        # Stil tanımları
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_alignment = Alignment(horizontal='center', vertical='center')
-        
-        day_font = Font(bold=True)
-        day_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        day_alignment = Alignment(horizontal='center', vertical='center')
-        
-        cell_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        
-        # İnce kenarlık stili
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+        output = io.BytesIO()
+        build_schedule_workbook(output)
+        output.seek(0)
         
-        # Başlık satırını hazırla - Sınıf seviyelerini ekle
-        ws.cell(row=1, column=1, value="Gün/Sınıf").font = header_font
-        ws.cell(row=1, column=1).fill = header_fill
-        ws.cell(row=1, column=1).alignment = header_alignment
-        ws.cell(row=1, column=1).border = thin_border
-        
-        # Sınıf seviyelerini başlıklara ekle (1. Sınıf, 2. Sınıf, vb.)
-        for grade in range(1, 5):  # 1-4. sınıflar
-            cell = ws.cell(row=1, column=grade+1, value=f"{grade}. Sınıf")
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-            
-        # Gün satırlarını ekle
-        for row, day in enumerate(days, start=2):
-            # Gün adını ekle
-            cell = ws.cell(row=row, column=1, value=day)
-            cell.font = day_font
-            cell.fill = day_fill
-            cell.alignment = day_alignment
-            cell.border = thin_border
-            
-            # Her sınıf seviyesi için bu günde olan programları bul
-            for grade in range(1, 5):  # 1-4. sınıflar
-                cell = ws.cell(row=row, column=grade+1, value="")
-                cell.border = thin_border
-                cell.alignment = cell_alignment
-                
-                # Bu sınıfın yarıyıllarını belirle (her sınıf 2 yarıyıl içerir)
-                first_semester = (grade - 1) * 2 + 1
-                second_semester = first_semester + 1
-                semesters = [first_semester, second_semester]
-                
-                # Bu gün ve sınıf seviyesinde olan dersleri bul
-                # BLM ve YZM bölümlerini birlikte göster
-                blm_dept = Department.query.filter_by(code='BLM').first()
-                yzm_dept = Department.query.filter_by(code='YZM').first()
-                
-                if blm_dept and yzm_dept:
-                    # Bu sınıfın yarıyıllarındaki dersleri bul
-                    blm_courses = Course.query.filter(
-                        Course.semester.in_(semesters),
-                        Course.departments.any(id=blm_dept.id)
-                    ).all()
-                    
-                    yzm_courses = Course.query.filter(
-                        Course.semester.in_(semesters),
-                        Course.departments.any(id=yzm_dept.id)
-                    ).all()
-                    
-                    # Tüm kurs ID'lerini birleştir
-                    course_ids = [course.id for course in blm_courses + yzm_courses]
-                    
-                    if course_ids:
-                        # Bu günde ve bu kurslarda olan programları bul
-                        schedule_items = Schedule.query.filter(
-                            Schedule.day == day,
-                            Schedule.course_id.in_(course_ids)
-                        ).order_by(Schedule.start_time).all()
-                        
-                        # Program varsa hücreye ekle
-                        if schedule_items:
-                            cell_text = []
-                            for item in schedule_items:
-                                course = Course.query.get(item.course_id)
-                                if not course:
-                                    continue
-                                    
-                                classroom = Classroom.query.get(item.classroom_id)
-                                instructor = User.query.get(course.instructor_id) if course.instructor_id else None
-                                
-                                # Dersin bölümünü bul
-                                dept = course.departments[0] if course.departments else None
-                                dept_code = dept.code if dept else ''
-                                
-                                course_info = (
-                                    f"{course.code} - {course.name} ({dept_code}, {course.semester}. Yarıyıl)\n"
-                                    f"Derslik: {classroom.code if classroom else 'Belirtilmemiş'}\n"
-                                    f"Saat: {item.start_time}-{item.end_time}"
-                                )
-                                
-                                if instructor:
-                                    course_info += f"\nÖğr. Üyesi: {instructor.name}"
-                                    
-                                cell_text.append(course_info)
-                            
-                            if cell_text:
-                                cell.value = "\n\n".join(cell_text)
-            
-            # Satır yüksekliğini ayarla
-            ws.row_dimensions[row].height = 150
-            
-        # Geçici dosya oluştur ve Excel'i kaydet
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-            wb.save(tmp.name)
-            tmp_path = tmp.name
-            
         # Excel dosyasını kullanıcıya gönder
         return send_file(
-            tmp_path,
+            output,
             as_attachment=True,
             download_name='ders_programi.xlsx',
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            mimetype=XLSX_MIMETYPE
         )
         
     except Exception as e:
@@ -950,17 +1020,30 @@ def manage_unavailable_times():
         end_time = request.form.get('end_time')
         reason = request.form.get('reason')
         
-        unavailable_time = UnavailableTime(
-            instructor_id=current_user.id,
-            day=day,
-            start_time=start_time,
-            end_time=end_time,
-            reason=reason
-        )
+        if not time_range_valid(time_fields(day, start_time, end_time)):
+            flash('Geçersiz gün veya saat aralığı!', 'error')
+            return redirect(url_for('manage_unavailable_times'))
         
-        db.session.add(unavailable_time)
-        db.session.commit()
-        flash('Müsait olmayan zaman başarıyla eklendi.', 'success')
+        try:
+            unavailable_time = UnavailableTime(
+                instructor_id=current_user.id,
+                day=day,
+                start_time=start_time,
+                end_time=end_time,
+                reason=reason
+            )
+            db.session.add(unavailable_time)
+            
+            # Yeni kayıtla çakışan dersleri aynı işlemde programda başka dilimlere taşı
+            message = repair_message(*repair_schedule())
+            bump_schedule_version()
+            db.session.commit()
+            flash('Müsait olmayan zaman başarıyla eklendi.', 'success')
+            if message:
+                flash(message, 'info')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Müsait olmayan zaman eklenirken bir hata oluştu: {str(e)}', 'error')
         return redirect(url_for('manage_unavailable_times'))
     
     unavailable_times = UnavailableTime.query.filter_by(instructor_id=current_user.id).all()
@@ -979,338 +1062,86 @@ def delete_unavailable_time(id):
         return redirect(url_for('manage_unavailable_times'))
     
     db.session.delete(unavailable_time)
+    bump_schedule_version()
     db.session.commit()
     flash('Müsait olmayan zaman başarıyla silindi.', 'success')
     return redirect(url_for('manage_unavailable_times'))
 
-def generate_schedule(term=None):
+def generate_schedule(term=None, solver='random', progress=None, job_id=None):
     """
     Otomatik ders programı oluşturma fonksiyonu
     term: "guz" veya "bahar" olabilir. Güz ise 1,3,5,7. yarıyıllar, Bahar ise 2,4,6,8. yarıyıllar.
+    solver: Kullanılacak çözücü ("random", "backtracking" veya "parallel", bkz. scheduler.SOLVERS)
+    progress: İlerleme bildirimi için progress(aşama, yerleşen ders sayısı, toplam ders sayısı)
+    job_id: Programı oluşturan arka plan işinin ID'si (taslak sürüme bağlanır)
+    Veriler bir kez belleğe yüklenir, tüm çakışma kontrolleri bellek içi modelde yapılır
+    ve oluşan program sonunda tek bir toplu ekleme ile yeni bir taslak sürüme kaydedilir.
+    Yayındaki program değişmez; taslak önizlenip publish_version ile yayınlanır.
     """
     try:
         # Debug modunu kapalı tut - çok fazla loglama olmasın
         debug_mode = False
         
-        # Mevcut programı temizle
-        Schedule.query.delete()
-        
-        # Haftanın günleri ve saatler
-        days = ['Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma']
-        
-        # 3 saatlik ders blokları
-        time_slots = [
-            ('09:00', '11:50'),
-            ('13:00', '15:50')
-        ]
-        
-        # Güz veya Bahar dönemine göre işlenecek yarıyıllar
-        if term == "guz":
-            semesters = [1, 3, 5, 7]  # Güz dönemi yarıyılları
-            term_name = "Güz"
-        elif term == "bahar":
-            semesters = [2, 4, 6, 8]  # Bahar dönemi yarıyılları
-            term_name = "Bahar"
-        else:
-            # Dönem belirtilmemişse tüm yarıyıllar
-            semesters = list(range(1, 9))
-            term_name = "Tüm"
-        
-        # Bölümleri bul
-        blm_dept = Department.query.filter_by(code='BLM').first()
-        yzm_dept = Department.query.filter_by(code='YZM').first()
-        
-        if not blm_dept or not yzm_dept:
-            return False, "BLM veya YZM bölümü bulunamadı!"
-            
-        # Seçilen yarıyıllardaki tüm dersleri al
-        all_courses = Course.query.filter(Course.semester.in_(semesters)).all()
+        # Güz veya Bahar dönemine göre işlenecek yarıyıllar (dönem belirtilmemişse tümü)
+        semesters, term_name = term_semesters(term)
         
-        # BLM ve YZM bölümlerine ait dersleri belirle
-        # Artık bir ders birden fazla bölüme ait olabilir
-        blm_courses = []
-        yzm_courses = []
+        # Dersleri, derslikleri ve müsait olmama kayıtlarını tek seferde belleğe al
+        all_courses, classrooms, unavailable_times = load_snapshot(semesters)
         
-        for course in all_courses:
-            # Her dersin bölümlerini kontrol et
-            departments = [d.id for d in course.departments]
-            if blm_dept.id in departments:
-                blm_courses.append(course)
-            if yzm_dept.id in departments:
-                yzm_courses.append(course)
+        # Okuma işlemini kapat; çözücü çalışırken açık bir veritabanı işlemi tutulmasın
+        db.session.commit()
         
-        classrooms = Classroom.query.all()
-        unavailable_times = UnavailableTime.query.all()
+        # Yerleştirme aşamaları ders -> (bölüm, yarıyıl) ilişkisinden çıkarılır: önce birden
+        # fazla grupla paylaşılan dersler (paylaşım sayısına göre), sonra her bölümün kendi dersleri
+        phases = cohort_phases(all_courses)
+        if not phases:
+            return False, "Programlanacak, bölüme atanmış ders bulunamadı!"
         
         print(f"\n=== {term_name} Dönemi Programı Oluşturuluyor ===")
         print(f"İşlenecek yarıyıllar: {semesters}")
         if debug_mode:
-            print(f"BLM ders sayısı: {len(blm_courses)}")
-            print(f"YZM ders sayısı: {len(yzm_courses)}")
+            for name, courses in phases:
+                print(f"{name} ders sayısı: {len(courses)}")
         
-        # Ortak dersleri bul (her iki bölüme de ait olan dersler)
-        common_courses = []
-        blm_course_codes = {course.code for course in blm_courses}
-        yzm_course_codes = {course.code for course in yzm_courses}
+        # Bellek içi doluluk modeli
+        model = ScheduleModel(classrooms, unavailable_times)
         
-        for course in all_courses:
-            # Birden fazla bölüme ait olan dersleri belirle
-            departments = [d.id for d in course.departments]
-            if blm_dept.id in departments and yzm_dept.id in departments:
-                common_courses.append(course)
+        result = SOLVERS[solver](model, phases, debug_mode=debug_mode, progress=progress)
         
-        if debug_mode:
-            print(f"Ortak ders sayısı: {len(common_courses)}")
-            
-            # Debug: Tüm dersleri yazdır
-            print("\n=== TÜM DERSLER ===")
-            print("BLM Dersleri:")
-            for course in blm_courses:
-                # Her dersin bölümlerini göster
-                dept_codes = [d.code for d in course.departments]
-                print(f"- {course.code} - {course.name} (Yarıyıl: {course.semester}, Bölümler: {', '.join(dept_codes)})")
-            
-            print("\nYZM Dersleri:")
-            for course in yzm_courses:
-                # Her dersin bölümlerini göster
-                dept_codes = [d.code for d in course.departments]
-                print(f"- {course.code} - {course.name} (Yarıyıl: {course.semester}, Bölümler: {', '.join(dept_codes)})")
-            
-            print("\n=== ORTAK DERSLER ===")
-            for course in common_courses:
-                # Ortak dersleri göster
-                dept_codes = [d.code for d in course.departments]
-                print(f"- {course.code} - {course.name} (Yarıyıl: {course.semester}, Bölümler: {', '.join(dept_codes)})")
-            
-        # Yerleştirilen derslerin izlenmesi için set
-        scheduled_courses = set()
-        
-        # Dersliğe yerleştirmeye yardımcı fonksiyon
-        def place_course(course, day, time_slot):
-            start_time, end_time = time_slot
-            
-            # Ders için öğretim üyesi atanmış mı kontrol et
-            if course.instructor_id:
-                instructor = User.query.get(course.instructor_id)
-                
-                # Öğretim üyesinin bu gün ve saatte müsait olmama durumu var mı kontrol et
-                unavailable_times = UnavailableTime.query.filter(
-                    UnavailableTime.instructor_id == course.instructor_id,
-                    UnavailableTime.day == day,
-                    ((UnavailableTime.start_time <= start_time) & (UnavailableTime.end_time > start_time)) | 
-                    ((UnavailableTime.start_time < end_time) & (UnavailableTime.end_time >= end_time)) |
-                    ((UnavailableTime.start_time >= start_time) & (UnavailableTime.end_time <= end_time))
-                ).all()
-                
-                if unavailable_times:
-                    if debug_mode:
-                        print(f'Öğretim üyesi ({instructor.name}) bu zaman diliminde müsait değil!')
-                    return False, None
-                
-                # Öğretim üyesinin bu zaman diliminde başka dersi var mı kontrol et
-                instructor_conflicts = Schedule.query.join(Course).filter(
-                    Schedule.day == day,
-                    Schedule.start_time < end_time,
-                    Schedule.end_time > start_time,
-                    Course.instructor_id == course.instructor_id
-                ).all()
-                
-                if instructor_conflicts:
-                    if debug_mode:
-                        conflict_details = []
-                        for conflict in instructor_conflicts:
-                            conflict_course = Course.query.get(conflict.course_id)
-                            conflict_classroom = Classroom.query.get(conflict.classroom_id)
-                            conflict_details.append(f"{conflict_course.code} ({conflict_classroom.code}, {conflict.start_time}-{conflict.end_time})")
-                        conflict_message = ", ".join(conflict_details)
-                        print(f'Öğretim üyesi ({instructor.name}) başka derste meşgul: {conflict_message}')
-                    return False, None
-            
-            # Bu ders için yarıyıldaki diğer derslerin çakışma kontrolü
-            # Dersin yarıyılını al
-            semester = course.semester
-            
-            # Bu yarıyıldaki ve aynı bölümlerdeki diğer dersleri bul
-            # Şu an çoka-çok ilişki olduğu için her bölüm için ayrı kontrol yapılmalı
-            for dept in course.departments:
-                # Bu ders programdaki çakışmaları kontrol et (aynı yarıyıl ve bölüm)
-                conflict_schedules = db.session.query(Schedule).join(Course).join(
-                    course_department, Course.id == course_department.c.course_id
-                ).filter(
-                    Schedule.day == day,
-                    Schedule.start_time == start_time,
-                    Schedule.end_time == end_time,
-                    Course.semester == semester,
-                    course_department.c.department_id == dept.id
-                ).all()
-                
-                if conflict_schedules:
-                    if debug_mode:
-                        conflict_courses = []
-                        for schedule in conflict_schedules:
-                            conflict_course = Course.query.get(schedule.course_id)
-                            conflict_courses.append(f"{conflict_course.code}")
-                        print(f"ÇAKIŞMA: {course.code} dersi {day} günü {start_time}-{end_time} saatinde {dept.code} bölümü {semester}. yarıyıldaki şu derslerle çakışıyor: {', '.join(conflict_courses)}")
-                    return False, None
-            
-            # Uygun derslik bul
-            suitable_classroom = None
-            
-            if course.practice > 0:  # Uygulamalı ders
-                lab_classrooms = [c for c in classrooms if c.type == 'LAB']
-                free_classrooms = []
-                
-                for classroom in lab_classrooms:
-                    # Derslik kapasitesi kontrolü
-                    if classroom.capacity < course.capacity:
-                        if debug_mode:
-                            print(f"KAPASİTE YETERSİZ: {classroom.code} dersliği ({classroom.capacity} kişilik) {course.code} dersi ({course.capacity} kontenjan) için yetersiz!")
-                        continue
-                    
-                    is_occupied = Schedule.query.filter_by(
-                        classroom_id=classroom.id,
-                        day=day,
-                        start_time=start_time,
-                        end_time=end_time
-                    ).first()
-                    
-                    if not is_occupied:
-                        free_classrooms.append(classroom)
-                
-                if free_classrooms:
-                    suitable_classroom = random.choice(free_classrooms)
-            
-            if not suitable_classroom:  # Normal derslik
-                normal_classrooms = [c for c in classrooms if c.type == 'NORMAL']
-                free_classrooms = []
-                
-                for classroom in normal_classrooms:
-                    # Derslik kapasitesi kontrolü
-                    if classroom.capacity < course.capacity:
-                        if debug_mode:
-                            print(f"KAPASİTE YETERSİZ: {classroom.code} dersliği ({classroom.capacity} kişilik) {course.code} dersi ({course.capacity} kontenjan) için yetersiz!")
-                        continue
-                    
-                    is_occupied = Schedule.query.filter_by(
-                        classroom_id=classroom.id,
-                        day=day,
-                        start_time=start_time,
-                        end_time=end_time
-                    ).first()
-                    
-                    if not is_occupied:
-                        free_classrooms.append(classroom)
-                
-                if free_classrooms:
-                    suitable_classroom = random.choice(free_classrooms)
-            
-            if not suitable_classroom:
-                if debug_mode:
-                    print(f"DERSLİK BULUNAMADI: {course.code} dersi için {day} günü {start_time}-{end_time} saatinde uygun derslik yok!")
-                return False, None
-            
-            # Programa ekle
-            schedule = Schedule(
-                course_id=course.id,
-                classroom_id=suitable_classroom.id,
-                day=day,
-                start_time=start_time,
-                end_time=end_time
-            )
-            db.session.add(schedule)
-            if debug_mode:
-                print(f"YERLEŞTİRİLDİ: {course.code} dersi {day} günü {start_time}-{end_time} saatlerinde {suitable_classroom.code} dersliğine yerleştirildi.")
-            return True, suitable_classroom
-        
-        # 1. ADIM: ORTAK DERSLERİ PROGRAMLA
-        print("\n=== ORTAK DERSLER YERLEŞTİRİLİYOR ===")
-        for course in common_courses:
-            # Bu ders daha önce programlanmış mı kontrol et
-            if course.code in scheduled_courses:
-                if debug_mode:
-                    print(f"ATLANDI: {course.code} dersi zaten programlanmış.")
-                continue
-                
-            placed = False
-            attempts = 0
-            max_attempts = 100
-            
-            if debug_mode:
-                print(f"ORTAK DERS: {course.code} - {course.name} (Bölümler: {', '.join([d.code for d in course.departments])})")
-            
-            while not placed and attempts < max_attempts:
-                day = random.choice(days)
-                time_slot = random.choice(time_slots)
-                
-                result, _ = place_course(course, day, time_slot)
-                if result:
-                    scheduled_courses.add(course.code)
-                    placed = True
-                
-                attempts += 1
-            
-            if not placed:
-                print(f"UYARI: {course.code} dersi için uygun zaman dilimi bulunamadı.")
-        
-        # 2. ADIM: ORTAK OLMAYAN BLM DERSLERİNİ PROGRAMLA
-        print("\n=== BLM BÖLÜMÜ DERSLERİ YERLEŞTİRİLİYOR ===")
-        for course in blm_courses:
-            # Sadece BLM'ye ait olan dersleri programla
-            if course in common_courses or course.code in scheduled_courses:
-                continue
-                
-            placed = False
-            attempts = 0
-            max_attempts = 100
-            
-            while not placed and attempts < max_attempts:
-                day = random.choice(days)
-                time_slot = random.choice(time_slots)
-                
-                result, _ = place_course(course, day, time_slot)
-                if result:
-                    scheduled_courses.add(course.code)
-                    placed = True
-                
-                attempts += 1
-            
-            if not placed:
-                print(f"UYARI: {course.code} dersi için uygun zaman dilimi bulunamadı.")
-        
-        # 3. ADIM: ORTAK OLMAYAN YZM DERSLERİNİ PROGRAMLA
-        print("\n=== YZM BÖLÜMÜ DERSLERİ YERLEŞTİRİLİYOR ===")
-        for course in yzm_courses:
-            # Sadece YZM'ye ait olan dersleri programla
-            if course in common_courses or course.code in scheduled_courses:
-                continue
-                
-            placed = False
-            attempts = 0
-            max_attempts = 100
-            
-            while not placed and attempts < max_attempts:
-                day = random.choice(days)
-                time_slot = random.choice(time_slots)
-                
-                result, _ = place_course(course, day, time_slot)
-                if result:
-                    scheduled_courses.add(course.code)
-                    placed = True
-                
-                attempts += 1
-            
-            if not placed:
-                print(f"UYARI: {course.code} dersi için uygun zaman dilimi bulunamadı.")
-        
-        db.session.commit()
+        # Bulunan programı yumuşak kısıtlara göre iyileştir (ders tercihleri, grupların boş
+        # saatleri, derslik israfı, öğretim üyesi günlük yükü); sert kısıtlar korunur
+        if progress:
+            progress('İYİLEŞTİRME', len(model.assignments), len(model.assignments) + len(result.unplaced))
+        initial_penalty, final_penalty, moves = improve_schedule(model)
+        print(f"Yumuşak kısıt cezası: {initial_penalty:.1f} -> {final_penalty:.1f} ({moves} hamle)")
         
         # Özet bilgiler
         print(f"\n=== PROGRAM OLUŞTURMA TAMAMLANDI ===")
-        print(f"Toplam programlanan ders sayısı: {len(scheduled_courses)}")
-        if debug_mode:
-            print(f"Toplam ortak ders sayısı: {len(common_courses)}")
+        print(f"Toplam programlanan ders oturumu sayısı: {len(model.assignments)}")
+        
+        unplaced_codes = list(dict.fromkeys(s.code for s in result.unplaced))
+        message = f"{term_name} dönemi için ders programı taslak olarak oluşturuldu."
+        if result.unplaced:
+            message += (f" {len(result.unplaced)} ders oturumu yerleştirilemedi: "
+                        f"{', '.join(unplaced_codes)}.")
+        if result.proof:
+            message += " Gerekçe: " + " ".join(result.proof)
+        elif result.status == 'limit':
+            message += " Arama sınırına ulaşıldı, en iyi kısmi program kaydedildi."
+        
+        # Yeni program taslak bir sürüme yazılır; yayındaki program ve okuyucuları etkilenmez
+        if progress:
+            progress('KAYIT', len(model.assignments), len(model.assignments) + len(result.unplaced))
+        version = ScheduleVersion(term=term, solver=solver, status='draft', job_id=job_id,
+                                  message=message, unplaced=','.join(unplaced_codes))
+        db.session.add(version)
+        db.session.flush()
+        rows = [{**row, 'version_id': version.id} for row in model.rows()]
+        if rows:
+            db.session.execute(insert(Schedule), rows)
+        db.session.commit()
         
-        return True, f"{term_name} dönemi için ders programı başarıyla oluşturuldu."
+        return True, message + " Yayınlamadan önce değişiklikleri Program Sürümleri sayfasında inceleyebilirsiniz."
         
     except Exception as e:
         db.session.rollback()
@@ -1319,26 +1150,405 @@ def generate_schedule(term=None):
         traceback.print_exc()
         return False, f"Ders programı oluşturulurken bir hata oluştu: {str(e)}"
 
+def term_semesters(term):
+    """
+    Dönemin yarıyıllarını ve adını döndürür
+    term: "guz" (1,3,5,7. yarıyıllar), "bahar" (2,4,6,8. yarıyıllar); diğer değerler için tüm yarıyıllar
+    """
+    if term == "guz":
+        return [1, 3, 5, 7], "Güz"
+    if term == "bahar":
+        return [2, 4, 6, 8], "Bahar"
+    return list(range(1, 9)), "Tüm"
+
+def missing_courses(version, course_ids):
+    """
+    Sürümün dönemine ait olup sürümde hiç program öğesi bulunmayan dersler
+    (sürüm oluşturulduktan sonra eklenen veya öğeleri silinen dersler). Dönemi bilinmeyen
+    (elle oluşturulmuş) sürümler için boş liste döner.
+    :param course_ids: Sürümde öğesi bulunan derslerin ID'leri
+    """
+    if version is None or not version.term:
+        return []
+    semesters, _ = term_semesters(version.term)
+    courses = Course.query.options(selectinload(Course.departments)).filter(
+        Course.semester.in_(semesters)
+    ).order_by(Course.id).all()
+    return [CourseInfo.from_model(c) for c in courses
+            if c.id not in course_ids and c.departments and (c.theory or 0) + (c.practice or 0) > 0]
+
+def check_schedule(version_id, changed_course_ids=(), removed_classroom_id=None, complete=False):
+    """
+    Bir sürümün program öğelerini güncel ders, derslik ve müsait olmama kayıtlarıyla
+    karşılaştırır; veritabanına yazmaz.
+    :param version_id: Denetlenecek sürüm (None: sürüme bağlı olmayan öğeler)
+    :param changed_course_ids: Düzenlenen derslerin ID'leri (çakışmada önce bunlar yer değiştirir)
+    :param removed_classroom_id: Silinmek üzere olan dersliğin ID'si
+    :param complete: Sürümde hiç öğesi olmayan dönem derslerini de yerleştirilecekler arasına kat
+    :return: (model, kept, invalid, pending, lost); kept: session_id -> modelde yeri tutulan öğe,
+             invalid: silinecek öğeler, pending: yeniden yerleştirilecek oturumlar,
+             lost: elle programlanmış, dersliği silinen dersler
+    """
+    items = Schedule.query.filter(version_filter(version_id)).order_by(Schedule.id).all()
+    
+    courses = Course.query.options(selectinload(Course.departments)).filter(
+        Course.id.in_({item.course_id for item in items})
+    ).all()
+    courses = {c.id: CourseInfo.from_model(c) for c in courses}
+    classrooms = [RoomInfo.from_model(c) for c in Classroom.query.order_by(Classroom.id).all()
+                  if c.id != removed_classroom_id]
+    rooms = {c.id: c for c in classrooms}
+    model = ScheduleModel(classrooms, [UnavailableInfo.from_model(u) for u in UnavailableTime.query.all()])
+    
+    course_items = {}
+    for item in items:
+        course_items.setdefault(item.course_id, []).append(item)
+    
+    # Önce değişmeyen derslerin öğeleri işlenir; böylece çakışmada değişen ders yer değiştirir
+    changed_course_ids = set(changed_course_ids)
+    kept = {}
+    invalid = []
+    pending = []
+    lost = []
+    for course_id in sorted(course_items, key=lambda cid: cid in changed_course_ids):
+        course = courses.get(course_id)
+        if course is None:
+            invalid.extend(course_items[course_id])
+            continue
+        
+        sessions = course_sessions(course)
+        manual = False
+        for item in course_items[course_id]:
+            classroom = rooms.get(item.classroom_id)
+            if classroom is None:
+                invalid.append(item)
+                continue
+            span = model.find_slot(item.day, item.start_time, item.end_time)
+            session = span and next((s for s in sessions if s.length == span[1]), None)
+            if span is None or (session is None and not sessions):
+                # Ders saatlerine uymayan veya fazladan elle eklenmiş öğeler korunur ve dolu sayılır
+                model.occupy(course, classroom, item.day, item.start_time, item.end_time)
+                manual = manual or span is None
+            elif session is not None and model.placement_valid(session, classroom, span[0]):
+                model.place(session, classroom, span[0])
+                kept[session.id] = item
+                sessions.remove(session)
+            else:
+                invalid.append(item)
+        
+        # Elle programlanmış dersler oturumlara bölünmez; yalnızca eksik kalan oturumlar yeniden yerleşir
+        if manual:
+            if any(item in invalid for item in course_items[course_id]):
+                lost.append(course)
+        else:
+            pending.extend(sessions)
+    
+    if complete:
+        version = db.session.get(ScheduleVersion, version_id) if version_id is not None else None
+        for course in missing_courses(version, set(course_items)):
+            pending.extend(course_sessions(course))
+    return model, kept, invalid, pending, lost
+
+def repair_schedule(changed_course_ids=(), removed_classroom_id=None, version_id=None, complete=False):
+    """
+    Tek bir değişiklikten sonra programı baştan oluşturmadan onarır
+    Yalnızca değişikliğin geçersiz kıldığı program öğeleri bulunur; bu oturumlar ve gerekirse
+    en az sayıda komşu oturum yeniden yerleştirilir (bkz. scheduler.repair_placements).
+    Diğer tüm öğeler yerinde kalır.
+    :param changed_course_ids: Düzenlenen derslerin ID'leri (çakışmada önce bunlar yer değiştirir)
+    :param removed_classroom_id: Silinmek üzere olan dersliğin ID'si
+    :param version_id: Onarılacak sürüm (varsayılan: yayındaki sürüm)
+    :param complete: Sürümde eksik kalan dönem derslerini de yerleştir (yayınlama öncesi)
+    :return: (yeniden yerleştirilen oturum sayısı, yerleştirilemeyen oturumlar)
+    """
+    if version_id is None:
+        version_id = active_version_id()
+    model, kept, invalid, pending, lost = check_schedule(version_id, changed_course_ids,
+                                                         removed_classroom_id, complete)
+    
+    moved, unplaced = repair_placements(model, pending) if pending else (set(), [])
+    
+    # Yer değiştiren öğeleri güncelle, geçersizleri sil, yeniden yerleşenleri ekle
+    for session in unplaced:
+        if session.id in kept:
+            invalid.append(kept.pop(session.id))
+    new_rows = []
+    for session_id in moved:
+        if session_id in kept:
+            db.session.execute(update(Schedule).where(Schedule.id == kept[session_id].id)
+                               .values(**model.row(session_id)))
+        else:
+            new_rows.append({**model.row(session_id), 'version_id': version_id})
+    if invalid:
+        db.session.execute(delete(Schedule).where(Schedule.id.in_([item.id for item in invalid])))
+    if new_rows:
+        db.session.execute(insert(Schedule), new_rows)
+    if moved or invalid:
+        bump_schedule_version()
+    
+    unplaced = unplaced + lost
+    if not moved and not unplaced:
+        return 0, []
+    print(f"\n=== PROGRAM ONARILDI ===")
+    print(f"Yeniden yerleştirilen ders oturumu sayısı: {len(moved)}")
+    if unplaced:
+        print(f"Yerleştirilemeyen dersler: {', '.join(dict.fromkeys(c.code for c in unplaced))}")
+    return len(moved), unplaced
+
+def version_problems(version):
+    """
+    Sürümün oluşturulduktan sonra yapılan değişikliklerle (ders, derslik, müsait olmama
+    kayıtları) uyumsuzluklarını bulur; yayınlama öncesi uyarı için kullanılır
+    :return: {'invalid': geçersiz öğe sayısı, 'courses': [etkilenen ders kodları]}; sorun yoksa None
+    """
+    _, _, invalid, pending, lost = check_schedule(version.id, complete=True)
+    known = set(version.unplaced_codes)
+    codes = [session.code for session in pending if session.code not in known] + [c.code for c in lost]
+    if not invalid and not codes:
+        return None
+    return {'invalid': len(invalid), 'courses': sorted(set(codes))}
+
+def repair_message(moved, unplaced):
+    """Onarım sonucunu kullanıcıya gösterilecek mesaja çevirir"""
+    if not moved and not unplaced:
+        return None
+    message = f"Ders programı onarıldı: {moved} ders oturumu yeniden yerleştirildi."
+    if unplaced:
+        message += (f" {len(unplaced)} ders oturumu yerleştirilemedi: "
+                    f"{', '.join(dict.fromkeys(c.code for c in unplaced))}.")
+    return message
+
+# Çalışan iş SCHEDULE_JOB_HEARTBEAT saniyede bir canlılık sinyali (heartbeat_at) yazar.
+# SCHEDULE_JOB_STALE süresince sinyal gelmeyen kuyruktaki/çalışan işler (sunucu yeniden
+# başladı, süreç çöktü) ölü sayılır ve 'failed' olarak işaretlenir.
+SCHEDULE_JOB_HEARTBEAT = 10
+SCHEDULE_JOB_STALE = timedelta(minutes=2)
+
+def update_schedule_job(job_id, **values):
+    """
+    İş kaydını ana oturumdan bağımsız, kısa bir işlemle günceller
+    Böylece ilerleme bilgisi çözücü çalışırken hemen görünür olur.
+    """
+    with db.engine.begin() as conn:
+        conn.execute(update(ScheduleJob).where(ScheduleJob.id == job_id).values(**values))
+
+def run_schedule_job(job_id):
+    """
+    Program oluşturma işini arka plan iş parçacığında çalıştırır
+    İş sürdükçe ayrı bir iş parçacığı canlılık sinyali yazar (bkz. SCHEDULE_JOB_STALE).
+    :param job_id: Çalıştırılacak ScheduleJob kaydının ID'si
+    """
+    with app.app_context():
+        job = db.session.get(ScheduleJob, job_id)
+        term, solver = job.term, job.solver
+        db.session.commit()
+        update_schedule_job(job_id, status='running', started_at=datetime.utcnow(),
+                            heartbeat_at=datetime.utcnow())
+        
+        stopped = threading.Event()
+        
+        def heartbeat():
+            with app.app_context():
+                while not stopped.wait(SCHEDULE_JOB_HEARTBEAT):
+                    update_schedule_job(job_id, heartbeat_at=datetime.utcnow())
+        
+        def progress(phase, placed, total):
+            update_schedule_job(job_id, phase=phase, placed_count=placed, total_count=total,
+                                heartbeat_at=datetime.utcnow())
+        
+        threading.Thread(target=heartbeat, daemon=True).start()
+        try:
+            success, message = generate_schedule(term, solver, progress, job_id)
+        except Exception as e:
+            success, message = False, f"Ders programı oluşturulurken bir hata oluştu: {str(e)}"
+        finally:
+            stopped.set()
+            db.session.remove()
+        
+        update_schedule_job(job_id,
+                            status='done' if success else 'failed',
+                            message=message,
+                            finished_at=datetime.utcnow())
+
+def schedule_job_alive():
+    """Canlılık sinyali (kuyruktaki işler için oluşturulma zamanı) süresi dolmamış işleri seçen koşul"""
+    return func.coalesce(ScheduleJob.heartbeat_at, ScheduleJob.created_at) > datetime.utcnow() - SCHEDULE_JOB_STALE
+
+def fail_stale_schedule_jobs():
+    """
+    Canlılık sinyali kesilmiş kuyruktaki/çalışan işleri 'failed' olarak işaretler
+    Çağıranın işlemiyle birlikte commit edilir.
+    :return: İşaretlenen iş sayısı
+    """
+    result = db.session.execute(
+        update(ScheduleJob)
+        .where(ScheduleJob.status.in_(['queued', 'running']), ~schedule_job_alive())
+        .values(status='failed', finished_at=datetime.utcnow(),
+                message='İş yarıda kaldı (sunucu yeniden başlatılmış veya işlem sonlanmış olabilir).')
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def active_schedule_job():
+    """Kuyrukta veya çalışmakta olan (canlılık sinyali kesilmemiş) son işi döndürür"""
+    return ScheduleJob.query.filter(
+        ScheduleJob.status.in_(['queued', 'running']),
+        schedule_job_alive()
+    ).order_by(ScheduleJob.id.desc()).first()
+
 @app.route('/generate_schedule', methods=['POST'])
 @admin_required
 def generate_schedule_route():
     """
     Otomatik ders programı oluşturma endpoint'i
+    Çözücü istek içinde değil, arka planda bir iş olarak çalışır; view_schedule sayfası
+    işin durumunu /generate_schedule/status/<job_id> üzerinden sorgular.
+    Aynı anda tek iş çalışır: kontrol ve ekleme schedule_state satırı kilitliyken yapılır.
     """
-    # Seçilen dönemi al
+    # Seçilen dönemi ve çözücüyü al
     term = request.form.get('term')
+    solver = request.form.get('solver', 'random')
     
-    if term:
-        success, message = generate_schedule(term)
-        if success:
-            flash(message, 'success')
-        else:
-            flash(message, 'error')
-    else:
+    if solver not in SOLVERS:
+        flash("Geçersiz çözücü seçimi.", 'error')
+        return redirect(url_for('view_schedule'))
+    if not term:
         flash("Lütfen bir dönem seçiniz.", 'error')
+        return redirect(url_for('view_schedule'))
+    
+    try:
+        # Eşzamanlı istekler bu kilitte sıraya girer; ikinci istek ilk işi görür
+        lock_schedule_state()
+        fail_stale_schedule_jobs()
+        if active_schedule_job():
+            db.session.commit()
+            flash("Devam eden bir program oluşturma işi var. Lütfen tamamlanmasını bekleyin.", 'error')
+            return redirect(url_for('view_schedule'))
         
+        job = ScheduleJob(term=term, solver=solver, status='queued', created_by=current_user.id)
+        db.session.add(job)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Program oluşturma başlatılamadı: {str(e)}", 'error')
+        return redirect(url_for('view_schedule'))
+    
+    threading.Thread(target=run_schedule_job, args=(job.id,), daemon=True).start()
+    flash("Program oluşturma başlatıldı. İlerleme bu sayfada gösterilecek.", 'success')
+    return redirect(url_for('view_schedule'))
+
+# Program oluşturma işinin durumunu JSON olarak döndürür
+@app.route('/generate_schedule/status/<int:job_id>')
+@admin_required
+def schedule_job_status(job_id):
+    """
+    Arka plan program oluşturma işinin durumu (view_schedule sayfası bu adresi yoklar)
+    :param job_id: İş ID'si
+    """
+    job = ScheduleJob.query.get_or_404(job_id)
+    
+    # Canlılık sinyali kesilmiş iş sonsuza dek "çalışıyor" görünmesin
+    if job.status in ('queued', 'running') and fail_stale_schedule_jobs():
+        db.session.commit()
+        db.session.refresh(job)
+    result = job.to_dict()
+    
+    # Tamamlanan iş bir taslak sürüm oluşturduysa önizleme adresini ekle
+    version = ScheduleVersion.query.filter_by(job_id=job.id).first()
+    if version:
+        result['preview_url'] = url_for('schedule_version_detail', version_id=version.id)
+    return jsonify(result)
+
+# Program sürümleri listesi
+@app.route('/schedule/versions')
+@admin_required
+def schedule_versions():
+    """
+    Tüm program sürümlerini (taslak, yayında, arşiv) öğe sayılarıyla birlikte listeler
+    """
+    versions = ScheduleVersion.query.order_by(ScheduleVersion.id.desc()).all()
+    counts = dict(db.session.query(Schedule.version_id, func.count(Schedule.id))
+                  .group_by(Schedule.version_id).all())
+    # Sürümün güncel olup olmadığı (version_problems) tüm programı denetlediğinden listede
+    # hesaplanmaz; önizleme sayfasında ve yayınlama sırasında bildirilir
+    return render_template('schedule_versions.html',
+                          versions=versions,
+                          counts=counts,
+                          active_version_id=active_version_id())
+
+# Program sürümü önizleme sayfası
+@app.route('/schedule/versions/<int:version_id>')
+@admin_required
+def schedule_version_detail(version_id):
+    """
+    Sürümü yayındaki programla karşılaştırır: eklenen, çıkarılan, yeri değişen ve
+    yerleştirilemeyen dersler
+    :param version_id: Sürüm ID'si
+    """
+    version = ScheduleVersion.query.get_or_404(version_id)
+    current_id = active_version_id()
+    diff = schedule_diff(version.id, current_id)
+    
+    # Yayında olmayan sürüm sonradan yapılan değişikliklerle uyumsuz hale gelmiş olabilir
+    problems = version_problems(version) if version.id != current_id else None
+    return render_template('schedule_version.html',
+                          version=version,
+                          diff=diff,
+                          problems=problems,
+                          active_version_id=current_id)
+
+# Program sürümü yayınlama / geri alma
+@app.route('/schedule/versions/<int:version_id>/publish', methods=['POST'])
+@admin_required
+def publish_schedule_version(version_id):
+    """
+    Sürümü yayınlar; yalnızca etkin sürüm işaretçisi değişir (taslak yayınlama veya
+    eski bir sürüme geri alma)
+    :param version_id: Yayınlanacak sürümün ID'si
+    """
+    version = ScheduleVersion.query.get_or_404(version_id)
+    try:
+        rollback = version.status == 'archived'
+        
+        # Sürüm oluşturulduktan sonra değişen dersler, derslikler ve müsait olmama kayıtlarına
+        # göre aynı işlemde onarılır; eksik kalan dönem dersleri de yerleştirilmeye çalışılır
+        moved, unplaced = repair_schedule(version_id=version.id, complete=True)
+        if moved or unplaced:
+            version.unplaced = ','.join(dict.fromkeys(version.unplaced_codes + [c.code for c in unplaced]))
+        publish_version(version.id)
+        db.session.commit()
+        flash(f'{version.id} numaralı program sürümü {"geri yüklendi" if rollback else "yayınlandı"}.', 'success')
+        message = repair_message(moved, unplaced)
+        if message:
+            flash(message, 'warning' if unplaced else 'info')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Program sürümü yayınlanırken bir hata oluştu: {str(e)}', 'error')
+        return redirect(url_for('schedule_version_detail', version_id=version_id))
     return redirect(url_for('view_schedule'))
 
+# Program sürümü silme
+@app.route('/schedule/versions/<int:version_id>/delete', methods=['POST'])
+@admin_required
+def delete_schedule_version(version_id):
+    """
+    Yayında olmayan bir sürümü öğeleriyle birlikte siler
+    :param version_id: Silinecek sürümün ID'si
+    """
+    version = ScheduleVersion.query.get_or_404(version_id)
+    if version.id == active_version_id():
+        flash('Yayındaki program sürümü silinemez!', 'error')
+        return redirect(url_for('schedule_versions'))
+    try:
+        Schedule.query.filter_by(version_id=version.id).delete()
+        db.session.delete(version)
+        db.session.commit()
+        flash('Program sürümü silindi.', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Program sürümü silinirken bir hata oluştu: {str(e)}', 'error')
+    return redirect(url_for('schedule_versions'))
+
 # Öğretim üyesi kişisel ders programı görüntüleme sayfası
 @app.route('/my_schedule')
 @login_required
@@ -1351,31 +1561,15 @@ def my_schedule():
         flash('Bu sayfaya erişim yetkiniz yok.', 'error')
         return redirect(url_for('index'))
     
-    # Haftanın günleri
-    days = ['Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma']
-    
-    # Saat dilimleri (09:00, 10:00, ... 17:00)
-    hours = []
-    for i in range(9, 18):
-        hours.append(f"{i:02d}:00")
-    
-    # Öğretim üyesinin verdiği dersleri bul
-    instructor_courses = Course.query.filter_by(instructor_id=current_user.id).all()
-    
-    # Ders programı öğelerini bul
-    schedule_items = []
-    for course in instructor_courses:
-        items = Schedule.query.filter_by(course_id=course.id).all()
-        schedule_items.extend(items)
-    
-    # Öğretim üyesinin müsait olmadığı zamanları getir
-    unavailable_times = UnavailableTime.query.filter_by(instructor_id=current_user.id).all()
+    # Dersler ve müsait olmama kayıtları gün x saat tablosuna tek geçişte yerleştirilir
+    week = instructor_week(current_user.id)
     
     return render_template('my_schedule.html',
-                          schedule_items=schedule_items,
-                          days=days,
-                          hours=hours,
-                          unavailable_times=unavailable_times)
+                          schedule_items=week['cells'],
+                          grid=week['grid'],
+                          unavailable=week['unavailable'],
+                          days=DAYS,
+                          hours=GRID_HOURS)
 
 # Müsait olmama durumu eklemek için AJAX endpoint
 @app.route('/add_unavailable_time', methods=['POST'])
@@ -1394,6 +1588,9 @@ def add_unavailable_time():
         start_time = data.get('start_time')
         end_time = data.get('end_time')
         
+        if not time_range_valid(time_fields(day, start_time, end_time)):
+            return jsonify(success=False, error="Geçersiz gün veya saat aralığı.")
+        
         # Aynı zaman diliminde başka bir kayıt var mı kontrol et
         existing = UnavailableTime.query.filter_by(
             instructor_id=current_user.id,
@@ -1415,9 +1612,13 @@ def add_unavailable_time():
         )
         
         db.session.add(unavailable_time)
+        
+        # Yeni kayıtla çakışan dersleri aynı işlemde programda başka dilimlere taşı
+        message = repair_message(*repair_schedule())
+        bump_schedule_version()
         db.session.commit()
         
-        return jsonify(success=True)
+        return jsonify(success=True, message=message)
     except Exception as e:
         db.session.rollback()
         return jsonify(success=False, error=str(e))
@@ -1449,6 +1650,7 @@ def remove_unavailable_time():
         
         if unavailable_time:
             db.session.delete(unavailable_time)
+            bump_schedule_version()
             db.session.commit()
             return jsonify(success=True)
         
@@ -1470,47 +1672,97 @@ def instructor_schedules(instructor_id=None):
         flash('Bu sayfaya erişim yetkiniz yok.', 'error')
         return redirect(url_for('index'))
     
-    # Tüm öğretim üyelerini getir
-    instructors = User.query.filter_by(role='instructor').order_by(User.name).all()
-    
-    # Haftanın günleri
-    days = ['Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma']
-    
-    # Saat dilimleri (09:00, 10:00, ... 17:00)
-    hours = []
-    for i in range(9, 18):
-        hours.append(f"{i:02d}:00")
+    # Tüm öğretim üyelerini bölümleriyle birlikte getir
+    instructors = User.query.options(joinedload(User.department)) \
+        .filter_by(role='instructor').order_by(User.name).all()
     
-    schedule_items = []
+    week = None
     selected_instructor = None
     
     # Eğer bir öğretim üyesi seçilmişse
     if instructor_id:
         selected_instructor = User.query.filter_by(id=instructor_id, role='instructor').first_or_404()
-        
-        # Seçilen öğretim üyesinin verdiği dersleri bul
-        instructor_courses = Course.query.filter_by(instructor_id=instructor_id).all()
-        
-        # Ders programı öğelerini bul
-        for course in instructor_courses:
-            items = Schedule.query.filter_by(course_id=course.id).all()
-            schedule_items.extend(items)
-    else:
+    elif current_user.role == 'instructor':
         # Öğretim üyesi seçilmemişse ve kullanıcı bir öğretim üyesi ise, kendi programını göster
-        if current_user.role == 'instructor':
-            selected_instructor = current_user
-            instructor_courses = Course.query.filter_by(instructor_id=current_user.id).all()
-            
-            for course in instructor_courses:
-                items = Schedule.query.filter_by(course_id=course.id).all()
-                schedule_items.extend(items)
+        selected_instructor = current_user
+    
+    # Seçilen öğretim üyesinin haftalık tablosu (önbellekteki hücrelerden, gün ve saate göre sıralı)
+    if selected_instructor:
+        week = instructor_week(selected_instructor.id)
     
     return render_template('instructor_schedules.html',
                           instructors=instructors,
                           selected_instructor=selected_instructor,
-                          schedule_items=schedule_items,
-                          days=days,
-                          hours=hours)
+                          schedule_items=week['cells'] if week else [],
+                          grid=week['grid'] if week else None,
+                          days=DAYS,
+                          hours=GRID_HOURS)
+
+
+# Tüm öğretim üyelerinin doluluk karşılaştırma sayfası
+@app.route('/instructor_schedules/all')
+@login_required
+def all_instructor_schedules():
+    """
+    Tüm öğretim üyelerinin haftalık doluluğunu (ders ve müsait olmama) tek tabloda gösterir
+    day ve hour parametreleri verilirse o saatte boş olan öğretim üyeleri listelenir
+    (örn: ?day=Çarşamba&hour=13)
+    """
+    if current_user.role != 'instructor' and current_user.role != 'admin':
+        flash('Bu sayfaya erişim yetkiniz yok.', 'error')
+        return redirect(url_for('index'))
+    
+    # Doluluk maskeleri program sürümü değişene kadar önbellekten gelir
+    occupancy = cached_instructor_occupancy()
+    
+    selected_day = request.args.get('day')
+    selected_hour = request.args.get('hour', type=int)
+    free = None
+    if selected_day and selected_hour is not None:
+        free = free_instructors(occupancy, selected_day, selected_hour)
+    
+    return render_template('all_instructor_schedules.html',
+                          instructors=occupancy['instructors'],
+                          days=DAYS,
+                          hours=GRID_HOURS,
+                          selected_day=selected_day,
+                          selected_hour=selected_hour,
+                          free=free)
+
+# Öğretim üyesi doluluk maskeleri (JSON)
+@app.route('/instructor_schedules/occupancy')
+@login_required
+def instructor_occupancy_api():
+    """
+    Tüm öğretim üyelerinin doluluğunu gün başına bit maskesi olarak döndürür
+    Maskenin i. biti hours listesindeki i. saat satırını temsil eder; maske listeleri
+    days sırasındadır. day ve hour parametreleri verilirse free alanında o saatte boş
+    olan öğretim üyelerinin ID'leri döner.
+    """
+    if current_user.role != 'instructor' and current_user.role != 'admin':
+        return jsonify(success=False, error="Bu işlem için yetkiniz yok."), 403
+    
+    occupancy = cached_instructor_occupancy()
+    result = {
+        'success': True,
+        'days': DAYS,
+        'hours': GRID_HOURS,
+        'instructors': [{
+            'id': row['id'],
+            'name': row['name'],
+            'department_code': row['department_code'],
+            'teaching': row['teaching'],
+            'unavailable': row['unavailable'],
+            'busy': row['busy'],
+            'teaching_hours': row['teaching_hours']
+        } for row in occupancy['instructors']]
+    }
+    
+    day = request.args.get('day')
+    hour = request.args.get('hour', type=int)
+    if day and hour is not None:
+        result['free'] = [row['id'] for row in free_instructors(occupancy, day, hour)]
+    return jsonify(result)
 
 
 # Kişisel ders programını Excel'e aktarma
@@ -1530,7 +1782,7 @@ def export_my_schedule():
     # Ders programı öğelerini bul
     schedule_items = []
     for course in instructor_courses:
-        items = Schedule.query.filter_by(course_id=course.id).all()
+        items = Schedule.query.filter(Schedule.course_id == course.id, live_schedule()).all()
         schedule_items.extend(items)
     
     # Excel dosyası oluştur
@@ -1599,32 +1851,28 @@ def student_dashboard():
     
     # Öğrencinin seçtiği dersleri getir
     selected_courses = current_user.selected_courses
+    selected_ids = {course.id for course in selected_courses}
     
-    # Öğrencinin bölümündeki dersleri getir
-    department_courses = Course.query.join(course_department).filter(
-        course_department.c.department_id == current_user.department_id
-    ).all()
-    
-    # Öğrencinin yarıyılındaki dersleri filtrele
-    current_semester_courses = [course for course in department_courses 
-                              if course.semester == current_user.current_semester]
+    # Öğrencinin bölümündeki, yarıyılındaki dersleri getir
+    current_semester_courses = Course.query.join(course_department).filter(
+        course_department.c.department_id == current_user.department_id,
+        Course.semester == current_user.current_semester
+    ).order_by(Course.code).all()
     
-    # Öğrencinin ders programını oluştur
-    schedule_items = []
-    for course in selected_courses:
-        items = Schedule.query.filter_by(course_id=course.id).all()
-        schedule_items.extend(items)
+    # Öğrencinin haftalık ders programı tablosu (gün -> saat -> hücreler)
+    grid, _ = course_grid(selected_ids)
     
-    # Haftanın günleri
-    days = ['Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma']
+    # Bekleme listesindeki dersler ve sıraları
+    waitlist = student_waitlist(current_user.id)
     
     return render_template('student_dashboard.html',
                          selected_courses=selected_courses,
+                         selected_ids=selected_ids,
                          current_semester_courses=current_semester_courses,
-                         schedule_items=schedule_items,
-                         days=days,
-                         Course=Course,
-                         Classroom=Classroom)
+                         waitlist=waitlist,
+                         grid=grid,
+                         days=DAYS,
+                         hours=GRID_HOURS)
 
 @app.route('/student/select_course/<int:course_id>', methods=['POST'])
 @login_required
@@ -1650,28 +1898,29 @@ def select_course(course_id):
             flash('Bu ders sizin yarıyılınızda değil.', 'error')
             return redirect(url_for('student_dashboard'))
         
-        # Dersin çakışma kontrolü
-        course_schedule = Schedule.query.filter_by(course_id=course.id).first()
-        if course_schedule:
-            for selected_course in current_user.selected_courses:
-                selected_schedule = Schedule.query.filter_by(course_id=selected_course.id).first()
-                if selected_schedule:
-                    if (selected_schedule.day == course_schedule.day and
-                        ((selected_schedule.start_time <= course_schedule.start_time < selected_schedule.end_time) or
-                         (selected_schedule.start_time < course_schedule.end_time <= selected_schedule.end_time))):
-                        flash('Uyarı: Bu ders seçtiğiniz başka bir dersle çakışıyor.', 'warning')
-                        break
-        # Dersi seç
-        db.session.execute(
-            student_course.insert().values(
-                student_id=current_user.id,
-                course_id=course.id,
-                semester=current_user.current_semester,
-                status='active'
-            )
-        )
+        # Öğrencinin programını tek sorguda yükle (gün bazlı aralık dizini)
+        timetable = StudentTimetable.for_student(current_user.id)
+        if course.id in timetable.course_ids:
+            flash('Bu dersi zaten seçtiniz.', 'error')
+            return redirect(url_for('student_dashboard'))
+        
+        # Dersin çakışma kontrolü (dersin tüm blokları programla karşılaştırılır)
+        conflicts = timetable.conflicts(course.id, course_blocks([course.id]).get(course.id, []))
+        if conflicts:
+            codes = sorted({other['course_code'] for _, other in conflicts})
+            flash(f"Uyarı: Bu ders seçtiğiniz başka bir dersle çakışıyor ({', '.join(codes)}).", 'warning')
+        # Dersi seç: koltuk atomik olarak alınır, kontenjan doluysa bekleme listesine eklenir
+        status = enroll(current_user.id, course.id, current_user.current_semester)
         db.session.commit()
-        flash('Ders başarıyla seçildi.', 'success')
+        if status == ENROLLED:
+            flash('Ders başarıyla seçildi.', 'success')
+        elif status == WAITLISTED:
+            position = waitlist_position(current_user.id, course.id)
+            flash(f'Bu dersin kontenjanı dolu. Bekleme listesine alındınız (sıranız: {position}).', 'warning')
+        elif status == ALREADY_WAITLISTED:
+            flash('Bu dersin bekleme listesindesiniz.', 'info')
+        else:
+            flash('Bu dersi zaten seçtiniz.', 'error')
         
     except Exception as e:
         db.session.rollback()
@@ -1680,6 +1929,34 @@ def select_course(course_id):
     
     return redirect(url_for('student_dashboard'))
 
+# Birden fazla dersi birlikte çakışma kontrolünden geçirme endpoint'i (dönem planlama)
+@app.route('/student/check_courses', methods=['GET', 'POST'])
+@login_required
+def check_student_courses():
+    """
+    Verilen derslerin öğrencinin programıyla ve birbirleriyle çakışmalarını kontrol eder
+    GET: ?course_ids=1,2,3
+    POST: {"course_ids": [1, 2, 3]}
+    Dersler verilen sırayla değerlendirilir; her ders sonraki dersler için programa eklenmiş sayılır.
+    """
+    if current_user.role != 'student':
+        return jsonify(success=False, error="Bu işlem için yetkiniz yok."), 403
+    
+    if request.method == 'POST':
+        course_ids = (request.get_json(silent=True) or {}).get('course_ids') or []
+    else:
+        course_ids = [value for value in request.args.get('course_ids', '').split(',') if value.strip()]
+    try:
+        course_ids = list(dict.fromkeys(int(course_id) for course_id in course_ids))
+    except (TypeError, ValueError):
+        return jsonify(success=False, error="Geçersiz ders listesi."), 400
+    if len(course_ids) > MAX_CHECK_COURSES:
+        return jsonify(success=False, error=f"En fazla {MAX_CHECK_COURSES} ders kontrol edilebilir."), 400
+    
+    results = check_courses(current_user.id, course_ids)
+    return jsonify(success=True, results=results,
+                   conflict_count=sum(len(result['conflicts']) for result in results))
+
 @app.route('/student/drop_course/<int:course_id>', methods=['POST'])
 @login_required
 def drop_course(course_id):
@@ -1694,14 +1971,14 @@ def drop_course(course_id):
         # Dersi bul
         course = Course.query.get_or_404(course_id)
         
-        # Dersin seçili olup olmadığını kontrol et
-        if course not in current_user.selected_courses:
+        # Dersi bırak; boşalan koltuk bekleme listesindeki ilk öğrenciye verilir
+        dropped, promoted = drop(current_user.id, course.id)
+        if not dropped:
             flash('Bu dersi seçmemişsiniz.', 'error')
             return redirect(url_for('student_dashboard'))
-        
-        # Dersi bırak
-        current_user.selected_courses.remove(course)
         db.session.commit()
+        if promoted:
+            print(f"{course.code}: bekleme listesinden derse alınan öğrenciler: {promoted}")
         flash('Ders başarıyla bırakıldı.', 'success')
         
     except Exception as e:
@@ -1711,6 +1988,23 @@ def drop_course(course_id):
     
     return redirect(url_for('student_dashboard'))
 
+@app.route('/student/leave_waitlist/<int:course_id>', methods=['POST'])
+@login_required
+def leave_course_waitlist(course_id):
+    """
+    Öğrencinin dersin bekleme listesinden çıkması
+    """
+    if current_user.role != 'student':
+        flash('Bu işlem için yetkiniz yok.', 'error')
+        return redirect(url_for('index'))
+    
+    if leave_waitlist(current_user.id, course_id):
+        db.session.commit()
+        flash('Bekleme listesinden çıkarıldınız.', 'success')
+    else:
+        flash('Bu dersin bekleme listesinde değilsiniz.', 'error')
+    return redirect(url_for('student_dashboard'))
+
 @app.route('/student/export_schedule')
 @login_required
 def export_student_schedule():
@@ -1738,7 +2032,7 @@ def export_student_schedule():
         # Verileri ekle
         row_num = 2
         for course in current_user.selected_courses:
-            schedule_items = Schedule.query.filter_by(course_id=course.id).all()
+            schedule_items = Schedule.query.filter(Schedule.course_id == course.id, live_schedule()).all()
             for item in schedule_items:
                 classroom = Classroom.query.get(item.classroom_id)
                 instructor = User.query.get(course.instructor_id) if course.instructor_id else None
@@ -1795,12 +2089,9 @@ def student_schedule():
         flash('Bu sayfaya erişim yetkiniz yok.', 'error')
         return redirect(url_for('index'))
     selected_courses = current_user.selected_courses
-    schedule_items = []
-    for course in selected_courses:
-        items = Schedule.query.filter_by(course_id=course.id).all()
-        schedule_items.extend(items)
-    days = ['Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma']
-    return render_template('student_schedule.html', selected_courses=selected_courses, schedule_items=schedule_items, days=days, Course=Course, Classroom=Classroom)
+    # Haftalık tablo önbellekteki hücrelerden oluşturulur (program sürümü değişene kadar sorgu yapılmaz)
+    grid, _ = course_grid(course.id for course in selected_courses)
+    return render_template('student_schedule.html', selected_courses=selected_courses, grid=grid, days=DAYS, hours=GRID_HOURS)
 
 # Ders için yoklama listesi Excel dosyası oluşturma endpoint'i
 @app.route('/export_attendance/<int:course_id>')
@@ -1929,120 +2220,25 @@ def import_courses():
                 flash('Lütfen Excel dosyası (.xlsx veya .xls) seçin', 'error')
                 return redirect(request.url)
             
-            # Dosyayı geçici bir dosyaya kaydet
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-            file.save(temp_file.name)
-            temp_file.close()
-            
-            # Excel dosyasını aç
-            wb = load_workbook(temp_file.name)
-            ws = wb.active
-            
-            # İşlenen ders sayıları
-            added_courses = 0
-            updated_courses = 0
-            added_instructors = 0
-            
-            # Excel dosyasını satır satır işle (2. satırdan başlayarak, başlıkları atla)
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                # Boş satırları atla
-                if not any(row):
-                    continue
-                
-                try:
-                    # Excel sütunlarını değişkenlere ata
-                    if len(row) < 7:
-                        continue  # Yetersiz veri, atla
-                        
-                    department_code = row[0]  # BÖLÜM
-                    semester = row[1]  # YARI YIL
-                    course_code = row[2]  # DERS KODU
-                    course_name = row[3]  # DERS ADI
-                    instructor_name = row[4]  # DERSİN ÖĞRETİM ÜYESİ
-                    course_type = row[5]  # DERSİN TÜRÜ
-                    capacity = row[6]  # DERSİN KONTENJANI
-                    
-                    # Bölümü kontrol et ve gerekirse oluştur
-                    department = Department.query.filter_by(code=department_code).first()
-                    if not department:
-                        department = Department(code=department_code, name=f"{department_code} Bölümü")
-                        db.session.add(department)
-                        db.session.commit()
-                    
-                    # Öğretim üyesi için kullanıcı adı oluştur (ad ilk 3 harf + soyad ilk 3 harf)
-                    if instructor_name and isinstance(instructor_name, str):
-                        name_parts = instructor_name.strip().split()
-                        if len(name_parts) >= 2:
-                            first_name = name_parts[0][:3].lower() if len(name_parts[0]) >= 3 else name_parts[0].lower()
-                            last_name = name_parts[-1][:3].lower() if len(name_parts[-1]) >= 3 else name_parts[-1].lower()
-                            username = f"{first_name}{last_name}"
-                            
-                            # Öğretim üyesini kontrol et ve gerekirse oluştur
-                            instructor = User.query.filter_by(username=username).first()
-                            if not instructor:
-                                instructor = User(
-                                    username=username, 
-                                    name=instructor_name,
-                                    role='instructor'
-                                )
-                                instructor.set_password('123')
-                                db.session.add(instructor)
-                                db.session.commit()
-                                added_instructors += 1
-                        else:
-                            instructor = None
-                    else:
-                        instructor = None
-                    
-                    # Ders türünü standart formata çevir
-                    course_type_normalized = 'yüzyüze' if course_type and 'YÜZ' in course_type.upper() else 'online'
-                    
-                    # Dersi kontrol et
-                    course = Course.query.filter_by(code=course_code).first()
-                    
-                    if course:
-                        # Ders varsa güncelle
-                        course.name = course_name
-                        course.semester = int(semester) if isinstance(semester, (int, float)) else 1
-                        course.instructor_id = instructor.id if instructor else None
-                        course.course_type = course_type_normalized
-                        course.capacity = int(capacity) if isinstance(capacity, (int, float)) else 30
-                        
-                        # Bölüm ilişkisini kontrol et ve ekle
-                        if department not in course.departments:
-                            course.departments.append(department)
-                        
-                        updated_courses += 1
-                    else:
-                        # Ders yoksa oluştur
-                        course = Course(
-                            code=course_code,
-                            name=course_name,
-                            theory=2,  # Varsayılan değerler
-                            practice=0,
-                            credits=3,
-                            semester=int(semester) if isinstance(semester, (int, float)) else 1,
-                            instructor_id=instructor.id if instructor else None,
-                            course_type=course_type_normalized,
-                            capacity=int(capacity) if isinstance(capacity, (int, float)) else 30
-                        )
-                        
-                        # Bölüm ilişkisi ekle
-                        course.departments.append(department)
-                        
-                        db.session.add(course)
-                        added_courses += 1
-                        
-                    db.session.commit()
-                    
-                except Exception as row_error:
-                    print(f"Satır işlenirken hata: {str(row_error)}")
-                    continue  # Hatalı satırı atla ve devam et
-            
-            # Geçici dosyayı sil
-            os.unlink(temp_file.name)
+            # Dosyayı akış halinde oku ve tüm satırları tek işlemde içe aktar
+            try:
+                report = import_course_rows(read_rows(file.stream))
+                if report['added_courses'] or report['updated_courses']:
+                    bump_schedule_version()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            
+            message = (f"Excel içe aktarma tamamlandı: {report['added_courses']} ders eklendi, "
+                       f"{report['updated_courses']} ders güncellendi, "
+                       f"{report['added_instructors']} öğretim üyesi eklendi.")
+            if report['errors']:
+                # Hatalı satırlar atlandı; satır bazlı raporu göster
+                flash(f"{message} {len(report['errors'])} satır hatalı olduğu için atlandı.", 'warning')
+                return render_template('import_courses.html', report=report)
             
-            flash(f'Excel içe aktarma tamamlandı: {added_courses} ders eklendi, {updated_courses} ders güncellendi, {added_instructors} öğretim üyesi eklendi.', 'success')
+            flash(message, 'success')
             return redirect(url_for('courses'))
             
         except Exception as e:
@@ -2082,204 +2278,45 @@ def import_students():
                 flash('Lütfen Excel dosyası (.xlsx veya .xls) seçin', 'error')
                 return redirect(request.url)
             
-            # Dosyayı geçici bir dosyaya kaydet
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-            file.save(temp_file.name)
-            temp_file.close()
-            
-            # Excel dosyasını aç
-            print("\n=== Excel Dosyası Açılıyor ===")
+            # Dosyayı akış halinde oku: ders bilgileri ve öğrenci numarası sütunu tek geçişte ayrıştırılır
             try:
-                wb = load_workbook(temp_file.name)
-                ws = wb.active
+                class_list = parse_class_list(read_rows(file.stream, min_row=1))
             except Exception as excel_error:
                 print(f"Excel dosyası açılırken hata: {str(excel_error)}")
                 flash(f'Excel dosyası açılırken hata: {str(excel_error)}', 'error')
                 return redirect(request.url)
             
-            # İşleme sonuçları için sayaçlar
-            added_course = False
-            added_students = 0
-            existing_students = 0
-            
-            # Debug bilgileri 
-            print("\n=== Excel İçe Aktarma Başlıyor ===")
-            print(f"Excel dosyası satır sayısı: {ws.max_row}")
-            print(f"Excel dosyası sütun sayısı: {ws.max_column}")
-            
-            # Ders bilgilerini oku (A1-G2 hücreleri)
-            department_code = ws.cell(row=2, column=1).value  # BÖLÜM
-            semester = ws.cell(row=2, column=2).value  # YARI YIL
-            course_code = ws.cell(row=2, column=3).value  # DERS KODU
-            course_name = ws.cell(row=2, column=4).value  # DERS ADI
-            instructor_name = ws.cell(row=2, column=5).value  # DERSİN ÖĞRETİM ÜYESİ
-            course_type = ws.cell(row=2, column=6).value  # DERSİN TÜRÜ
-            capacity = ws.cell(row=2, column=7).value  # DERSİN KONTENJANI
-            
-            print(f"Okunan ders bilgileri: Bölüm={department_code}, Yarıyıl={semester}, Kod={course_code}, Ad={course_name}")
-            
-            if not course_code or not course_name:
-                flash('Excel dosyasında ders bilgileri bulunamadı', 'error')
-                return redirect(request.url)
-            
-            # Bölümü kontrol et ve gerekirse oluştur
-            department = Department.query.filter_by(code=department_code).first()
-            if not department:
-                department = Department(code=department_code, name=f"{department_code} Bölümü")
-                db.session.add(department)
-                db.session.commit()
-                print(f"Yeni bölüm oluşturuldu: {department_code}")
-            else:
-                print(f"Mevcut bölüm kullanılıyor: {department_code}")
-            
-            # Öğretim üyesini kontrol et ve gerekirse oluştur
-            instructor = None
-            if instructor_name and isinstance(instructor_name, str):
-                # İsim formatından kullanıcı adı oluştur
-                name_parts = instructor_name.strip().split()
-                if len(name_parts) >= 2:
-                    first_name = name_parts[0][:3].lower() if len(name_parts[0]) >= 3 else name_parts[0].lower()
-                    last_name = name_parts[-1][:3].lower() if len(name_parts[-1]) >= 3 else name_parts[-1].lower()
-                    username = f"{first_name}{last_name}"
-                    
-                    instructor = User.query.filter_by(username=username).first()
-                    if not instructor:
-                        instructor = User(
-                            username=username, 
-                            name=instructor_name,
-                            role='instructor'
-                        )
-                        instructor.set_password('123')
-                        db.session.add(instructor)
-                        db.session.commit()
-                        print(f"Yeni öğretim üyesi oluşturuldu: {instructor_name}")
-                    else:
-                        print(f"Mevcut öğretim üyesi kullanılıyor: {instructor_name}")
-            
-            # Ders türünü standart formata çevir
-            course_type_normalized = 'yüzyüze' if course_type and 'YÜZ' in str(course_type).upper() else 'online'
-            
-            # Dersi kontrol et ve gerekirse oluştur veya güncelle
-            course = Course.query.filter_by(code=course_code).first()
-            if not course:
-                course = Course(
-                    code=course_code,
-                    name=course_name,
-                    theory=2,  # Varsayılan değerler
-                    practice=0,
-                    credits=3,
-                    semester=int(semester) if isinstance(semester, (int, float)) else 1,
-                    instructor_id=instructor.id if instructor else None,
-                    course_type=course_type_normalized,
-                    capacity=int(capacity) if isinstance(capacity, (int, float)) else 30
-                )
-                course.departments.append(department)
-                db.session.add(course)
-                db.session.commit()
-                added_course = True
-                print(f"Yeni ders oluşturuldu: {course_code} - {course_name}")
-            else:
-                # Ders varsa güncelle
-                course.name = course_name
-                course.semester = int(semester) if isinstance(semester, (int, float)) else course.semester
-                if instructor:
-                    course.instructor_id = instructor.id
-                course.course_type = course_type_normalized
-                course.capacity = int(capacity) if isinstance(capacity, (int, float)) else course.capacity
-                
-                # Bölüm ilişkisini kontrol et ve ekle
-                if department not in course.departments:
-                    course.departments.append(department)
-                
+            # Ders, öğrenciler ve ders kayıtları tek işlemde yazılır
+            try:
+                report = import_class_list(class_list)
+                bump_schedule_version()
                 db.session.commit()
-                print(f"Mevcut ders güncellendi: {course_code} - {course_name}")
-            
-            # ÖĞRENCİ LİSTESİNİ OKUMA STRATEJİSİ DEĞİŞTİRİLDİ
-            # Dosyayı tamamen tarayıp, öğrenci numarası olabilecek değerleri tespit edelim
-            print("\n=== Öğrenci Listesi Taranıyor (Yeni Yöntem) ===")
-            
-            # Excel dosyasında muhtemel öğrenci numaralarını bul (5 veya 6 haneli sayılar)
-            student_numbers = []
-            
-            # Excel dosyasını tamamen tara
-            for row in range(1, ws.max_row + 1):
-                for col in range(1, ws.max_column + 1):
-                    cell_value = ws.cell(row=row, column=col).value
-                    
-                    # Değer var mı kontrol et
-                    if cell_value:
-                        # Sayısal bir değer veya sayısal görünümlü string mi?
-                        try:
-                            # Önce string'e çevir, sonra temizle
-                            str_value = str(cell_value).strip()
-                            
-                            # 5 veya 6 haneli bir sayı mı?
-                            if str_value.isdigit() and (len(str_value) == 5 or len(str_value) == 6):
-                                print(f"Muhtemel öğrenci numarası bulundu: Satır {row}, Sütun {col}, Değer: {str_value}")
-                                student_numbers.append(str_value)
-                                
-                        except Exception as value_error:
-                            # Değer dönüştürme hatası, bu hücreyi atla
-                            continue
-            
-            print(f"Tespit edilen muhtemel öğrenci numarası sayısı: {len(student_numbers)}")
-            
-            # Bulunan öğrenci numaralarını sisteme ekle
-            for student_no in student_numbers:
-                # Varsayılan öğrenci adı oluştur
-                student_name = f"Öğrenci {student_no}"
-                
-                # Öğrenciyi kontrol et, yoksa oluştur
-                student = User.query.filter_by(student_number=student_no).first()
-                if not student:
-                    student = User(
-                        username=student_no,  # Kullanıcı adı öğrenci numarası
-                        name=student_name,
-                        role='student',
-                        student_number=student_no,
-                        department_id=department.id,
-                        current_semester=int(semester) if isinstance(semester, (int, float)) else 1
-                    )
-                    student.set_password('123')  # Şifre 123
-                    db.session.add(student)
-                    db.session.commit()
-                    added_students += 1
-                    print(f"Yeni öğrenci eklendi: {student_no} - {student_name}")
-                else:
-                    existing_students += 1
-                    print(f"Mevcut öğrenci: {student_no} - {student.name}")
-                
-                # Öğrenciyi derse kaydet (eğer henüz kayıtlı değilse)
-                if course not in student.selected_courses:
-                    try:
-                        # student_course tablosuna doğrudan ekle - semester alanını da ekleyerek
-                        db.session.execute(
-                            student_course.insert().values(
-                                student_id=student.id,
-                                course_id=course.id,
-                                semester=int(semester) if isinstance(semester, (int, float)) else 1,
-                                status='active'
-                            )
-                        )
-                        db.session.commit()
-                        print(f"Öğrenci {student_no} derse kaydedildi: {course_code}")
-                    except Exception as e:
-                        # Hata durumunda rollback yap
-                        db.session.rollback()
-                        print(f"Öğrenci derse eklenirken hata: {str(e)}")
-            
-            # Geçici dosyayı sil
-            os.unlink(temp_file.name)
+            except ValueError as e:
+                db.session.rollback()
+                flash(str(e), 'error')
+                return redirect(request.url)
+            except Exception:
+                db.session.rollback()
+                raise
             
             # Özet bilgileri yazdır
             print("\n=== İçe Aktarma Özeti ===")
-            print(f"Ders durumu: {course_code} {'eklendi' if added_course else 'güncellendi'}")
-            print(f"Yeni öğrenci sayısı: {added_students}")
-            print(f"Mevcut öğrenci sayısı: {existing_students}")
+            print(f"Ders durumu: {report['course_code']} {'eklendi' if report['added_course'] else 'güncellendi'}")
+            print(f"Yeni öğrenci sayısı: {report['added_students']}")
+            print(f"Mevcut öğrenci sayısı: {report['existing_students']}")
+            print(f"Derse kaydedilen öğrenci sayısı: {report['enrolled_students']}")
             
             # Başarı mesajı göster
-            course_status = "eklendi" if added_course else "güncellendi"
-            flash(f'İçe aktarma tamamlandı: {course_code} dersi {course_status}, {added_students} yeni öğrenci eklendi, {existing_students} mevcut öğrenci derse kaydedildi.', 'success')
+            course_status = "eklendi" if report['added_course'] else "güncellendi"
+            message = (f"İçe aktarma tamamlandı: {report['course_code']} dersi {course_status}, "
+                       f"{report['added_students']} yeni öğrenci eklendi, "
+                       f"{report['existing_students']} mevcut öğrenci derse kaydedildi.")
+            if report['errors']:
+                # Hatalı satırlar atlandı; satır bazlı raporu göster
+                flash(f"{message} {len(report['errors'])} satır hatalı olduğu için atlandı.", 'warning')
+                return render_template('import_students.html', report=report)
+            
+            flash(message, 'success')
             return redirect(url_for('courses'))
             
         except Exception as e:
@@ -2293,7 +2330,148 @@ def import_students():
     
     return render_template('import_students.html')
 
+# Birden fazla sınıf listesini tek seferde içeri aktarma endpoint'i
+@app.route('/import_students/batch', methods=['GET', 'POST'])
+@admin_required
+def import_students_batch():
+    """
+    Birden fazla Excel dosyasından (veya zip arşivinden) sınıf listelerini içeri aktarır
+    Her dosyanın her sayfası ayrı bir sınıf listesi olarak paralel ayrıştırılır; tüm
+    dersler, öğrenciler ve ders kayıtları tek işlemde yazılır.
+    GET: İçe aktarma formunu göster
+    POST: Dosyaları işle ve dosya/sayfa bazlı özeti göster
+    """
+    if request.method == 'POST':
+        try:
+            files, skipped = collect_class_list_files(request.files.getlist('excel_files'))
+            if not files and not skipped:
+                flash('Lütfen en az bir Excel (.xlsx) veya zip dosyası seçin', 'error')
+                return redirect(request.url)
+            
+            # Dosyaları paralel ayrıştır
+            sheets = parse_class_list_files(files)
+            parsed = [sheet for sheet in sheets if sheet['class_list'] is not None]
+            
+            # Tüm listeleri birleştirip tek işlemde yaz
+            try:
+                reports = import_class_lists([sheet['class_list'] for sheet in parsed])
+                if any(report['course_code'] and not report['error'] for report in reports):
+                    bump_schedule_version()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            
+            # Dosya/sayfa bazlı özet
+            for sheet, report in zip(parsed, reports):
+                sheet.update(report)
+            summary = sheets + [{'file': filename, 'sheet': None, 'error': 'Desteklenmeyen dosya türü'} for filename in skipped]
+            
+            imported = [row for row in summary if not row['error']]
+            print("\n=== Toplu İçe Aktarma Özeti ===")
+            print(f"Dosya sayısı: {len(files)}, sayfa sayısı: {len(sheets)}, içe aktarılan liste sayısı: {len(imported)}")
+            
+            flash(f"Toplu içe aktarma tamamlandı: {len(imported)} sınıf listesi içe aktarıldı, "
+                  f"{sum(row['added_students'] for row in imported)} yeni öğrenci eklendi, "
+                  f"{sum(row['enrolled_students'] for row in imported)} ders kaydı oluşturuldu.",
+                  'success' if len(imported) == len(summary) else 'warning')
+            return render_template('import_students_batch.html', summary=summary)
+            
+        except Exception as e:
+            flash(f'Toplu içe aktarma sırasında bir hata oluştu: {str(e)}', 'error')
+            print(f"\n=== Hata ===")
+            print(f"Hata mesajı: {str(e)}")
+            print(f"Hata türü: {type(e).__name__}")
+            print("============\n")
+    
+    return render_template('import_students_batch.html')
+
 # Uygulama başlangıç kontrollerini yap ve sunucuyu başlat
+def migrate_time_columns(inspector):
+    """
+    schedule_items ve unavailable_times tablolarına day_index, start_minute, end_minute
+    sütunlarını ekler, mevcut HH:MM kayıtlarından doldurur ve çakışma indekslerini oluşturur
+    (bkz. migrate_schedule_times.py)
+    """
+    for model in (Schedule, UnavailableTime):
+        table = model.__tablename__
+        
+        # Sütunlar tek tek kontrol edilir; yarıda kalmış bir önceki çalıştırma tamamlanır
+        columns = [c['name'] for c in inspector.get_columns(table)]
+        for column in ('day_index', 'start_minute', 'end_minute'):
+            if column not in columns:
+                with db.engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER"))
+                print(f"{table} tablosuna {column} sütunu eklendi.")
+        
+        # Boş kalan tamsayı sütunlarını metin sütunlarından doldur
+        with db.engine.begin() as conn:
+            rows = conn.execute(text(
+                f"SELECT id, day, start_time, end_time FROM {table} "
+                f"WHERE day_index IS NULL OR start_minute IS NULL OR end_minute IS NULL"
+            )).all()
+            if rows:
+                conn.execute(
+                    text(f"UPDATE {table} SET day_index = :day_index, start_minute = :start_minute, "
+                         f"end_minute = :end_minute WHERE id = :id"),
+                    [dict(id=row.id, **time_fields(row.day, row.start_time, row.end_time)) for row in rows]
+                )
+                print(f"{table} tablosunda {len(rows)} kaydın tamsayı zaman sütunları dolduruldu.")
+        create_indexes(model, db.engine)
+
+def migrate_enrollment(inspector):
+    """
+    courses tablosuna enrolled_count sütununu ekler ve mevcut ders kayıtlarından doldurur
+    (course_waitlist tablosu db.create_all ile oluşturulur; bkz. migrate_enrollment.py)
+    """
+    if 'enrolled_count' not in [c['name'] for c in inspector.get_columns('courses')]:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE courses ADD COLUMN enrolled_count INTEGER NOT NULL DEFAULT 0"))
+        sync_enrolled_counts()
+        db.session.commit()
+        print("courses tablosuna enrolled_count sütunu eklendi ve dolduruldu.")
+
+def migrate_schedule_jobs(inspector):
+    """
+    schedule_jobs tablosuna heartbeat_at sütununu ekler ve canlılık sinyali kesilmiş
+    (sunucu kapanırken yarıda kalmış) işleri 'failed' olarak işaretler
+    """
+    if 'heartbeat_at' not in [c['name'] for c in inspector.get_columns('schedule_jobs')]:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE schedule_jobs ADD COLUMN heartbeat_at DATETIME"))
+        print("schedule_jobs tablosuna heartbeat_at sütunu eklendi.")
+    stale = fail_stale_schedule_jobs()
+    db.session.commit()
+    if stale:
+        print(f"Yarıda kalmış {stale} program oluşturma işi 'failed' olarak işaretlendi.")
+
+def migrate_schedule_versions(inspector):
+    """
+    Program sürümlerine geçiş: schedule_items ve schedule_state tablolarına sürüm sütunlarını
+    ekler, sürümsüz mevcut program öğelerini yayındaki ilk sürüm olarak kaydeder
+    (schedule_versions tablosu db.create_all ile oluşturulur; bkz. migrate_schedule_versions.py)
+    """
+    if 'version_id' not in [c['name'] for c in inspector.get_columns('schedule_items')]:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE schedule_items ADD COLUMN version_id INTEGER REFERENCES schedule_versions(id)"))
+        print("schedule_items tablosuna version_id sütunu eklendi.")
+    if 'active_version_id' not in [c['name'] for c in inspector.get_columns('schedule_state')]:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE schedule_state ADD COLUMN active_version_id INTEGER REFERENCES schedule_versions(id)"))
+        print("schedule_state tablosuna active_version_id sütunu eklendi.")
+    create_indexes(Schedule, db.engine)
+
+    # Sürümsüz öğeleri yayındaki ilk sürüme bağla
+    if active_version_id() is None and Schedule.query.filter(Schedule.version_id.is_(None)).count():
+        version = ScheduleVersion(status='draft', message='Sürümlemeden önceki program')
+        db.session.add(version)
+        db.session.flush()
+        Schedule.query.filter(Schedule.version_id.is_(None)).update({'version_id': version.id},
+                                                                     synchronize_session=False)
+        publish_version(version.id)
+        db.session.commit()
+        print(f"Mevcut program {version.id} numaralı sürüm olarak yayınlandı.")
+
 if __name__ == '__main__':
     """
     Uygulama başlatıldığında çalışır
@@ -2322,8 +2500,25 @@ if __name__ == '__main__':
                     conn.execute(text("ALTER TABLE courses ADD COLUMN semester INTEGER DEFAULT 1"))
                 print("courses tablosuna semester sütunu eklendi.")
         except Exception as e:
+            db.session.rollback()
             print(f"Migrasyon hatası: {str(e)}")
         
+        # Sonraki migrasyonlar birbirinden bağımsızdır; biri başarısız olursa diğerleri yine çalışır.
+        # Sürüm migrasyonu program öğelerini ORM ile sorguladığından zaman sütunlarından sonra gelir.
+        migrations = [
+            (migrate_time_columns, 'tamsayı zaman sütunları'),
+            (migrate_enrollment, 'ders kayıt sayaçları'),
+            (migrate_schedule_versions, 'program sürümleri'),
+            (migrate_schedule_jobs, 'program oluşturma işleri'),
+        ]
+        for migrate, name in migrations:
+            try:
+                # Her migrasyon tabloların güncel hâlini görmelidir (inspector sonuçları önbelleğe alır)
+                migrate(inspect(db.engine))
+            except Exception as e:
+                db.session.rollback()
+                print(f"Migrasyon hatası ({name}): {str(e)}")
+        
         # Admin kullanıcısı oluştur (yoksa)
         admin = User.query.filter_by(username='admin').first()
         if not admin:
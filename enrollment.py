@@ -0,0 +1,305 @@
+from bisect import bisect_left
+
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Schedule, Course, CourseWaitlist, student_course
+from timetable import live_schedule
+
+# =====================================================================================
+# Öğrenci Ders Seçimi
+# Öğrencinin haftalık programı tek sorguda yüklenir ve her gün için başlangıç
+# dakikasına göre sıralı bir aralık dizinine (interval index) yerleştirilir. Yeni bir
+# dersin tüm blokları bu dizine karşı kontrol edilir; birden fazla ders birlikte
+# kontrol edilirken her ders kontrol edildikten sonra dizine eklenir, böylece
+# seçilecek derslerin kendi aralarındaki çakışmalar da bulunur.
+# =====================================================================================
+
+# Tek istekte birlikte kontrol edilebilecek en fazla ders sayısı
+MAX_CHECK_COURSES = 50
+
+
+def schedule_blocks(query):
+    """
+    Program öğesi sorgusunu blok sözlüklerine çevirir
+    :return: {ders_id: [blok, ...]}; blok = {'course_id', 'course_code', 'day', 'day_index',
+             'start_time', 'end_time', 'start_minute', 'end_minute'}
+    """
+    blocks = {}
+    for row in query:
+        blocks.setdefault(row.course_id, []).append(dict(row._mapping))
+    return blocks
+
+
+def block_query():
+    """Yayındaki programdan blok sözlükleri için gereken sütunları seçen temel sorgu"""
+    return db.session.query(
+        Schedule.course_id, Course.code.label('course_code'), Schedule.day, Schedule.day_index,
+        Schedule.start_time, Schedule.end_time, Schedule.start_minute, Schedule.end_minute
+    ).join(Course, Course.id == Schedule.course_id).filter(live_schedule())
+
+
+def course_blocks(course_ids):
+    """
+    Derslerin tüm program bloklarını tek sorguda yükler
+    :return: {ders_id: [blok, ...]}; programı olmayan dersler sözlükte yer almaz
+    """
+    if not course_ids:
+        return {}
+    return schedule_blocks(block_query().filter(Schedule.course_id.in_(list(course_ids))))
+
+
+class StudentTimetable:
+    """
+    Öğrencinin haftalık programı için gün bazlı aralık dizini
+    Her gün için bloklar başlangıç dakikasına göre sıralı tutulur; bir aralıkla
+    çakışan bloklar ikili arama (bisect) ile daraltılan aday listesinden bulunur.
+    """
+
+    def __init__(self, blocks=()):
+        self.starts = {}  # gün -> sıralı başlangıç dakikaları
+        self.blocks = {}  # gün -> başlangıca göre sıralı bloklar
+        self.course_ids = set()
+        for block in blocks:
+            self.add_block(block)
+
+    @classmethod
+    def for_student(cls, student_id):
+        """Öğrencinin seçtiği dersleri ve bu derslerin tüm bloklarını yükleyerek dizini oluşturur"""
+        query = block_query().join(student_course, student_course.c.course_id == Schedule.course_id) \
+            .filter(student_course.c.student_id == student_id)
+        timetable = cls(block for blocks in schedule_blocks(query).values() for block in blocks)
+        timetable.course_ids.update(course_id for course_id, in db.session.query(student_course.c.course_id)
+                                    .filter(student_course.c.student_id == student_id))
+        return timetable
+
+    def add_block(self, block):
+        day = block['day_index']
+        starts = self.starts.setdefault(day, [])
+        index = bisect_left(starts, block['start_minute'])
+        starts.insert(index, block['start_minute'])
+        self.blocks.setdefault(day, []).insert(index, block)
+        self.course_ids.add(block['course_id'])
+
+    def add_course(self, course_id, blocks):
+        """Dersi ve bloklarını dizine ekler"""
+        self.course_ids.add(course_id)
+        for block in blocks:
+            self.add_block(block)
+
+    def overlapping(self, day, start, end):
+        """Verilen gün ve [start, end) aralığıyla çakışan blokları döndürür"""
+        starts = self.starts.get(day)
+        if not starts:
+            return []
+        # Yalnızca aralık bitmeden başlayan bloklar çakışabilir
+        return [block for block in self.blocks[day][:bisect_left(starts, end)] if block['end_minute'] > start]
+
+    def conflicts(self, course_id, blocks):
+        """
+        Bir dersin tüm bloklarını programla karşılaştırır
+        :return: [(dersin bloğu, çakışan blok), ...]
+        """
+        found = []
+        for block in blocks:
+            for other in self.overlapping(block['day_index'], block['start_minute'], block['end_minute']):
+                if other['course_id'] != course_id:
+                    found.append((block, other))
+        return found
+
+
+def conflict_summary(block, other):
+    """Çakışmayı JSON'a çevrilebilir sözlük olarak döndürür"""
+    return {
+        'course_code': other['course_code'],
+        'course_id': other['course_id'],
+        'day': block['day'],
+        'start_time': block['start_time'],
+        'end_time': block['end_time'],
+        'other_start_time': other['start_time'],
+        'other_end_time': other['end_time']
+    }
+
+
+def check_courses(student_id, course_ids):
+    """
+    Öğrenci için birden fazla dersi birlikte kontrol eder (dönem planlama)
+    Öğrencinin programı ve kontrol edilecek derslerin blokları ders sayısından
+    bağımsız olarak sabit sayıda sorguda yüklenir. Dersler verilen sırayla kontrol edilir ve her ders sonraki dersler
+    için programa eklenir.
+    :param course_ids: Kontrol edilecek ders ID'leri (sırası önemlidir)
+    :return: Her ders için {'course_id', 'selected', 'scheduled', 'conflicts': [...]} listesi
+    """
+    timetable = StudentTimetable.for_student(student_id)
+    blocks = course_blocks(course_ids)
+    results = []
+    for course_id in course_ids:
+        selected = course_id in timetable.course_ids
+        course = blocks.get(course_id, [])
+        conflicts = [] if selected else timetable.conflicts(course_id, course)
+        results.append({
+            'course_id': course_id,
+            'selected': selected,
+            'scheduled': bool(course),
+            'conflicts': [conflict_summary(block, other) for block, other in conflicts]
+        })
+        if not selected:
+            timetable.add_course(course_id, course)
+    return results
+
+
+# =====================================================================================
+# Kayıt Motoru
+# Kontenjan courses.enrolled_count sayacı üzerinden yönetilir. Koltuk, tek bir koşullu
+# UPDATE ile alınır (enrolled_count < capacity); veritabanı satır kilidi sayesinde aynı
+# derse eşzamanlı gelen istekler kontenjanı aşamaz. Sayaç her zaman student_course
+# eklemesinden önce güncellenir: ders satırının kilidi önce alındığından, yabancı anahtar
+# kontrolünün aldığı paylaşımlı kilitle kilitlenme (deadlock) oluşmaz.
+# Fonksiyonlar commit etmez; çağıran işlem commit ettiğinde koltuk kesinleşir.
+# =====================================================================================
+
+# enroll() sonuçları
+ENROLLED = 'enrolled'
+WAITLISTED = 'waitlisted'
+ALREADY_ENROLLED = 'already_enrolled'
+ALREADY_WAITLISTED = 'already_waitlisted'
+
+
+def take_seat(course_id):
+    """
+    Derste boş koltuk varsa sayacı atomik olarak bir artırır
+    Kontenjanı tanımlı olmayan (NULL) derslerde sınır yoktur.
+    :return: Koltuk alındıysa True
+    """
+    result = db.session.execute(
+        update(Course).where(
+            Course.id == course_id,
+            or_(Course.capacity.is_(None), Course.enrolled_count < Course.capacity)
+        ).values(enrolled_count=Course.enrolled_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def release_seat(course_id):
+    """Dersin kayıt sayacını bir azaltır"""
+    db.session.execute(
+        update(Course).where(Course.id == course_id, Course.enrolled_count > 0)
+        .values(enrolled_count=Course.enrolled_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def enroll(student_id, course_id, semester):
+    """
+    Öğrenciyi derse kaydeder; kontenjan doluysa bekleme listesine ekler
+    Her adım bir kayıt noktası (SAVEPOINT) içinde yapılır; aynı öğrencinin tekrar
+    eden istekleri birincil anahtar/unique kısıtına takılır ve yalnızca o adım geri alınır.
+    :return: ENROLLED, WAITLISTED, ALREADY_ENROLLED veya ALREADY_WAITLISTED
+    """
+    try:
+        with db.session.begin_nested():
+            if take_seat(course_id):
+                db.session.execute(insert(student_course).values(
+                    student_id=student_id, course_id=course_id, semester=semester, status='active'))
+                return ENROLLED
+    except IntegrityError:
+        return ALREADY_ENROLLED
+
+    if db.session.query(student_course.c.student_id).filter(
+            student_course.c.student_id == student_id, student_course.c.course_id == course_id).first():
+        return ALREADY_ENROLLED
+    try:
+        with db.session.begin_nested():
+            db.session.add(CourseWaitlist(student_id=student_id, course_id=course_id, semester=semester))
+    except IntegrityError:
+        return ALREADY_WAITLISTED
+    return WAITLISTED
+
+
+def promote_waitlist(course_id):
+    """
+    Boş koltuk oldukça bekleme listesindeki en eski öğrencileri derse kaydeder
+    Sıradaki kayıt FOR UPDATE ile kilitlenir; aynı kaydı iki işlem birden alamaz.
+    :return: Derse alınan öğrenci ID'leri
+    """
+    promoted = []
+    while True:
+        entry = db.session.execute(
+            select(CourseWaitlist.id, CourseWaitlist.student_id, CourseWaitlist.semester)
+            .where(CourseWaitlist.course_id == course_id)
+            .order_by(CourseWaitlist.id).limit(1).with_for_update()
+        ).first()
+        if entry is None:
+            break
+        try:
+            with db.session.begin_nested():
+                if not take_seat(course_id):
+                    break
+                db.session.execute(insert(student_course).values(
+                    student_id=entry.student_id, course_id=course_id, semester=entry.semester, status='active'))
+                promoted.append(entry.student_id)
+        except IntegrityError:
+            pass  # Öğrenci bu arada derse kaydolmuş; yalnızca bekleme kaydı silinir
+        db.session.execute(delete(CourseWaitlist).where(CourseWaitlist.id == entry.id))
+    return promoted
+
+
+def drop(student_id, course_id):
+    """
+    Öğrencinin ders kaydını siler ve boşalan koltuğu bekleme listesine verir
+    :return: (kayıt silindiyse True, derse alınan öğrenci ID'leri)
+    """
+    result = db.session.execute(
+        delete(student_course).where(student_course.c.student_id == student_id,
+                                     student_course.c.course_id == course_id)
+    )
+    if not result.rowcount:
+        return False, []
+    release_seat(course_id)
+    return True, promote_waitlist(course_id)
+
+
+def leave_waitlist(student_id, course_id):
+    """Öğrenciyi dersin bekleme listesinden çıkarır; çıkarıldıysa True döner"""
+    result = db.session.execute(
+        delete(CourseWaitlist).where(CourseWaitlist.student_id == student_id,
+                                     CourseWaitlist.course_id == course_id)
+    )
+    return bool(result.rowcount)
+
+
+def waitlist_position(student_id, course_id):
+    """Öğrencinin bekleme listesindeki sırasını döndürür (listede değilse None)"""
+    entry_id = db.session.query(CourseWaitlist.id).filter_by(student_id=student_id, course_id=course_id).scalar()
+    if entry_id is None:
+        return None
+    return db.session.query(func.count(CourseWaitlist.id)).filter(
+        CourseWaitlist.course_id == course_id, CourseWaitlist.id <= entry_id).scalar()
+
+
+def student_waitlist(student_id):
+    """Öğrencinin bekleme listesindeki derslerini sıralarıyla döndürür: {ders_id: sıra}"""
+    ahead = db.aliased(CourseWaitlist)
+    position = select(func.count(ahead.id)).where(
+        ahead.course_id == CourseWaitlist.course_id, ahead.id <= CourseWaitlist.id
+    ).scalar_subquery()
+    return dict(db.session.query(CourseWaitlist.course_id, position)
+                .filter(CourseWaitlist.student_id == student_id))
+
+
+def sync_enrolled_counts(course_ids=None):
+    """
+    Kayıt sayaçlarını student_course tablosundan yeniden hesaplar
+    Toplu içe aktarma veya kullanıcı silme gibi sayacı atlayan yazmalardan sonra
+    ve migrasyonda (ilk doldurma) kullanılır.
+    :param course_ids: Yalnızca bu dersler (varsayılan: tüm dersler)
+    """
+    count = select(func.count()).select_from(student_course) \
+        .where(student_course.c.course_id == Course.id).scalar_subquery()
+    stmt = update(Course).values(enrolled_count=count).execution_options(synchronize_session=False)
+    if course_ids is not None:
+        if not course_ids:
+            return
+        stmt = stmt.where(Course.id.in_(list(course_ids)))
+    db.session.execute(stmt)
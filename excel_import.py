@@ -0,0 +1,584 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import io
+import os
+import re
+import threading
+import zipfile
+
+from openpyxl import load_workbook
+from sqlalchemy import insert, or_
+from sqlalchemy.dialects import mysql, sqlite
+
+from models import db, User, Department, Course, course_department, student_course, default_password_hash
+from enrollment import sync_enrolled_counts
+
+# =====================================================================================
+# Excel İçe Aktarma
+# İçe aktarma üç aşamada yapılır:
+#   1. Okuma: Çalışma kitabı read_only kipinde açılır, satırlar sırayla (values_only) okunur
+#   2. Hazırlama: Satırlar doğrulanır; mevcut kayıtlar tek seferde sözlüklere yüklenir
+#   3. Uygulama: Eklemeler/güncellemeler toplu (insert ... values([...])) yapılır
+# Uygulama aşaması commit etmez; tüm değişiklikler çağıranın tek işleminde commit edilir.
+# Hatalı satırlar atlanır ve satır numarasıyla birlikte rapora eklenir.
+# =====================================================================================
+
+# Tek bir toplu eklemede gönderilecek en fazla satır sayısı
+IMPORT_CHUNK_SIZE = 1000
+
+# Yüklenen zip arşivleri için sınırlar (sıkıştırılmamış boyutlar); arşiv üyeleri okunmadan
+# önce başlık bilgisiyle, okunurken gerçek boyutla kontrol edilir
+MAX_ARCHIVE_FILES = 200
+MAX_ARCHIVE_FILE_BYTES = 20 * 1024 * 1024
+MAX_ARCHIVE_TOTAL_BYTES = 200 * 1024 * 1024
+
+# Sınıf listelerini ayrıştıran paylaşılan işlem havuzunun en fazla işlem sayısı
+PARSE_WORKERS = min(os.cpu_count() or 1, 4)
+
+# Ders dosyası sütunları: BÖLÜM, YARI YIL, DERS KODU, DERS ADI, ÖĞRETİM ÜYESİ, TÜR, KONTENJAN
+COURSE_COLUMNS = 7
+
+# Öğrenci numarası: 5 veya 6 haneli sayı, ardından isteğe bağlı ad soyad (örn: "111017 Ahmet Yılmaz")
+STUDENT_NUMBER_PATTERN = re.compile(r'^(\d{5,6})(?:\s+(.*))?$')
+
+# Sınıf listesinde öğrenci numarası ve ad sütunlarını belirten başlıklar
+STUDENT_NUMBER_HEADERS = {'SINIF LİSTESİ', 'ÖĞRENCİ NO', 'ÖĞRENCİ NUMARASI', 'NUMARA', 'NO'}
+STUDENT_NAME_HEADERS = {'AD SOYAD', 'ADI SOYADI', 'ÖĞRENCİ ADI', 'AD'}
+
+
+def chunks(items, size=IMPORT_CHUNK_SIZE):
+    """Listeyi en fazla size elemanlı parçalara böler"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def read_rows(source, min_row=2):
+    """
+    Çalışma kitabının etkin sayfasını satır satır okur (bellek kullanımı sabittir)
+    :param source: Dosya yolu veya dosya benzeri nesne
+    :param min_row: Okumaya başlanacak satır (varsayılan: başlık satırından sonrası)
+    :return: (satır_no, değerler) demetleri üreten generator
+    """
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        yield from sheet_rows(wb.active, min_row)
+    finally:
+        wb.close()
+
+
+def sheet_rows(ws, min_row=1):
+    """Bir çalışma sayfasının satırlarını (satır_no, değerler) demetleri olarak üretir"""
+    for row_number, values in enumerate(ws.iter_rows(min_row=min_row, values_only=True), start=min_row):
+        yield row_number, values
+
+
+def upsert(table, rows, key, columns):
+    """
+    Satırları ekler; anahtar (unique) sütunu çakışan satırları günceller
+    MySQL'de INSERT ... ON DUPLICATE KEY UPDATE kullanılır. Diğer veritabanlarında
+    (örn. geliştirme ortamında SQLite) ON CONFLICT DO UPDATE karşılığı kullanılır.
+    :param key: Çakışmanın kontrol edildiği unique sütun adı
+    :param columns: Çakışma halinde güncellenecek sütun adları
+    """
+    for part in chunks(rows):
+        if db.session.get_bind().dialect.name == 'mysql':
+            stmt = mysql.insert(table).values(part)
+            stmt = stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in columns})
+        else:
+            stmt = sqlite.insert(table).values(part)
+            stmt = stmt.on_conflict_do_update(index_elements=[key],
+                                              set_={column: stmt.excluded[column] for column in columns})
+        db.session.execute(stmt)
+
+
+def bulk_insert(table, rows):
+    """Satırları parçalar halinde toplu ekler"""
+    for part in chunks(rows):
+        db.session.execute(insert(table).values(part))
+
+
+def instructor_username(instructor_name):
+    """
+    Öğretim üyesi adından kullanıcı adı oluşturur (ad ilk 3 harf + soyad ilk 3 harf)
+    :return: Kullanıcı adı; ad en az iki kelime değilse None
+    """
+    if not instructor_name or not isinstance(instructor_name, str):
+        return None
+    name_parts = instructor_name.strip().split()
+    if len(name_parts) < 2:
+        return None
+    return f"{name_parts[0][:3].lower()}{name_parts[-1][:3].lower()}"
+
+
+def text_value(value, label, max_length):
+    """Hücre değerini boşlukları temizlenmiş metne çevirir ve uzunluğunu doğrular"""
+    text = str(value).strip() if value is not None else ''
+    if not text:
+        raise ValueError(f"{label} boş")
+    if len(text) > max_length:
+        raise ValueError(f"{label} en fazla {max_length} karakter olabilir: {text}")
+    return text
+
+
+def parse_course_row(values):
+    """
+    Ders dosyasındaki bir satırı doğrular ve sözlüğe çevirir
+    :param values: Satırdaki hücre değerleri
+    :return: Ders alanlarını içeren sözlük
+    :raises ValueError: Satır eksik veya hatalıysa
+    """
+    if len(values) < COURSE_COLUMNS:
+        raise ValueError(f"Eksik sütun ({COURSE_COLUMNS} sütun bekleniyor)")
+    department_code, semester, course_code, course_name, instructor_name, course_type, capacity = \
+        values[:COURSE_COLUMNS]
+
+    instructor_name = instructor_name.strip() if isinstance(instructor_name, str) else None
+    return {
+        'department_code': text_value(department_code, 'Bölüm kodu', 10),
+        'code': text_value(course_code, 'Ders kodu', 10),
+        'name': text_value(course_name, 'Ders adı', 100),
+        'semester': int(semester) if isinstance(semester, (int, float)) else 1,
+        'instructor_name': instructor_name,
+        'username': instructor_username(instructor_name),
+        # Ders türünü standart formata çevir
+        'course_type': 'yüzyüze' if course_type and 'YÜZ' in str(course_type).upper() else 'online',
+        'capacity': int(capacity) if isinstance(capacity, (int, float)) else 30
+    }
+
+
+def import_course_rows(rows):
+    """
+    Ders satırlarını toplu olarak içe aktarır (commit etmez)
+    Bölüm, öğretim üyesi ve dersler sabit sayıda sorguyla yüklenir ve yazılır.
+    Aynı ders kodu birden fazla satırda varsa son satırın bilgileri kullanılır,
+    bölüm ilişkileri ise tüm satırlardan eklenir.
+    :param rows: read_rows() çıktısı gibi (satır_no, değerler) demetleri
+    :return: Sayaçları ve satır bazlı hataları içeren rapor sözlüğü
+    """
+    report = {'added_courses': 0, 'updated_courses': 0, 'added_instructors': 0,
+              'added_departments': 0, 'errors': []}
+
+    # Satırları doğrula
+    staged = []
+    for row_number, values in rows:
+        # Boş satırları atla
+        if not values or not any(values):
+            continue
+        try:
+            staged.append(parse_course_row(values))
+        except ValueError as e:
+            report['errors'].append({'row': row_number, 'message': str(e)})
+    if not staged:
+        return report
+
+    # Bölümler: mevcutları tek sorguda yükle, eksikleri toplu ekle
+    departments = {code.upper(): id for code, id in db.session.query(Department.code, Department.id)}
+    new_departments = {}
+    for data in staged:
+        key = data['department_code'].upper()
+        if key not in departments:
+            new_departments.setdefault(key, data['department_code'])
+    if new_departments:
+        bulk_insert(Department.__table__, [{'code': code, 'name': f"{code} Bölümü"}
+                                           for code in new_departments.values()])
+        departments.update((code.upper(), id) for code, id in db.session.query(Department.code, Department.id)
+                           .filter(Department.code.in_(list(new_departments.values()))))
+        report['added_departments'] = len(new_departments)
+
+    # Öğretim üyeleri: kullanıcı adına göre eşleştir, eksikleri toplu ekle
+    usernames = list({data['username'] for data in staged if data['username']})
+    instructors = {}
+    for part in chunks(usernames):
+        instructors.update((username.lower(), id) for username, id in
+                           db.session.query(User.username, User.id).filter(User.username.in_(part)))
+    new_instructors = {}
+    for data in staged:
+        if data['username'] and data['username'] not in instructors:
+            new_instructors.setdefault(data['username'], data['instructor_name'])
+    if new_instructors:
+        # Varsayılan şifrenin özeti süreç başına bir kez hesaplanır ve tüm yeni hesaplarda kullanılır
+        password_hash = default_password_hash()
+        bulk_insert(User.__table__, [
+            {'username': username, 'name': name, 'role': 'instructor', 'password_hash': password_hash,
+             'is_active': True, 'max_weekly_hours': 20, 'current_semester': 1}
+            for username, name in new_instructors.items()
+        ])
+        for part in chunks(list(new_instructors)):
+            instructors.update((username.lower(), id) for username, id in
+                               db.session.query(User.username, User.id).filter(User.username.in_(part)))
+        report['added_instructors'] = len(new_instructors)
+
+    # Dersler: aynı koda sahip satırları birleştir
+    courses = {}
+    links = set()
+    for data in staged:
+        key = data['code'].upper()
+        code = courses[key]['code'] if key in courses else data['code']
+        courses[key] = {
+            'code': code,
+            'name': data['name'],
+            'theory': 2,  # Varsayılan değerler (yalnızca yeni derslerde kullanılır)
+            'practice': 0,
+            'credits': 3,
+            'semester': data['semester'],
+            'instructor_id': instructors.get(data['username']) if data['username'] else None,
+            'course_type': data['course_type'],
+            'capacity': data['capacity'],
+            'is_mandatory': True,
+            'min_students': 0
+        }
+        links.add((key, departments[data['department_code'].upper()]))
+
+    existing = set()
+    for part in chunks([course['code'] for course in courses.values()]):
+        existing.update(code.upper() for code, in db.session.query(Course.code).filter(Course.code.in_(part)))
+    for data in staged:
+        # Sayaçlar satır bazlıdır: dosyada tekrar eden ders güncellenmiş sayılır
+        key = data['code'].upper()
+        if key in existing:
+            report['updated_courses'] += 1
+        else:
+            report['added_courses'] += 1
+            existing.add(key)
+
+    upsert(Course.__table__, list(courses.values()), 'code',
+           ['name', 'semester', 'instructor_id', 'course_type', 'capacity'])
+
+    # Ders-bölüm ilişkileri: yalnızca eksik olanları ekle
+    course_ids = {}
+    for part in chunks([course['code'] for course in courses.values()]):
+        course_ids.update((code.upper(), id) for code, id in
+                          db.session.query(Course.code, Course.id).filter(Course.code.in_(part)))
+    current_links = set()
+    for part in chunks(list(course_ids.values())):
+        current_links.update(db.session.query(course_department.c.course_id, course_department.c.department_id)
+                             .filter(course_department.c.course_id.in_(part)))
+    new_links = {(course_ids[key], department_id) for key, department_id in links} - current_links
+    if new_links:
+        bulk_insert(course_department, [{'course_id': course_id, 'department_id': department_id}
+                                        for course_id, department_id in sorted(new_links)])
+
+    return report
+
+
+def header_text(value):
+    """Başlık hücresini karşılaştırma için büyük harfli metne çevirir"""
+    return ' '.join(value.split()).upper() if isinstance(value, str) else None
+
+
+def parse_student(value):
+    """
+    Hücre değerinden öğrenci numarasını ve (varsa) adını ayıklar
+    :return: (numara, ad) demeti; hücre öğrenci numarası içermiyorsa None
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if value is None or isinstance(value, bool):
+        return None
+    match = STUDENT_NUMBER_PATTERN.match(str(value).strip())
+    if not match:
+        return None
+    return match.group(1), (match.group(2) or '').strip() or None
+
+
+def parse_class_list(rows):
+    """
+    Sınıf listesi dosyasını tek geçişte ayrıştırır
+    1-2. satırlar ders bilgileridir (başlık ve değerler). Öğrenci numarası sütunu
+    "SINIF LİSTESİ" / "ÖĞRENCİ NO" gibi bir başlıktan, başlık yoksa 5-6 haneli sayı
+    içeren ilk hücrenin sütunundan belirlenir; sonraki satırlarda yalnızca bu sütun okunur.
+    :param rows: read_rows(source, min_row=1) çıktısı gibi (satır_no, değerler) demetleri
+    :return: {'course_row': (satır_no, değerler), 'students': [(numara, ad), ...], 'errors': [...]}
+    """
+    class_list = {'course_row': None, 'students': [], 'errors': []}
+    seen = set()
+    number_column = name_column = None
+
+    for row_number, values in rows:
+        if row_number == 1:
+            continue  # Ders bilgileri başlık satırı
+        if row_number == 2:
+            class_list['course_row'] = (row_number, values)
+            continue
+        if not values or not any(value is not None for value in values):
+            continue
+
+        if number_column is None:
+            # Başlık satırı mı?
+            for column, value in enumerate(values):
+                text = header_text(value)
+                if text in STUDENT_NUMBER_HEADERS:
+                    number_column = column
+                elif text in STUDENT_NAME_HEADERS:
+                    name_column = column
+            if number_column is not None:
+                continue
+            # Başlık yoksa öğrenci numarası içeren ilk hücrenin sütununu kullan
+            for column, value in enumerate(values):
+                if parse_student(value):
+                    number_column = column
+                    break
+            if number_column is None:
+                continue
+
+        value = values[number_column] if number_column < len(values) else None
+        if value is None:
+            continue
+        student = parse_student(value)
+        if not student:
+            class_list['errors'].append({'row': row_number, 'message': f"Geçersiz öğrenci numarası: {value}"})
+            continue
+        number, name = student
+        if name is None and name_column is not None and name_column < len(values) \
+                and isinstance(values[name_column], str):
+            name = values[name_column].strip() or None
+        if number in seen:
+            continue
+        seen.add(number)
+        class_list['students'].append((number, name))
+
+    return class_list
+
+
+def read_archive_member(archive, info, limit):
+    """
+    Zip üyesini en fazla limit bayt okur; gerçek boyut sınırı aşarsa ValueError verir
+    (başlıktaki boyut bilgisine güvenilmez, sıkıştırılmış veri açılırken sayılır)
+    """
+    with archive.open(info) as member:
+        data = member.read(limit + 1)
+    if len(data) > limit:
+        raise ValueError(f"{info.filename} dosyası çok büyük (en fazla {limit // (1024 * 1024)} MB)")
+    return data
+
+
+def collect_class_list_files(uploads):
+    """
+    Yüklenen dosyalardan ayrıştırılacak Excel dosyalarını toplar (zip arşivleri açılır)
+    Zip arşivlerindeki Excel dosyası sayısı ve sıkıştırılmamış boyutlar MAX_ARCHIVE_*
+    sınırlarını aşarsa ValueError verilir.
+    :param uploads: Yüklenen dosyalar (filename ve stream alanları olan nesneler)
+    :return: ([(dosya_adı, içerik), ...], [desteklenmeyen dosya adları])
+    """
+    files, skipped = [], []
+    archive_files, archive_bytes = 0, 0
+    for upload in uploads:
+        filename = upload.filename or ''
+        if filename.lower().endswith('.zip'):
+            try:
+                with zipfile.ZipFile(upload.stream) as archive:
+                    for info in archive.infolist():
+                        # Klasörleri, macOS meta dosyalarını ve Excel olmayan dosyaları atla
+                        if info.is_dir() or info.filename.startswith('__MACOSX/') \
+                                or not info.filename.lower().endswith('.xlsx'):
+                            continue
+                        archive_files += 1
+                        if archive_files > MAX_ARCHIVE_FILES:
+                            raise ValueError(f"Zip arşivlerinde en fazla {MAX_ARCHIVE_FILES} Excel dosyası olabilir")
+                        if info.file_size > MAX_ARCHIVE_FILE_BYTES:
+                            raise ValueError(f"{info.filename} dosyası çok büyük "
+                                             f"(en fazla {MAX_ARCHIVE_FILE_BYTES // (1024 * 1024)} MB)")
+                        limit = min(MAX_ARCHIVE_FILE_BYTES, MAX_ARCHIVE_TOTAL_BYTES - archive_bytes)
+                        data = read_archive_member(archive, info, limit)
+                        archive_bytes += len(data)
+                        files.append((f"{filename}/{info.filename}", data))
+            except zipfile.BadZipFile:
+                skipped.append(filename)
+        elif filename.lower().endswith('.xlsx'):
+            files.append((filename, upload.stream.read()))
+        elif filename:
+            skipped.append(filename)
+    return files, skipped
+
+
+def parse_class_list_file(filename, data):
+    """
+    Bir sınıf listesi dosyasının tüm sayfalarını ayrıştırır
+    İşlem havuzunda çalıştırılabilmesi için yalnızca düz Python nesneleri alır ve döndürür.
+    :param filename: Raporda gösterilecek dosya adı
+    :param data: Dosyanın içeriği (bytes)
+    :return: Her sayfa için {'file', 'sheet', 'class_list', 'error'} sözlüklerinin listesi
+    """
+    try:
+        wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    except Exception as e:
+        return [{'file': filename, 'sheet': None, 'class_list': None,
+                 'error': f"Excel dosyası açılamadı: {str(e)}"}]
+    try:
+        return [{'file': filename, 'sheet': ws.title, 'class_list': parse_class_list(sheet_rows(ws)), 'error': None}
+                for ws in wb.worksheets]
+    finally:
+        wb.close()
+
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def parse_pool():
+    """
+    Sınıf listesi ayrıştırma için paylaşılan işlem havuzunu döndürür
+    Havuz süreç başına bir kez (PARSE_WORKERS işlemle) oluşturulur ve istekler arasında
+    paylaşılır; her istekte yeni işlemler başlatılmaz.
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        return _parse_pool
+
+
+def reset_parse_pool():
+    """Bozulan (bir işlemi beklenmedik şekilde sonlanan) paylaşılan havuzu kapatır"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+def parse_class_list_files(files):
+    """
+    Birden fazla sınıf listesi dosyasını paralel olarak ayrıştırır
+    openpyxl ayrıştırması CPU'ya bağlı olduğundan dosyalar paylaşılan işlem havuzunda
+    (bkz. parse_pool) işlenir; tek dosya için havuz kullanılmaz. Havuz bozulursa dosyalar
+    bu işlemde sırayla ayrıştırılır.
+    :param files: (dosya_adı, içerik) demetleri
+    :return: Dosya sırasıyla tüm sayfaların parse_class_list_file() çıktıları
+    """
+    if len(files) <= 1 or PARSE_WORKERS <= 1:
+        return [sheet for filename, data in files for sheet in parse_class_list_file(filename, data)]
+
+    try:
+        results = list(parse_pool().map(parse_class_list_file, [f for f, _ in files], [d for _, d in files]))
+    except BrokenProcessPool:
+        reset_parse_pool()
+        results = [parse_class_list_file(filename, data) for filename, data in files]
+    return [sheet for sheets in results for sheet in sheets]
+
+
+def import_class_lists(class_lists):
+    """
+    Birden fazla sınıf listesini birleştirerek toplu içe aktarır (commit etmez)
+    Tüm derslerin eklenmesi/güncellenmesi, öğrenci eşleştirmesi ve ders kayıtları
+    liste sayısından bağımsız olarak sabit sayıda toplu sorguyla yapılır. Ders
+    bilgileri hatalı olan liste atlanır ve raporunda 'error' alanı doldurulur.
+    :param class_lists: parse_class_list() çıktıları
+    :return: Her liste için ders kodu, sayaçlar ve satır bazlı hataları içeren rapor sözlükleri
+    """
+    reports = [{'course_code': None, 'added_course': False, 'added_students': 0, 'existing_students': 0,
+                'enrolled_students': 0, 'errors': list(class_list['errors']), 'error': None}
+               for class_list in class_lists]
+
+    # Ders bilgilerini doğrula
+    staged = []
+    for report, class_list in zip(reports, class_lists):
+        if class_list['course_row'] is None:
+            report['error'] = 'Excel dosyasında ders bilgileri bulunamadı'
+            continue
+        try:
+            course_data = parse_course_row(class_list['course_row'][1])
+        except ValueError as e:
+            report['error'] = f"Ders bilgileri hatalı: {str(e)}"
+            continue
+        report['course_code'] = course_data['code']
+        staged.append((report, class_list, course_data))
+    if not staged:
+        return reports
+
+    # Dersleri tek seferde ekle veya güncelle
+    codes = list({course_data['code'] for _, _, course_data in staged})
+    existing_courses = set()
+    for part in chunks(codes):
+        existing_courses.update(code.upper() for code, in db.session.query(Course.code).filter(Course.code.in_(part)))
+    import_course_rows([class_list['course_row'] for _, class_list, _ in staged])
+
+    course_ids = {}
+    for part in chunks(codes):
+        course_ids.update((code.upper(), id) for code, id in
+                          db.session.query(Course.code, Course.id).filter(Course.code.in_(part)))
+    department_ids = {code.upper(): id for code, id in db.session.query(Department.code, Department.id).filter(
+        Department.code.in_(list({course_data['department_code'] for _, _, course_data in staged})))}
+
+    # Tüm listelerdeki öğrenciler (ilk geçtiği listenin bölümü ve yarıyılıyla oluşturulur)
+    first_seen = {}
+    for report, class_list, course_data in staged:
+        key = course_data['code'].upper()
+        if key not in existing_courses:
+            report['added_course'] = True
+            existing_courses.add(key)
+        for number, name in class_list['students']:
+            first_seen.setdefault(number, (report, name, course_data))
+    numbers = list(first_seen)
+
+    # Mevcut öğrencileri bul (öğrenci numarası veya kullanıcı adıyla)
+    def find_students(part):
+        found = {}
+        for id, student_number, username in db.session.query(User.id, User.student_number, User.username) \
+                .filter(or_(User.student_number.in_(part), User.username.in_(part))):
+            for key in (username, student_number):
+                if key in part:
+                    found[key] = id
+        return found
+
+    students = {}
+    for part in chunks(numbers):
+        students.update(find_students(part))
+
+    # Eksik öğrencileri toplu ekle
+    new_students = [number for number in numbers if number not in students]
+    if new_students:
+        # Varsayılan şifrenin özeti süreç başına bir kez hesaplanır ve tüm yeni hesaplarda kullanılır
+        password_hash = default_password_hash()
+        rows = []
+        for number in new_students:
+            report, name, course_data = first_seen[number]
+            report['added_students'] += 1
+            rows.append({'username': number, 'name': name or f"Öğrenci {number}", 'role': 'student',
+                         'student_number': number,
+                         'department_id': department_ids.get(course_data['department_code'].upper()),
+                         'password_hash': password_hash, 'current_semester': course_data['semester'],
+                         'is_active': True, 'max_weekly_hours': 20})
+        bulk_insert(User.__table__, rows)
+        for part in chunks(new_students):
+            students.update(find_students(part))
+    new_students = set(new_students)
+
+    # Mevcut ders kayıtlarını tek seferde yükle, eksikleri toplu ekle
+    enrolled = set()
+    for part in chunks([students[number] for number in numbers]):
+        enrolled.update(db.session.query(student_course.c.student_id, student_course.c.course_id).filter(
+            student_course.c.course_id.in_(list(set(course_ids.values()))),
+            student_course.c.student_id.in_(part)))
+    enrollments = []
+    for report, class_list, course_data in staged:
+        course_id = course_ids[course_data['code'].upper()]
+        for number, name in class_list['students']:
+            if first_seen[number][0] is not report or number not in new_students:
+                report['existing_students'] += 1
+            pair = (students[number], course_id)
+            if pair in enrolled:
+                continue
+            enrolled.add(pair)
+            report['enrolled_students'] += 1
+            enrollments.append({'student_id': pair[0], 'course_id': course_id,
+                                'semester': course_data['semester'], 'status': 'active'})
+    if enrollments:
+        bulk_insert(student_course, enrollments)
+        # Toplu kayıtlar kontenjan sayacını atlar; sayaçları yeniden hesapla
+        sync_enrolled_counts({enrollment['course_id'] for enrollment in enrollments})
+
+    return reports
+
+
+def import_class_list(class_list):
+    """
+    Tek bir sınıf listesindeki dersi ve öğrencileri içe aktarır (commit etmez)
+    :param class_list: parse_class_list() çıktısı
+    :return: import_class_lists() rapor sözlüğü
+    :raises ValueError: Ders bilgileri okunamazsa
+    """
+    report = import_class_lists([class_list])[0]
+    if report['error']:
+        raise ValueError(report['error'])
+    return report
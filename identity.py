@@ -0,0 +1,166 @@
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import make_transient_to_detached
+
+from models import db, User, IdentityState
+
+# =====================================================================================
+# Kullanıcı Kimlik Önbelleği
+# Flask-Login her istekte oturumdaki kullanıcıyı yükler. Kullanıcının sütun değerleri
+# süreç içinde kısa süreli (TTL) tutulur ve her istekte oturuma bağlanır
+# (merge(load=False)). Önbellekteki kayıt, yüklendiği andaki kimlik sürümüyle saklanır ve
+# sürüm değiştiyse kullanılmaz. Tek satırlık kimlik sürümü (identity_state) her istekte değil,
+# süreç başına en fazla IDENTITY_REVISION_TTL saniyede bir okunur; önbellekten gelen
+# isteklerin çoğu veritabanına hiç gitmez. Kullanıcıyı değiştiren işlemler (edit_user,
+# delete_user) sürümü aynı işlemde artırır; böylece silinen veya yetkisi düşürülen kullanıcı
+# diğer sunucu süreçlerinde de en geç IDENTITY_REVISION_TTL saniye sonra eski kimliğiyle
+# tanınmaz.
+# =====================================================================================
+
+# Önbellekteki kullanıcı bilgilerinin geçerlilik süresi (saniye)
+USER_CACHE_TTL = 30
+
+# Önbellekte tutulacak en fazla kullanıcı sayısı
+USER_CACHE_SIZE = 10000
+
+# Kimlik sürümünün veritabanından yeniden okunma aralığı (saniye); başka bir süreçte yapılan
+# kullanıcı değişikliği en geç bu süre sonra fark edilir
+IDENTITY_REVISION_TTL = 2
+
+
+def user_values(user):
+    """Kullanıcının sütun değerlerini düz sözlük olarak döndürür"""
+    return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+
+class UserCache:
+    """
+    Boyut sınırlı, süreli (TTL), iş parçacığı güvenli kullanıcı önbelleği
+    Değer olarak ORM nesnesi değil sütun değerleri saklanır; böylece önbellekteki kayıt
+    bir veritabanı oturumuna bağlı kalmaz ve istekler arasında paylaşılabilir.
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL, max_entries=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, revision):
+        """
+        Kullanıcının sütun değerlerini döndürür
+        Kayıt yoksa, süresi dolduysa veya başka bir kimlik sürümünde yüklendiyse None döner.
+        """
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic() or entry[1] != revision:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, user_id, revision, values):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, revision, values)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache()
+
+
+def identity_revision():
+    """Geçerli kullanıcı kimlik sürümünü veritabanından okur (kayıt yoksa 0)"""
+    return db.session.execute(select(IdentityState.revision).where(IdentityState.id == 1)).scalar() or 0
+
+
+class RevisionCheck:
+    """
+    Kimlik sürümünü süreç içinde kısa süre (IDENTITY_REVISION_TTL) tutar
+    Süre dolduğunda sürümü çağıran iş parçacığı veritabanından yeniden okur; bu sırada
+    diğer istekler eski sürümü kullanmaya devam eder.
+    """
+
+    def __init__(self, ttl=IDENTITY_REVISION_TTL):
+        self.ttl = ttl
+        self.revision = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.revision is not None and time.monotonic() - self.checked_at < self.ttl:
+                return self.revision
+        revision = identity_revision()
+        with self.lock:
+            self.revision = revision
+            self.checked_at = time.monotonic()
+        return revision
+
+    def reset(self):
+        """Bir sonraki istekte sürümün veritabanından okunmasını sağlar"""
+        with self.lock:
+            self.revision = None
+
+
+revision_check = RevisionCheck()
+
+
+def bump_identity_revision():
+    """Kullanıcı kimlik sürümünü artırır; çağıranın işlemiyle birlikte commit edilir"""
+    result = db.session.execute(
+        update(IdentityState).where(IdentityState.id == 1)
+        .values(revision=IdentityState.revision + 1, updated_at=datetime.utcnow())
+    )
+    if not result.rowcount:
+        db.session.add(IdentityState(id=1, revision=1))
+
+
+def load_cached_user(user_id):
+    """
+    Kullanıcıyı önbellekten oturuma bağlar, önbellekte yoksa veritabanından yükler
+    Önbellekten gelen nesne mevcut oturumda kalıcı (persistent) bir nesne gibi davranır;
+    ilişkileri (örn. selected_courses) erişildiğinde normal şekilde yüklenir.
+    Sürüm, kullanıcı yüklenmeden önce okunur; arada yapılan bir değişiklik kaydı eski
+    sürümle saklatır ve sürüm yeniden okunduğunda kaydın yeniden yüklenmesini sağlar.
+    :param user_id: Kullanıcı kimlik numarası
+    :return: Kullanıcı nesnesi veya None
+    """
+    revision = revision_check.get()
+    values = user_cache.get(user_id, revision)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        user_cache.set(user_id, revision, user_values(user))
+    return user
+
+
+def invalidate_user(user_id):
+    """
+    Kullanıcının önbellekteki bilgilerini tüm süreçlerde geçersiz kılar
+    Kullanıcı değiştiğinde commit'ten önce çağrılmalıdır (kimlik sürümü çağıranın
+    işlemiyle birlikte artırılır).
+    """
+    bump_identity_revision()
+    user_cache.invalidate(user_id)
+    revision_check.reset()
@@ -0,0 +1,58 @@
+from flask import Flask
+import os
+from models import db, Course, CourseWaitlist
+from enrollment import sync_enrolled_counts
+from sqlalchemy import text, inspect
+from dotenv import load_dotenv
+
+# Flask uygulamasını oluştur ve yapılandır
+app = Flask(__name__)
+
+# Veritabanı bağlantı bilgilerini .env dosyasından yükle
+load_dotenv()
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_NAME = os.getenv("DB_NAME")
+app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Veritabanını başlat
+db.init_app(app)
+
+def migrate_enrollment():
+    """
+    Kontenjan sayacı ve bekleme listesine geçiş
+    - courses tablosuna enrolled_count sütunu eklenir
+    - course_waitlist tablosu oluşturulur
+    - Kayıt sayaçları student_course tablosundan yeniden hesaplanır
+    Betik tekrar çalıştırılabilir; sayaçları her çalıştırmada yeniden hesaplar.
+    """
+    with app.app_context():
+        inspector = inspect(db.engine)
+
+        # Sayaç sütununu ekle
+        columns = [c['name'] for c in inspector.get_columns(Course.__tablename__)]
+        if 'enrolled_count' not in columns:
+            print("courses tablosuna enrolled_count sütunu ekleniyor...")
+            with db.engine.begin() as conn:
+                conn.execute(text("ALTER TABLE courses ADD COLUMN enrolled_count INTEGER NOT NULL DEFAULT 0"))
+
+        # Bekleme listesi tablosunu oluştur (varsa atlanır)
+        CourseWaitlist.__table__.create(db.engine, checkfirst=True)
+        print("course_waitlist tablosu hazır.")
+
+        # Sayaçları mevcut ders kayıtlarından doldur
+        sync_enrolled_counts()
+        db.session.commit()
+        print(f"{Course.query.count()} dersin kayıt sayacı güncellendi.")
+
+        # Kontenjanı aşılmış dersleri göster (sayaçtan önce yapılmış kayıtlar)
+        over = Course.query.filter(Course.capacity.isnot(None), Course.enrolled_count > Course.capacity).all()
+        for course in over:
+            print(f"UYARI: {course.code} dersinde kontenjan aşılmış ({course.enrolled_count}/{course.capacity}).")
+
+        print("\nMigrasyon tamamlandı!")
+
+if __name__ == "__main__":
+    migrate_enrollment()
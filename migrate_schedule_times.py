@@ -0,0 +1,80 @@
+from flask import Flask
+import os
+from models import db, Schedule, UnavailableTime, time_fields, create_indexes
+from sqlalchemy import text, inspect
+from dotenv import load_dotenv
+
+# Flask uygulamasını oluştur ve yapılandır
+app = Flask(__name__)
+
+# Veritabanı bağlantı bilgilerini .env dosyasından yükle
+load_dotenv()
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_NAME = os.getenv("DB_NAME")
+app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Veritabanını başlat
+db.init_app(app)
+
+def migrate_schedule_times():
+    """
+    HH:MM metin sütunlarından tamsayı zaman sütunlarına geçiş
+    - schedule_items ve unavailable_times tablolarına day_index, start_minute, end_minute eklenir
+    - Mevcut kayıtlar day/start_time/end_time değerlerinden doldurulur
+    - Çakışma sorguları için bileşik indeksler oluşturulur
+    Betik tekrar çalıştırılabilir; eksik kalan değerleri yeniden doldurur.
+    """
+    with app.app_context():
+        inspector = inspect(db.engine)
+
+        for model in (Schedule, UnavailableTime):
+            table = model.__tablename__
+            if table not in inspector.get_table_names():
+                print(f"{table} tablosu yok, atlanıyor.")
+                continue
+
+            # Eksik sütunları ekle
+            columns = [c['name'] for c in inspector.get_columns(table)]
+            for column in ('day_index', 'start_minute', 'end_minute'):
+                if column not in columns:
+                    print(f"{table} tablosuna {column} sütunu ekleniyor...")
+                    with db.engine.begin() as conn:
+                        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER"))
+
+            # Boş kalan tamsayı sütunlarını metin sütunlarından doldur
+            with db.engine.begin() as conn:
+                rows = conn.execute(text(
+                    f"SELECT id, day, start_time, end_time FROM {table} "
+                    f"WHERE day_index IS NULL OR start_minute IS NULL OR end_minute IS NULL"
+                )).all()
+                if rows:
+                    conn.execute(
+                        text(f"UPDATE {table} SET day_index = :day_index, start_minute = :start_minute, "
+                             f"end_minute = :end_minute WHERE id = :id"),
+                        [dict(id=row.id, **time_fields(row.day, row.start_time, row.end_time)) for row in rows]
+                    )
+            print(f"{table}: {len(rows)} kayıt dolduruldu.")
+
+            # İndeksleri oluştur (varsa atlanır)
+            for name in create_indexes(model, db.engine):
+                print(f"{table}: {name} indeksi hazır.")
+
+        # Tanınmayan gün adına sahip kayıtları göster
+        # (ORM sorgusu henüz eklenmemiş sürüm sütunlarını seçeceğinden düz SQL kullanılır)
+        unknown = 0
+        with db.engine.connect() as conn:
+            for model in (Schedule, UnavailableTime):
+                if model.__tablename__ in inspector.get_table_names():
+                    unknown += conn.execute(text(
+                        f"SELECT COUNT(*) FROM {model.__tablename__} WHERE day_index IS NULL"
+                    )).scalar()
+        if unknown:
+            print(f"\nUYARI: {unknown} kaydın gün adı tanınmadı (day_index boş kaldı).")
+
+        print("\nMigrasyon tamamlandı!")
+
+if __name__ == "__main__":
+    migrate_schedule_times()
@@ -0,0 +1,72 @@
+from flask import Flask
+import os
+from models import db, Schedule, ScheduleState, ScheduleVersion, create_indexes
+from timetable import active_version_id, publish_version
+from sqlalchemy import text, inspect
+from dotenv import load_dotenv
+
+# Flask uygulamasını oluştur ve yapılandır
+app = Flask(__name__)
+
+# Veritabanı bağlantı bilgilerini .env dosyasından yükle
+load_dotenv()
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_NAME = os.getenv("DB_NAME")
+app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Veritabanını başlat
+db.init_app(app)
+
+def migrate_schedule_versions():
+    """
+    Program sürümlerine geçiş
+    - schedule_versions tablosu oluşturulur
+    - schedule_items tablosuna version_id, schedule_state tablosuna active_version_id eklenir
+    - Sürümsüz mevcut program öğeleri yayındaki ilk sürüm olarak kaydedilir
+    Betik tekrar çalıştırılabilir; yayında bir sürüm varsa öğelere dokunmaz.
+    """
+    with app.app_context():
+        # Sürüm tablosunu oluştur (varsa atlanır)
+        ScheduleVersion.__table__.create(db.engine, checkfirst=True)
+        print("schedule_versions tablosu hazır.")
+
+        inspector = inspect(db.engine)
+
+        # Sürüm sütunlarını ekle
+        columns = [c['name'] for c in inspector.get_columns(Schedule.__tablename__)]
+        if 'version_id' not in columns:
+            print("schedule_items tablosuna version_id sütunu ekleniyor...")
+            with db.engine.begin() as conn:
+                conn.execute(text("ALTER TABLE schedule_items ADD COLUMN version_id INTEGER REFERENCES schedule_versions(id)"))
+        columns = [c['name'] for c in inspector.get_columns(ScheduleState.__tablename__)]
+        if 'active_version_id' not in columns:
+            print("schedule_state tablosuna active_version_id sütunu ekleniyor...")
+            with db.engine.begin() as conn:
+                conn.execute(text("ALTER TABLE schedule_state ADD COLUMN active_version_id INTEGER REFERENCES schedule_versions(id)"))
+
+        # Sürüm + ders indeksini oluştur
+        for name in create_indexes(Schedule, db.engine):
+            print(f"{Schedule.__tablename__}: {name} indeksi hazır.")
+
+        # Sürümsüz öğeleri yayındaki ilk sürüme bağla
+        if active_version_id() is None:
+            count = Schedule.query.filter(Schedule.version_id.is_(None)).count()
+            if count:
+                version = ScheduleVersion(status='draft', message='Sürümlemeden önceki program')
+                db.session.add(version)
+                db.session.flush()
+                Schedule.query.filter(Schedule.version_id.is_(None)).update({'version_id': version.id},
+                                                                             synchronize_session=False)
+                publish_version(version.id)
+                db.session.commit()
+                print(f"{count} program öğesi {version.id} numaralı sürüm olarak yayınlandı.")
+        else:
+            print(f"Yayındaki sürüm: {active_version_id()}")
+
+        print("\nMigrasyon tamamlandı!")
+
+if __name__ == "__main__":
+    migrate_schedule_versions()
@@ -1,9 +1,110 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from functools import lru_cache
+from sqlalchemy import inspect
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime
 
 db = SQLAlchemy()
 
+# Haftanın günleri (day_index sütunu bu listedeki sıradır)
+DAYS = ['Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma']
+
+
+def time_to_minutes(value):
+    """
+    'HH:MM' formatındaki saati gün başından itibaren dakikaya çevirir
+    :param value: Saat metni (örn: '09:00')
+    :return: Dakika cinsinden tamsayı (örn: 540)
+    """
+    hour, minute = str(value).strip().split(':')[:2]
+    return int(hour) * 60 + int(minute)
+
+
+def parse_minutes(value):
+    """
+    time_to_minutes'in hata vermeyen sürümü: boş veya geçersiz saatler (örn: '25:00', 'abc')
+    için None döndürür. Kullanıcıdan veya veritabanından gelen değerlerde kullanılır.
+    """
+    try:
+        hour, minute = (int(part) for part in str(value).strip().split(':')[:2])
+    except ValueError:
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour * 60 + minute
+
+
+def day_to_index(day):
+    """Gün adını haftadaki sırasına çevirir (bilinmeyen günler için None)"""
+    return DAYS.index(day) if day in DAYS else None
+
+
+def time_fields(day, start_time, end_time):
+    """
+    Gün ve saat metinlerinden tamsayı sütun değerlerini üretir
+    Toplu ekleme/güncelleme (insert/update) ORM doğrulayıcılarını atladığı için bu
+    değerler satır sözlüklerine açıkça eklenmelidir.
+    """
+    return {
+        'day_index': day_to_index(day),
+        'start_minute': parse_minutes(start_time),
+        'end_minute': parse_minutes(end_time)
+    }
+
+
+def time_range_valid(times):
+    """time_fields çıktısı tanınan bir gün ve geçerli (başlangıç < bitiş) bir saat aralığı mı?"""
+    return None not in times.values() and times['start_minute'] < times['end_minute']
+
+
+def create_indexes(model, engine):
+    """
+    Modelin indekslerinden, sütunlarının tamamı tabloda bulunanları oluşturur (varsa atlanır)
+    Migrasyonlar birbirinden bağımsız çalışabildiğinden henüz eklenmemiş bir sütuna ait indeks
+    atlanır; o sütunu ekleyen migrasyon indeksi kendisi oluşturur.
+    :param model: İndeksleri oluşturulacak model sınıfı
+    :param engine: Veritabanı bağlantısı
+    :return: Hazır olan indekslerin adları
+    """
+    columns = {c['name'] for c in inspect(engine).get_columns(model.__tablename__)}
+    ready = []
+    for index in model.__table__.indexes:
+        if all(column.name in columns for column in index.columns):
+            index.create(engine, checkfirst=True)
+            ready.append(index.name)
+    return ready
+
+
+# Excel'den toplu oluşturulan hesapların (öğrenci, öğretim üyesi) varsayılan şifresi
+DEFAULT_PASSWORD = '123'
+
+
+@lru_cache(maxsize=1)
+def default_password_hash():
+    """
+    Varsayılan şifrenin özetini döndürür; özet süreç başına bir kez hesaplanır
+    generate_password_hash bilerek yavaştır. Toplu oluşturulan hesaplar aynı özeti
+    paylaştığından içe aktarma süresi hesap sayısıyla artmaz. Şifre zaten herkesçe
+    bilinen varsayılan değer olduğundan paylaşılan özet ek bilgi sızdırmaz.
+    """
+    return generate_password_hash(DEFAULT_PASSWORD)
+
+
+def sync_time_field(item, key, value):
+    """
+    Gün/saat metin alanı atandığında ilgili tamsayı sütununu günceller
+    Tanınmayan gün veya saat için sütun boş (NULL) kalır; rotalar değerleri atamadan önce
+    time_range_valid ile doğrular.
+    """
+    if key == 'day':
+        item.day_index = day_to_index(value)
+    elif key == 'start_time':
+        item.start_minute = parse_minutes(value)
+    elif key == 'end_time':
+        item.end_minute = parse_minutes(value)
+
 # Ders-Bölüm ilişki tablosu (many-to-many)
 course_department = db.Table('course_department',
     db.Column('course_id', db.Integer, db.ForeignKey('courses.id'), primary_key=True),
@@ -45,6 +146,10 @@ class User(UserMixin, db.Model):
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
         
+    def set_default_password(self):
+        # Varsayılan şifrenin önceden hesaplanmış özetini kullanır (bkz. default_password_hash)
+        self.password_hash = default_password_hash()
+        
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
@@ -73,6 +178,9 @@ class Course(db.Model):
     # Yeni alanlar
     course_type = db.Column(db.String(20), default='yüzyüze')  # 'online' veya 'yüzyüze'
     capacity = db.Column(db.Integer, default=30)  # Dersin kontenjanı
+    # Derse kayıtlı öğrenci sayısı (student_course satırlarının sayısı). Kontenjan kontrolü
+    # bu sayaç üzerinde tek bir koşullu UPDATE ile atomik yapılır (bkz. enrollment.py)
+    enrolled_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # department_id alanını kaldırıp, çoka-çok ilişki ekliyoruz
     departments = db.relationship('Department', secondary=course_department, 
@@ -100,22 +208,142 @@ class Classroom(db.Model):
 
 class Schedule(db.Model):
     __tablename__ = 'schedule_items'
+    __table_args__ = (
+        # Çakışma sorguları için: derslik + gün + başlangıç ve gün + zaman aralığı
+        db.Index('ix_schedule_items_room_day_start', 'classroom_id', 'day_index', 'start_minute'),
+        db.Index('ix_schedule_items_day_start_end', 'day_index', 'start_minute', 'end_minute'),
+        # Sürüm okumaları ve sürüm karşılaştırmaları için: sürüm + ders
+        db.Index('ix_schedule_items_version_course', 'version_id', 'course_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
+    # Öğenin ait olduğu program sürümü; yalnızca etkin sürümün öğeleri yayındadır
+    version_id = db.Column(db.Integer, db.ForeignKey('schedule_versions.id'))
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
     classroom_id = db.Column(db.Integer, db.ForeignKey('classrooms.id'), nullable=False)
     day = db.Column(db.String(20), nullable=False)  # Pazartesi, Salı, ...
     start_time = db.Column(db.String(5), nullable=False)  # HH:MM formatında
     end_time = db.Column(db.String(5), nullable=False)  # HH:MM formatında
+    
+    # Aralık sorguları için tamsayı karşılıkları (day, start_time, end_time atanınca güncellenir)
+    day_index = db.Column(db.Integer)  # 0 = Pazartesi, ... 4 = Cuma
+    start_minute = db.Column(db.Integer)  # Gün başından itibaren dakika
+    end_minute = db.Column(db.Integer)  # Gün başından itibaren dakika
+
+    @validates('day', 'start_time', 'end_time')
+    def _sync_time_fields(self, key, value):
+        sync_time_field(self, key, value)
+        return value
 
 
 # Yeni eklenen model: Öğretim üyelerinin müsait olmadığı zamanlar
 class UnavailableTime(db.Model):
     __tablename__ = 'unavailable_times'
+    __table_args__ = (
+        db.Index('ix_unavailable_times_instructor_day', 'instructor_id', 'day_index'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     instructor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     day = db.Column(db.String(20), nullable=False)  # Pazartesi, Salı, ...
     start_time = db.Column(db.String(5), nullable=False)  # HH:MM formatında
     end_time = db.Column(db.String(5), nullable=False)  # HH:MM formatında
-    reason = db.Column(db.String(200))  # Müsait olmama nedeni (opsiyonel)
\ No newline at end of file
+    reason = db.Column(db.String(200))  # Müsait olmama nedeni (opsiyonel)
+    
+    # Aralık sorguları için tamsayı karşılıkları (day, start_time, end_time atanınca güncellenir)
+    day_index = db.Column(db.Integer)
+    start_minute = db.Column(db.Integer)
+    end_minute = db.Column(db.Integer)
+
+    @validates('day', 'start_time', 'end_time')
+    def _sync_time_fields(self, key, value):
+        sync_time_field(self, key, value)
+        return value
+
+# Otomatik program oluşturma işleri (arka planda çalışır, ilerlemesi sorgulanabilir)
+class ScheduleJob(db.Model):
+    __tablename__ = 'schedule_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(10))  # guz, bahar
+    solver = db.Column(db.String(20), nullable=False, default='random')
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    phase = db.Column(db.String(20))  # ORTAK, BLM, YZM, ... (çözücünün o anki aşaması)
+    placed_count = db.Column(db.Integer, default=0)  # Yerleştirilen ders sayısı
+    total_count = db.Column(db.Integer, default=0)  # Yerleştirilecek toplam ders sayısı
+    message = db.Column(db.Text)  # Sonuç veya hata mesajı
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Çalışan işin son canlılık sinyali
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'term': self.term,
+            'solver': self.solver,
+            'status': self.status,
+            'phase': self.phase,
+            'placed_count': self.placed_count,
+            'total_count': self.total_count,
+            'message': self.message
+        }
+
+# Ders programı sürümü (tek satır): programda görünen verileri değiştiren her yazma
+# işleminde artırılır; oluşturulmuş program önbelleği bu sürüme göre geçersizleşir
+# active_version_id yayındaki program sürümünü gösterir; yayınlama ve geri alma yalnızca
+# bu işaretçiyi değiştirir
+class ScheduleState(db.Model):
+    __tablename__ = 'schedule_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    active_version_id = db.Column(db.Integer, db.ForeignKey('schedule_versions.id'))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Kullanıcı kimlik sürümü (tek satır): kullanıcıyı değiştiren/silen her işlemde artırılır;
+# süreçlerdeki kullanıcı kimlik önbelleği (identity.py) bu sürüme göre geçersizleşir
+class IdentityState(db.Model):
+    __tablename__ = 'identity_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Ders programı sürümleri: otomatik program oluşturma yayındaki programa dokunmadan yeni
+# bir taslak sürüme yazar; taslak önizlenip yayınlanır, eski sürümler geri alma için kalır
+class ScheduleVersion(db.Model):
+    __tablename__ = 'schedule_versions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(10))  # guz, bahar (elle oluşturulan sürümlerde boş)
+    solver = db.Column(db.String(20))
+    status = db.Column(db.String(20), nullable=False, default='draft')  # draft, published, archived
+    message = db.Column(db.Text)  # Program oluşturma sonucu
+    unplaced = db.Column(db.Text)  # Yerleştirilemeyen derslerin kodları (virgülle ayrılmış)
+    job_id = db.Column(db.Integer, db.ForeignKey('schedule_jobs.id'))  # Sürümü oluşturan iş
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    published_at = db.Column(db.DateTime)
+
+    @property
+    def unplaced_codes(self):
+        return [code for code in (self.unplaced or '').split(',') if code]
+
+
+# Kontenjanı dolu derslerin bekleme listesi: ders bırakıldığında en eski kayıt derse alınır
+class CourseWaitlist(db.Model):
+    __tablename__ = 'course_waitlist'
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'course_id', name='uq_course_waitlist_student_course'),
+        # Sıradaki öğrenciyi bulmak için: ders + ekleme sırası
+        db.Index('ix_course_waitlist_course_id', 'course_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    semester = db.Column(db.Integer, nullable=False)  # Kayıt yapılınca student_course'a yazılacak dönem
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,1564 @@
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait
+import copy
+import math
+import multiprocessing
+import os
+import random
+import time
+
+import numpy as np
+from sqlalchemy.orm import selectinload
+
+from models import Course, Classroom, UnavailableTime, DAYS, time_to_minutes, time_fields
+
+# =====================================================================================
+# Ders Programı Kısıt Modeli
+# Otomatik program oluşturma sırasında kullanılan bellek içi doluluk modeli.
+# Dersler, derslikler ve müsait olmama kayıtları bir kez yüklenir; tüm çakışma
+# kontrolleri (öğretim üyesi, derslik, bölüm-yarıyıl grubu) veritabanına gitmeden
+# gün x zaman dilimi bit kümeleri üzerinde yapılır.
+# =====================================================================================
+
+# Saatlik ders dilimi ayarları: ders saatleri DAY_START'tan itibaren her PERIOD_MINUTES
+# dakikada bir başlar ve LESSON_MINUTES sürer; BREAKS ile çakışan saatler (öğle arası)
+# kullanılmaz. Bir oturum en fazla MAX_BLOCK_HOURS ardışık ders saatinden oluşur.
+DAY_START = '09:00'
+DAY_END = '17:00'
+PERIOD_MINUTES = 60
+LESSON_MINUTES = 50
+BREAKS = [('12:00', '13:00')]
+MAX_BLOCK_HOURS = 3
+
+
+def minutes_to_time(minutes):
+    """Gün başından itibaren dakikayı 'HH:MM' formatına çevirir (örn: 540 -> '09:00')"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def build_periods(day_start=DAY_START, day_end=DAY_END, period_minutes=PERIOD_MINUTES,
+                  lesson_minutes=LESSON_MINUTES, breaks=BREAKS):
+    """
+    Bir günün ders saatlerini oluşturur
+    :return: [('09:00', '09:50'), ('10:00', '10:50'), ...] biçiminde (başlangıç, bitiş) listesi
+    """
+    breaks = [(time_to_minutes(start), time_to_minutes(end)) for start, end in breaks]
+    periods = []
+    start = time_to_minutes(day_start)
+    while start + lesson_minutes <= time_to_minutes(day_end):
+        end = start + lesson_minutes
+        if not any(start < break_end and end > break_start for break_start, break_end in breaks):
+            periods.append((minutes_to_time(start), minutes_to_time(end)))
+        start += period_minutes
+    return periods
+
+
+# Varsayılan ders saatleri: 09:00-09:50 ... 11:00-11:50, öğle arası, 13:00-13:50 ... 16:00-16:50
+PERIODS = build_periods()
+
+
+def split_hours(hours, max_block=MAX_BLOCK_HOURS):
+    """
+    Haftalık ders saatini en fazla max_block saatlik, birbirine olabildiğince eşit oturumlara böler
+    Örn: 3 -> [3], 4 -> [2, 2], 5 -> [3, 2], 6 -> [3, 3]
+    """
+    hours = int(hours or 0) or max_block
+    count = -(-hours // max_block)
+    base, extra = divmod(hours, count)
+    return [base + 1 if part < extra else base for part in range(count)]
+
+
+def parse_preferred_days(value):
+    """
+    Tercih edilen günleri kümeye çevirir (örn: 'Pazartesi,Salı' -> {'Pazartesi', 'Salı'})
+    :return: Gün adları kümesi; tercih yoksa None
+    """
+    days = frozenset(day.strip() for day in (value or '').split(',') if day.strip())
+    return days or None
+
+
+def parse_preferred_times(value):
+    """
+    Tercih edilen saat aralıklarını dakika çiftlerine çevirir
+    (örn: '09:00-12:00,13:00-15:00' -> ((540, 720), (780, 900))); hatalı aralıklar atlanır
+    """
+    ranges = []
+    for part in (value or '').split(','):
+        if '-' not in part:
+            continue
+        start, end = part.split('-', 1)
+        try:
+            ranges.append((time_to_minutes(start), time_to_minutes(end)))
+        except ValueError:
+            continue
+    return tuple(ranges)
+
+
+class CourseInfo:
+    """
+    Çözücünün kullandığı, veritabanı oturumundan bağımsız ders bilgisi
+    """
+
+    def __init__(self, id, code, name, semester, instructor_id, capacity,
+                 theory, practice, course_type, department_ids, department_codes=(),
+                 preferred_days=None, preferred_times=(), min_students=0):
+        self.id = id
+        self.code = code
+        self.name = name
+        self.semester = semester
+        self.instructor_id = instructor_id
+        self.capacity = capacity or 0
+        self.theory = theory or 0
+        self.practice = practice or 0
+        self.course_type = course_type
+        self.department_ids = tuple(department_ids)
+        self.department_codes = tuple(department_codes)
+        self.preferred_days = preferred_days      # Gün adları kümesi veya None (tercih yok)
+        self.preferred_times = preferred_times    # ((başlangıç, bitiş) dakika, ...)
+        self.min_students = min_students or 0
+
+    @classmethod
+    def from_model(cls, course):
+        return cls(course.id, course.code, course.name, course.semester,
+                   course.instructor_id, course.capacity, course.theory,
+                   course.practice, course.course_type,
+                   [dept.id for dept in course.departments],
+                   [dept.code for dept in course.departments],
+                   parse_preferred_days(course.preferred_days),
+                   parse_preferred_times(course.preferred_times),
+                   course.min_students)
+
+    def fields(self):
+        """Kurucu parametreleri; işlemler arasında düz veri olarak gönderilir (bkz. ScheduleModel.state)"""
+        return (self.id, self.code, self.name, self.semester, self.instructor_id, self.capacity,
+                self.theory, self.practice, self.course_type, self.department_ids,
+                self.department_codes, self.preferred_days, self.preferred_times, self.min_students)
+
+    @property
+    def cohorts(self):
+        """Dersin ait olduğu (bölüm, yarıyıl) grupları"""
+        return [(dept_id, self.semester) for dept_id in self.department_ids]
+
+
+class RoomInfo:
+    """
+    Çözücünün kullandığı, veritabanı oturumundan bağımsız derslik bilgisi
+    """
+
+    def __init__(self, id, code, capacity, type):
+        self.id = id
+        self.code = code
+        self.capacity = capacity or 0
+        self.type = type
+
+    @classmethod
+    def from_model(cls, classroom):
+        return cls(classroom.id, classroom.code, classroom.capacity, classroom.type)
+
+
+class UnavailableInfo:
+    """
+    Öğretim üyesinin müsait olmadığı zaman aralığı
+    """
+
+    def __init__(self, instructor_id, day, start_time, end_time):
+        self.instructor_id = instructor_id
+        self.day = day
+        self.start_time = start_time
+        self.end_time = end_time
+
+    @classmethod
+    def from_model(cls, unavailable_time):
+        return cls(unavailable_time.instructor_id, unavailable_time.day,
+                   unavailable_time.start_time, unavailable_time.end_time)
+
+
+class SessionInfo(CourseInfo):
+    """
+    Dersin haftalık oturumlarından biri (aynı gün, ara vermeden ardışık ders saatleri)
+    Çözücülerin yerleştirdiği birim budur; id alanı (course_id, oturum sırası) çiftidir.
+    """
+
+    def __init__(self, course, part, length):
+        super().__init__(course.id, course.code, course.name, course.semester,
+                         course.instructor_id, course.capacity, course.theory,
+                         course.practice, course.course_type, course.department_ids,
+                         course.department_codes, course.preferred_days,
+                         course.preferred_times, course.min_students)
+        self.id = (course.id, part)
+        self.course_id = course.id
+        self.part = part
+        self.length = length
+
+    def fields(self):
+        """Oturumun ait olduğu dersin kurucu parametreleri"""
+        return (self.course_id,) + super().fields()[1:]
+
+
+def course_sessions(course, max_block=MAX_BLOCK_HOURS):
+    """Dersin teori + uygulama saatinden oturumlarını oluşturur"""
+    return [SessionInfo(course, part, length)
+            for part, length in enumerate(split_hours(course.theory + course.practice, max_block))]
+
+
+def load_snapshot(semesters):
+    """
+    Program oluşturma için gereken tüm verileri tek seferde yükler
+    :param semesters: İşlenecek yarıyıllar listesi
+    :return: (dersler, derslikler, müsait olmama kayıtları) demeti
+    """
+    courses = Course.query.options(selectinload(Course.departments)).filter(
+        Course.semester.in_(semesters)
+    ).order_by(Course.id).all()
+    classrooms = Classroom.query.order_by(Classroom.id).all()
+    unavailable_times = UnavailableTime.query.all()
+
+    return ([CourseInfo.from_model(c) for c in courses],
+            [RoomInfo.from_model(c) for c in classrooms],
+            [UnavailableInfo.from_model(u) for u in unavailable_times])
+
+
+def bits_to_array(value, length):
+    """Bit kümesini length uzunluğunda bool dizisine çevirir (dizinin i. elemanı = i. bit)"""
+    value &= (1 << length) - 1
+    data = np.frombuffer(value.to_bytes(max(-(-length // 8), 1), 'little'), dtype=np.uint8)
+    return np.unpackbits(data, bitorder='little')[:length].astype(bool)
+
+
+class OccupancyTensor:
+    """
+    ScheduleModel bit kümelerinin NumPy karşılığı
+    - room_busy: derslikler x dilimler
+    - instructor_busy: öğretim üyeleri x dilimler (dersler ve müsait olmama kayıtları)
+    - cohort_busy: (bölüm, yarıyıl) grupları x dilimler
+    Dilim ekseni gün x ders saatini birlikte tutar (dilim = gün_sırası * günlük_ders_saati +
+    saat_sırası); gün x saat görünümü için reshape(-1, gün sayısı, günlük ders saati) yeterlidir.
+    Bir oturumun tüm uygun (dilim, derslik) yerleşimleri, derslik döngüsü olmadan birkaç
+    yayınlanmış (broadcast) AND/OR işlemi ve kontenjan maskesiyle tek seferde hesaplanır.
+    Tensör, modelin place/remove çağrılarıyla güncel tutulur.
+    """
+
+    def __init__(self, model, sessions=()):
+        self.model = model
+        self.slot_count = model.slot_count
+        self.rooms = list(model.classrooms)
+        self.room_index = {room.id: index for index, room in enumerate(self.rooms)}
+        self.capacity = np.array([room.capacity for room in self.rooms], dtype=np.int64)
+        self.lab = np.array([room.type == 'LAB' for room in self.rooms], dtype=bool)
+        self.normal = np.array([room.type == 'NORMAL' for room in self.rooms], dtype=bool)
+        self.room_busy = self._stack([model.room_busy.get(room.id, 0) for room in self.rooms])
+
+        instructors = set(model.instructor_busy)
+        instructors.update(session.instructor_id for session in sessions if session.instructor_id)
+        self.instructor_index = {instructor_id: index for index, instructor_id in enumerate(instructors)}
+        self.instructor_busy = self._stack([model.instructor_busy.get(i, 0) for i in instructors])
+
+        cohorts = set(model.cohort_busy)
+        cohorts.update(cohort for session in sessions for cohort in session.cohorts)
+        self.cohort_index = {cohort: index for index, cohort in enumerate(cohorts)}
+        self.cohort_busy = self._stack([model.cohort_busy.get(cohort, 0) for cohort in cohorts])
+
+        self._starts = {}
+        self._free_rooms = {}  # oturum uzunluğu -> dilimler x derslikler boş pencere maskesi
+
+    def _stack(self, masks):
+        if not masks:
+            return np.zeros((0, self.slot_count), dtype=bool)
+        return np.vstack([bits_to_array(mask, self.slot_count) for mask in masks])
+
+    def _row(self, name, key):
+        """Anahtarın satır sırasını döndürür; yoksa boş bir satır ekler"""
+        index = getattr(self, name + '_index')
+        if key not in index:
+            index[key] = len(index)
+            busy = getattr(self, name + '_busy')
+            setattr(self, name + '_busy', np.vstack([busy, np.zeros((1, self.slot_count), dtype=bool)]))
+        return index[key]
+
+    def start_mask(self, length):
+        """length saatlik bir oturumun başlayabileceği dilimlerin maskesi"""
+        if length not in self._starts:
+            mask = np.zeros(self.slot_count, dtype=bool)
+            mask[self.model.starts(length)] = True
+            self._starts[length] = mask
+        return self._starts[length]
+
+    def window(self, busy, length):
+        """
+        [..., dilim] elemanı, dilimden başlayan length saatlik pencerede dolu saat varsa True
+        Haftanın sonuna sığmayan pencereler dolu sayılır.
+        """
+        out = busy.copy()
+        for offset in range(1, length):
+            out[..., :-offset] |= busy[..., offset:]
+            out[..., -offset:] = True
+        return out
+
+    def suitable(self, session):
+        """Oturumun kontenjanını ve türünü karşılayan dersliklerin maskesi (bkz. suitable_rooms)"""
+        kind = self.normal | self.lab if session.practice > 0 else self.normal
+        return kind & (self.capacity >= session.capacity)
+
+    def feasible(self, session):
+        """
+        Oturumun tüm uygun yerleşimleri
+        :return: dilimler x derslikler bool matrisi; [dilim, i] True ise oturum o dilimde
+                 başlayıp rooms[i] dersliğine çakışmasız yerleşebilir
+        """
+        length = session.length
+        available = self.start_mask(length).copy()
+        if session.instructor_id in self.instructor_index:
+            busy = self.instructor_busy[self.instructor_index[session.instructor_id]]
+            available &= ~self.window(busy, length)
+        rows = [self.cohort_index[cohort] for cohort in session.cohorts if cohort in self.cohort_index]
+        if rows:
+            available &= ~self.window(self.cohort_busy[rows].any(axis=0), length)
+        if length not in self._free_rooms:
+            self._free_rooms[length] = ~self.window(self.room_busy, length).T
+        return available[:, None] & self._free_rooms[length] & self.suitable(session)[None, :]
+
+    def mark(self, session, classroom, slot, busy):
+        """Yerleşimin kapladığı saatleri dolu (busy=True) veya boş işaretler"""
+        span = slice(slot, slot + session.length)
+        if session.instructor_id:
+            self.instructor_busy[self._row('instructor', session.instructor_id), span] = busy
+        for cohort in session.cohorts:
+            self.cohort_busy[self._row('cohort', cohort), span] = busy
+        self.room_busy[self.room_index[classroom.id], span] = busy
+        self._free_rooms.clear()
+
+
+class RoomIndex:
+    """
+    En uygun (best-fit) derslik indeksi
+    Derslikler türe göre (NORMAL, LAB, ...) ayrılır ve kapasiteye göre sıralanır. Her tür ve
+    dilim için boş dersliklerin bit kümesi tutulur (i. bit = türün sıralı listesindeki i.
+    derslik). "Kontenjanı karşılayan en küçük boş derslik" sorgusu: kapasite listesinde
+    ikili arama (O(log n)), oturumun dilimlerindeki boş kümelerin AND'i ve en düşük bitin
+    bulunması. Büyük derslikler, onlara gerçekten ihtiyaç duyan derslere kalır.
+    """
+
+    def __init__(self, classrooms, slot_count):
+        by_type = defaultdict(list)
+        for room in classrooms:
+            by_type[room.type].append(room)
+        self.rooms = {}        # tür -> kapasiteye göre sıralı derslikler
+        self.capacities = {}   # tür -> sıralı kapasite listesi (ikili arama için)
+        self.free = {}         # tür -> [dilim başına boş derslik bit kümesi]
+        self.position = {}     # derslik id -> (tür, sıra)
+        for room_type, rooms in by_type.items():
+            rooms.sort(key=lambda room: (room.capacity, room.id))
+            self.rooms[room_type] = rooms
+            self.capacities[room_type] = [room.capacity for room in rooms]
+            self.free[room_type] = [(1 << len(rooms)) - 1] * slot_count
+            for index, room in enumerate(rooms):
+                self.position[room.id] = (room_type, index)
+
+    def mark(self, classroom, mask, busy):
+        """Dersliğin mask bitlerindeki dilimlerini dolu (busy=True) veya boş işaretler"""
+        if classroom.id not in self.position:
+            return
+        room_type, index = self.position[classroom.id]
+        free = self.free[room_type]
+        bit = 1 << index
+        while mask:
+            low = mask & -mask
+            slot = low.bit_length() - 1
+            if busy:
+                free[slot] &= ~bit
+            else:
+                free[slot] |= bit
+            mask ^= low
+
+    def best_fit(self, room_type, capacity, slot, length):
+        """
+        slot'tan başlayan length saat boyunca boş, kapasitesi capacity'den küçük olmayan
+        en küçük derslik (yoksa None)
+        """
+        rooms = self.rooms.get(room_type)
+        if not rooms:
+            return None
+        first = bisect_left(self.capacities[room_type], capacity)
+        free = self.free[room_type]
+        candidates = free[slot]
+        for offset in range(1, length):
+            candidates &= free[slot + offset]
+        candidates >>= first
+        if not candidates:
+            return None
+        return rooms[first + (candidates & -candidates).bit_length() - 1]
+
+
+class ScheduleModel:
+    """
+    Gün x ders saati bit kümeleriyle tutulan doluluk modeli
+
+    Her ders saatine bir bit karşılık gelir (bit = gün_sırası * günlük_ders_saati + saat_sırası).
+    Öğretim üyeleri, derslikler ve (bölüm, yarıyıl) grupları için ayrı bit kümeleri tutulur.
+    Bir oturum, başladığı bitten itibaren uzunluğu kadar ardışık biti kaplar; bir yerleşimin
+    uygunluğu, oturum uzunluğundan bağımsız olarak birkaç AND işlemiyle kontrol edilir.
+    "Dilim" (slot), oturumun başladığı bitin sırasıdır.
+    """
+
+    def __init__(self, classrooms, unavailable_times, days=DAYS, periods=PERIODS):
+        self.days = list(days)
+        self.periods = list(periods)
+        self.classrooms = list(classrooms)
+        self.lab_classrooms = [c for c in self.classrooms if c.type == 'LAB']
+        self.normal_classrooms = [c for c in self.classrooms if c.type == 'NORMAL']
+
+        self.instructor_busy = defaultdict(int)   # instructor_id -> bit kümesi
+        self.room_busy = defaultdict(int)         # classroom_id -> bit kümesi
+        self.cohort_busy = defaultdict(int)       # (department_id, semester) -> bit kümesi
+        self.assignments = {}                     # session_id -> (session, classroom, slot)
+
+        # Ardışık ders saatleri: aralarındaki fark en küçük adıma eşit olanlar (öğle arası bölür)
+        starts = [time_to_minutes(start) for start, _ in self.periods]
+        steps = [b - a for a, b in zip(starts, starts[1:])]
+        step = min(steps) if steps else 0
+        self.contiguous = [gap == step for gap in steps]
+        self._starts = {}
+        self._tensor = None
+        self.room_index = RoomIndex(self.classrooms, self.slot_count)
+
+        # Müsait olmama kayıtlarını öğretim üyesinin bit kümesine işle
+        for unavailable in unavailable_times:
+            self.block_instructor(unavailable.instructor_id, unavailable.day,
+                                  unavailable.start_time, unavailable.end_time)
+
+    @property
+    def slot_count(self):
+        """Haftadaki toplam ders saati (bit) sayısı"""
+        return len(self.days) * len(self.periods)
+
+    def starts(self, length):
+        """length saatlik bir oturumun başlayabileceği dilimler (aynı gün, ara vermeden ardışık saatler)"""
+        if length not in self._starts:
+            offsets = [p for p in range(len(self.periods) - length + 1)
+                       if all(self.contiguous[p:p + length - 1])]
+            self._starts[length] = [day * len(self.periods) + p
+                                    for day in range(len(self.days)) for p in offsets]
+        return self._starts[length]
+
+    @staticmethod
+    def mask(slot, length):
+        """slot'tan başlayan length saatlik oturumun bit maskesi"""
+        return ((1 << length) - 1) << slot
+
+    def span(self, slot, length):
+        """Oturumun (gün, başlangıç saati, bitiş saati) bilgisini döndürür"""
+        day_index, period = divmod(slot, len(self.periods))
+        return self.days[day_index], self.periods[period][0], self.periods[period + length - 1][1]
+
+    def interval_mask(self, day, start_time, end_time):
+        """Verilen gün ve saat aralığıyla çakışan tüm ders saatlerinin bit maskesi"""
+        if day not in self.days:
+            return 0
+        start, end = time_to_minutes(start_time), time_to_minutes(end_time)
+        base = self.days.index(day) * len(self.periods)
+        mask = 0
+        for index, (period_start, period_end) in enumerate(self.periods):
+            if start < time_to_minutes(period_end) and end > time_to_minutes(period_start):
+                mask |= 1 << (base + index)
+        return mask
+
+    def find_slot(self, day, start_time, end_time):
+        """
+        Zaman aralığı ardışık ders saatlerine birebir denk geliyorsa (dilim, uzunluk) döndürür
+        Elle girilmiş, ders saatlerine uymayan aralıklar için None döner.
+        """
+        if day not in self.days:
+            return None
+        period_starts = [start for start, _ in self.periods]
+        period_ends = [end for _, end in self.periods]
+        if start_time not in period_starts or end_time not in period_ends:
+            return None
+        first, last = period_starts.index(start_time), period_ends.index(end_time)
+        length = last - first + 1
+        if length < 1 or not all(self.contiguous[first:last]):
+            return None
+        return self.days.index(day) * len(self.periods) + first, length
+
+    def block_instructor(self, instructor_id, day, start_time, end_time):
+        """Öğretim üyesinin verilen aralıkla çakışan tüm ders saatlerini dolu işaretler"""
+        self.instructor_busy[instructor_id] |= self.interval_mask(day, start_time, end_time)
+        self._tensor = None
+
+    def occupancy_tensor(self, sessions=()):
+        """
+        Modelin NumPy doluluk tensörünü döndürür
+        İlk çağrıda bit kümelerinden oluşturulur, sonra place/remove ile güncel tutulur.
+        :param sessions: Satırları önceden ayrılacak oturumlar (öğretim üyesi ve gruplar)
+        """
+        if self._tensor is None:
+            self._tensor = OccupancyTensor(self, sessions)
+        return self._tensor
+
+    def feasible_placements(self, session):
+        """Oturumun tüm uygun yerleşimleri: dilimler x derslikler bool matrisi (bkz. OccupancyTensor)"""
+        return self.occupancy_tensor().feasible(session)
+
+    def is_available(self, session, slot):
+        """Öğretim üyesi ve bölüm-yarıyıl grubu açısından dilim uygun mu?"""
+        mask = self.mask(slot, session.length)
+        if session.instructor_id and self.instructor_busy[session.instructor_id] & mask:
+            return False
+        for cohort in session.cohorts:
+            if self.cohort_busy[cohort] & mask:
+                return False
+        return True
+
+    def suitable_rooms(self, course):
+        """
+        Dersin kontenjanını ve türünü karşılayan tüm derslikler (doluluktan bağımsız).
+        Uygulamalı dersler laboratuvarlara ve normal dersliklere, diğerleri yalnızca
+        normal dersliklere yerleşebilir.
+        """
+        rooms = [c for c in self.normal_classrooms if c.capacity >= course.capacity]
+        if course.practice > 0:
+            rooms = [c for c in self.lab_classrooms if c.capacity >= course.capacity] + rooms
+        return rooms
+
+    def best_room(self, session, slot):
+        """
+        Oturum boyunca boş, kontenjanı karşılayan en küçük dersliği döndürür (yoksa None)
+        Uygulamalı dersler için önce laboratuvarlara bakılır.
+        """
+        room_types = ['LAB', 'NORMAL'] if session.practice > 0 else ['NORMAL']
+        for room_type in room_types:
+            room = self.room_index.best_fit(room_type, session.capacity, slot, session.length)
+            if room is not None:
+                return room
+        return None
+
+    def place(self, session, classroom, slot):
+        """Oturumu verilen dersliğe ve dilime yerleştirir"""
+        mask = self.mask(slot, session.length)
+        if session.instructor_id:
+            self.instructor_busy[session.instructor_id] |= mask
+        for cohort in session.cohorts:
+            self.cohort_busy[cohort] |= mask
+        self.room_busy[classroom.id] |= mask
+        self.room_index.mark(classroom, mask, True)
+        self.assignments[session.id] = (session, classroom, slot)
+        if self._tensor is not None:
+            self._tensor.mark(session, classroom, slot, True)
+
+    def remove(self, session_id):
+        """Yerleştirilmiş bir oturumu modelden çıkarır"""
+        session, classroom, slot = self.assignments.pop(session_id)
+        mask = ~self.mask(slot, session.length)
+        if session.instructor_id:
+            self.instructor_busy[session.instructor_id] &= mask
+        for cohort in session.cohorts:
+            self.cohort_busy[cohort] &= mask
+        self.room_busy[classroom.id] &= mask
+        self.room_index.mark(classroom, ~mask, False)
+        if self._tensor is not None:
+            self._tensor.mark(session, classroom, slot, False)
+
+    def can_move(self, session_id, classroom, slot):
+        """
+        Yerleşmiş bir oturum verilen dersliğe ve dilime taşınabilir mi?
+        Oturumun kendi kapladığı saatler doluluk hesabından düşülür.
+        """
+        session, current_room, current_slot = self.assignments[session_id]
+        own = ~self.mask(current_slot, session.length)
+        mask = self.mask(slot, session.length)
+        if session.instructor_id and self.instructor_busy[session.instructor_id] & own & mask:
+            return False
+        for cohort in session.cohorts:
+            if self.cohort_busy[cohort] & own & mask:
+                return False
+        busy = self.room_busy[classroom.id]
+        if classroom.id == current_room.id:
+            busy &= own
+        return not busy & mask
+
+    def move(self, session_id, classroom, slot):
+        """Yerleşmiş bir oturumu verilen dersliğe ve dilime taşır (bkz. can_move)"""
+        session = self.assignments[session_id][0]
+        self.remove(session_id)
+        self.place(session, classroom, slot)
+
+    def copy(self):
+        """
+        Modelin bağımsız bir kopyasını döndürür: öğretim üyesi, grup ve derslik bit kümeleri,
+        derslik dizini ve yerleşimler (sabit öğeler dahil) birlikte kopyalanır.
+        NumPy tensörü kopyalanmaz; gerektiğinde kopyada yeniden oluşturulur.
+        """
+        tensor, self._tensor = self._tensor, None
+        try:
+            return copy.deepcopy(self)
+        finally:
+            self._tensor = tensor
+
+    def state(self):
+        """
+        Modelin yalnızca sayı, metin, demet ve sözlüklerden oluşan durumunu döndürür;
+        başka bir işleme gönderilir ve orada from_state ile yeniden kurulur.
+        Sabit öğeler bit kümelerinde bulunduğundan ayrıca gönderilmez.
+        """
+        return {
+            'days': self.days,
+            'periods': self.periods,
+            'classrooms': [(room.id, room.code, room.capacity, room.type) for room in self.classrooms],
+            'instructor_busy': dict(self.instructor_busy),
+            'room_busy': dict(self.room_busy),
+            'cohort_busy': dict(self.cohort_busy),
+            'assignments': [(session.fields(), session.part, session.length, classroom.id, slot)
+                            for session, classroom, slot in self.assignments.values()],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """state ile alınan durumdan modeli yeniden kurar"""
+        model = cls([RoomInfo(*room) for room in state['classrooms']], (), state['days'], state['periods'])
+        model.instructor_busy.update(state['instructor_busy'])
+        model.room_busy.update(state['room_busy'])
+        model.cohort_busy.update(state['cohort_busy'])
+        rooms = {room.id: room for room in model.classrooms}
+        for room in model.classrooms:
+            model.room_index.mark(room, model.room_busy.get(room.id, 0), True)
+        for fields, part, length, classroom_id, slot in state['assignments']:
+            session = SessionInfo(CourseInfo(*fields), part, length)
+            model.assignments[session.id] = (session, rooms[classroom_id], slot)
+        return model
+
+    def occupy(self, course, classroom, day, start_time, end_time):
+        """
+        Ders saatlerine denk gelmeyen (elle eklenmiş) bir program öğesini sabit olarak işler:
+        çakıştığı tüm ders saatleri ilgili öğretim üyesi, grup ve derslik için dolu sayılır.
+        """
+        mask = self.interval_mask(day, start_time, end_time)
+        if course.instructor_id:
+            self.instructor_busy[course.instructor_id] |= mask
+        for cohort in course.cohorts:
+            self.cohort_busy[cohort] |= mask
+        self.room_busy[classroom.id] |= mask
+        self.room_index.mark(classroom, mask, True)
+        self._tensor = None
+
+    def placement_valid(self, session, classroom, slot):
+        """Mevcut bir yerleşim (oturum, derslik, dilim) tüm kısıtları sağlıyor mu?"""
+        if not any(room.id == classroom.id for room in self.suitable_rooms(session)):
+            return False
+        mask = self.mask(slot, session.length)
+        return self.is_available(session, slot) and not self.room_busy[classroom.id] & mask
+
+    def conflicts(self, session, slot):
+        """
+        Oturumu dilime yerleştirmek için programdan çıkarılması gereken oturumlar
+        :return: Çıkarılacak session_id kümesi; dilim müsait olmama kaydı veya sabit
+                 öğelerle dolu olduğu için hiç kullanılamıyorsa None
+        """
+        mask = self.mask(slot, session.length)
+        occupants = [(s, r) for s, r, start in self.assignments.values()
+                     if self.mask(start, s.length) & mask]
+
+        evict = set()
+        if session.instructor_id and self.instructor_busy[session.instructor_id] & mask:
+            same = [s for s, _ in occupants if s.instructor_id == session.instructor_id]
+            if not self._covered(self.instructor_busy[session.instructor_id] & mask, same):
+                return None
+            evict |= {s.id for s in same}
+        for cohort in session.cohorts:
+            if self.cohort_busy[cohort] & mask:
+                same = [s for s, _ in occupants if cohort in s.cohorts]
+                if not self._covered(self.cohort_busy[cohort] & mask, same):
+                    return None
+                evict |= {s.id for s in same}
+
+        # Çıkarılacak oturumların boşaltacağı saatler de hesaba katılarak derslik ara
+        best = None
+        for room in self.suitable_rooms(session):
+            busy = self.room_busy[room.id] & mask
+            owners = [s for s, r in occupants if r.id == room.id]
+            if not self._covered(busy, owners):
+                continue
+            extra = {s.id for s in owners} - evict
+            if best is None or (len(extra), room.capacity) < (len(best), best_capacity):
+                best, best_capacity = extra, room.capacity
+        if best is None:
+            return None
+        return evict | best
+
+    def _covered(self, busy, sessions):
+        """busy bitlerinin tamamı verilen (yerinden edilebilir) oturumlardan mı geliyor?"""
+        for session in sessions:
+            busy &= ~self.mask(self.assignments[session.id][2], session.length)
+        return not busy
+
+    def try_place(self, session, slot):
+        """
+        Oturumu dilime, kontenjanı karşılayan en küçük boş dersliğe yerleştirmeyi dener
+        :return: Yerleştirildiyse seçilen derslik, aksi halde None
+        """
+        if not self.is_available(session, slot):
+            return None
+        classroom = self.best_room(session, slot)
+        if classroom is None:
+            return None
+        self.place(session, classroom, slot)
+        return classroom
+
+    def row(self, session_id):
+        """Bir oturumun yerleşimini Schedule satırı sözlüğüne çevirir"""
+        session, classroom, slot = self.assignments[session_id]
+        day, start_time, end_time = self.span(slot, session.length)
+        return {
+            'course_id': session.course_id,
+            'classroom_id': classroom.id,
+            'day': day,
+            'start_time': start_time,
+            'end_time': end_time,
+            **time_fields(day, start_time, end_time)
+        }
+
+    def rows(self):
+        """Yerleşimleri toplu ekleme için Schedule satırlarına çevirir"""
+        return [self.row(session_id) for session_id in self.assignments]
+
+
+def repair_placements(model, pending, max_steps=500, rng=random):
+    """
+    Artımlı onarım: yalnızca geçersiz hale gelen oturumları yeniden yerleştirir
+    Önce çakışmasız bir (dilim, derslik) aranır (en küçük yeterli derslik seçilir). Bulunamazsa
+    min-conflicts yerel araması uygulanır: en az oturumu yerinden edecek dilim seçilir, yerinden
+    edilen komşular kuyruğa eklenir. Yerinden edilen oturum, çıkarıldığı dilime geri dönemez
+    (tabu), böylece iki oturum birbirini sonsuza kadar itmez.
+    :param pending: Yeniden yerleştirilecek oturumlar (SessionInfo)
+    :param max_steps: Yerel arama adım sınırı
+    :return: (yeri değişen/yeniden yerleşen session_id kümesi, yerleştirilemeyen oturumlar)
+    """
+    queue = list(pending)
+    moved = set()
+    unplaced = []
+    tabu = {}
+    steps = 0
+
+    while queue:
+        session = queue.pop(0)
+        steps += 1
+
+        # Çakışmasız yerleşim: en küçük yeterli derslik, eşitlikte en erken dilim
+        tensor = model.occupancy_tensor()
+        feasible = tensor.feasible(session)
+        if session.id in tabu:
+            feasible[tabu[session.id]] = False
+        if feasible.any():
+            capacity = np.where(feasible, tensor.capacity[None, :], np.iinfo(np.int64).max)
+            slot, room_index = np.unravel_index(np.argmin(capacity), capacity.shape)
+            model.place(session, tensor.rooms[room_index], int(slot))
+            moved.add(session.id)
+            continue
+
+        if steps > max_steps:
+            unplaced.append(session)
+            continue
+
+        # Min-conflicts: en az oturum yerinden eden dilim
+        best, best_slots = None, []
+        for slot in model.starts(session.length):
+            if tabu.get(session.id) == slot:
+                continue
+            evict = model.conflicts(session, slot)
+            if evict is None:
+                continue
+            if best is None or len(evict) < best:
+                best, best_slots = len(evict), [(slot, evict)]
+            elif len(evict) == best:
+                best_slots.append((slot, evict))
+        if not best_slots:
+            unplaced.append(session)
+            continue
+
+        slot, evict = rng.choice(best_slots)
+        for session_id in evict:
+            evicted = model.assignments[session_id][0]
+            model.remove(session_id)
+            tabu[session_id] = slot
+            queue.append(evicted)
+        model.place(session, model.best_room(session, slot), slot)
+        moved.add(session.id)
+
+    moved -= {session.id for session in unplaced}
+    return moved, unplaced
+
+
+# =====================================================================================
+# Çözücüler
+# Her çözücü aynı imzaya sahiptir: solver(model, phases, progress=None, **options) -> SolverResult
+# phases: [(aşama adı, [CourseInfo, ...]), ...] sıralı ders grupları (bkz. cohort_phases)
+# Çözücüler dersleri oturumlara (SessionInfo) böler ve oturumları yerleştirir.
+# progress: İlerleme bildirimi için progress(aşama, yerleşen oturum sayısı, toplam oturum sayısı)
+# =====================================================================================
+
+class SolverResult:
+    """
+    Çözücü çıktısı
+    status: 'complete' (tüm oturumlar yerleşti), 'partial' (rastgele çözücü bazı oturumları
+            yerleştiremedi), 'infeasible' (tam yerleşim olmadığı kanıtlandı) veya
+            'limit' (arama sınırına ulaşıldı, en iyi kısmi sonuç döndü)
+    unplaced: Yerleştirilemeyen oturumlar
+    proof: Yerleşimin imkansız olduğunu gösteren gerekçeler (varsa)
+    """
+
+    def __init__(self, status, unplaced, proof=None, nodes=0):
+        self.status = status
+        self.unplaced = list(unplaced)
+        self.proof = list(proof or [])
+        self.nodes = nodes
+
+    @property
+    def complete(self):
+        return self.status == 'complete'
+
+
+def cohort_phases(courses):
+    """
+    Dersleri (bölüm, yarıyıl) grup ilişki dizinine göre yerleştirme aşamalarına ayırır
+    Dizin bir kez kurulur; bölüm sayısından bağımsız olarak dersler üzerinde tek geçiştir.
+    Önce birden fazla grupla paylaşılan dersler ('ORTAK'), paylaşıldıkları grup sayısına göre
+    azalan sırada yerleşir (en kısıtlı dersler boş programa ilk yerleşir); ardından yalnızca
+    tek bir bölüme ait dersler bölüm kodu sırasıyla gelir. Bölümü olmayan dersler atlanır.
+    :param courses: CourseInfo listesi (aynı paylaşım sayısında bu sıra korunur)
+    :return: [(aşama adı, [CourseInfo, ...]), ...]
+    """
+    shared = []
+    by_department = {}
+    for course in courses:
+        cohorts = course.cohorts
+        if len(cohorts) > 1:
+            shared.append(course)
+        elif cohorts:
+            code = course.department_codes[0] if course.department_codes else str(cohorts[0][0])
+            by_department.setdefault(code, []).append(course)
+
+    shared.sort(key=lambda course: -len(course.cohorts))
+    phases = [("ORTAK", shared)] if shared else []
+    phases.extend((code, by_department[code]) for code in sorted(by_department))
+    return phases
+
+
+def phase_courses(phases):
+    """Aşamalardaki dersleri ilk görülme sırasıyla, tekrarsız döndürür"""
+    courses = []
+    seen = set()
+    for _, courses_in_phase in phases:
+        for course in courses_in_phase:
+            if course.id not in seen:
+                seen.add(course.id)
+                courses.append(course)
+    return courses
+
+
+def phase_sessions(phases):
+    """Aşamalardaki derslerin oturumlarını ilk görülme sırasıyla döndürür"""
+    return [session for course in phase_courses(phases) for session in course_sessions(course)]
+
+
+def solve_random(model, phases, rng=random, max_attempts=100, debug_mode=False, verbose=True,
+                 progress=None):
+    """
+    Mevcut rastgele çözücü: her oturum için rastgele bir başlangıç saati seçer,
+    en fazla max_attempts denemede yerleştiremezse oturumu atlar.
+    """
+    scheduled_sessions = set()
+    unplaced = []
+    total = len(phase_sessions(phases))
+
+    for name, courses in phases:
+        if verbose:
+            print(f"\n=== {name} DERSLERİ YERLEŞTİRİLİYOR ===")
+        for course in courses:
+            for session in course_sessions(course):
+                # Bu oturum daha önce programlanmış mı kontrol et
+                if session.id in scheduled_sessions:
+                    continue
+
+                placed = False
+                starts = model.starts(session.length)
+                for _ in range(max_attempts if starts else 0):
+                    slot = rng.choice(starts)
+
+                    classroom = model.try_place(session, slot)
+                    if classroom:
+                        scheduled_sessions.add(session.id)
+                        placed = True
+                        if debug_mode:
+                            day, start_time, end_time = model.span(slot, session.length)
+                            print(f"YERLEŞTİRİLDİ: {session.code} dersi {day} günü {start_time}-{end_time} saatlerinde {classroom.code} dersliğine yerleştirildi.")
+                        break
+
+                if not placed:
+                    unplaced.append(session)
+                    if verbose:
+                        print(f"UYARI: {session.code} dersinin {session.length} saatlik oturumu için uygun zaman dilimi bulunamadı.")
+
+                if progress:
+                    progress(name, len(scheduled_sessions), total)
+
+    return SolverResult('partial' if unplaced else 'complete', unplaced)
+
+
+def popcount(value):
+    """Bit kümesindeki 1 sayısı"""
+    return bin(value).count('1')
+
+
+class BacktrackingSolver:
+    """
+    Kısıt yayılımlı, geri izlemeli (backtracking) deterministik çözücü
+
+    - Değişkenler oturumlar, değerler (başlangıç dilimi, derslik) çiftleridir. Her oturumun
+      alanı {dilim: {derslik id'leri}} sözlüğü olarak tutulur.
+    - Değişken seçimi: en az uygun (dilim, derslik) çiftine sahip oturum önce
+      (most-constrained-first), eşitlikte daha çok grupla paylaşılan oturum önce.
+    - Değer sırası: komşuların alanından en az dilim silen dilim önce (least-constraining),
+      eşitlikte en küçük yeterli derslik (uygulamalı derslerde önce laboratuvar).
+    - İleri kontrol: bir yerleşimden sonra aynı öğretim üyesine / bölüm-yarıyıl grubuna
+      ait oturumların alanından çakışan dilimler, diğer tüm oturumların alanından çakışan
+      dilimlerdeki o derslik çıkarılır. Boşalan alan geri izlemeyi tetikler.
+    - Arama düğüm ve süre sınırıyla çalışır; sınıra ulaşılırsa en çok oturumu yerleştiren
+      kısmi sonuç döner.
+    """
+
+    def __init__(self, model, sessions, node_limit=200000, time_limit=30.0, progress=None):
+        self.model = model
+        self.sessions = {session.id: session for session in sessions}
+        self.rooms = {room.id: room for room in model.classrooms}
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        self.progress = progress
+        self.nodes = 0
+
+        self.room_counts = {}
+        self.room_users = defaultdict(list)
+        self.domains = {}
+        self.sizes = {}
+        tensor = model.occupancy_tensor(sessions)
+        for sid, session in self.sessions.items():
+            rooms = model.suitable_rooms(session)
+            self.room_counts[sid] = len(rooms)
+            for room in rooms:
+                self.room_users[room.id].append(sid)
+            # Alan: tüm uygun (dilim, derslik) çiftleri tek tensör işlemiyle
+            feasible = tensor.feasible(session)
+            domain = {}
+            for slot in np.flatnonzero(feasible.any(axis=1)):
+                domain[int(slot)] = {tensor.rooms[index].id for index in np.flatnonzero(feasible[slot])}
+            self.domains[sid] = domain
+            self.sizes[sid] = sum(len(free) for free in domain.values())
+
+        # Aynı öğretim üyesini veya aynı bölüm-yarıyıl grubunu paylaşan oturumlar
+        by_key = defaultdict(list)
+        for sid, session in self.sessions.items():
+            if session.instructor_id:
+                by_key[('instructor', session.instructor_id)].append(sid)
+            for cohort in session.cohorts:
+                by_key[('cohort', cohort)].append(sid)
+        self.neighbors = {sid: set() for sid in self.sessions}
+        for members in by_key.values():
+            for sid in members:
+                self.neighbors[sid].update(m for m in members if m != sid)
+
+        self.assigned = {}
+        self.skipped = 0
+
+    def static_proof(self):
+        """
+        Aramaya başlamadan görülebilen imkansızlık gerekçeleri
+        :return: (gerekçe listesi, hiçbir dilime yerleşemeyen oturumların id kümesi,
+                  yerleşebilecek oturumlardan en az kaçının atlanacağına dair alt sınır)
+        """
+        model = self.model
+        proof = []
+        dead = set()
+        lower_bound = 0
+        for sid, session in self.sessions.items():
+            if self.domains[sid]:
+                continue
+            dead.add(sid)
+            if not self.room_counts[sid]:
+                proof.append(f"{session.code}: kontenjanı ({session.capacity}) ve türü için uygun derslik yok.")
+            elif session.instructor_id and not any(
+                    not model.instructor_busy[session.instructor_id] & model.mask(slot, session.length)
+                    for slot in model.starts(session.length)):
+                proof.append(f"{session.code}: öğretim üyesi {session.length} saatlik oturum için "
+                             f"hiçbir zaman diliminde müsait değil.")
+            else:
+                proof.append(f"{session.code}: {session.length} saatlik oturum için hiçbir zaman diliminde "
+                             f"çakışmasız yerleşim yok.")
+
+        # Güvercin yuvası kontrolleri: bir gruba/öğretim üyesine düşen ders saati,
+        # kullanılabilir ders saati sayısını aşıyorsa tam yerleşim yoktur
+        groups = defaultdict(set)
+        for sid, session in self.sessions.items():
+            for dept_code, cohort in zip(session.department_codes, session.cohorts):
+                groups[(f"{dept_code} bölümü {cohort[1]}. yarıyıl", 'cohort', cohort)].add(sid)
+            if session.instructor_id:
+                groups[(f"#{session.instructor_id} numaralı öğretim üyesi", 'instructor', session.instructor_id)].add(sid)
+        for (label, _, _), members in groups.items():
+            available = 0
+            for sid in members:
+                for slot in self.domains[sid]:
+                    available |= model.mask(slot, self.sessions[sid].length)
+            reasons = []
+            hours = sum(self.sessions[sid].length for sid in members)
+            if hours > popcount(available):
+                alive = [self.sessions[sid].length for sid in members - dead]
+                if alive:
+                    excess = sum(alive) - popcount(available)
+                    lower_bound = max(lower_bound, -(-excess // max(alive)))
+                reasons.append(f"{label}: {hours} saat ders var, ancak yalnızca {popcount(available)} "
+                               f"uygun ders saati var.")
+            # Uzun oturumlar ardışık saat ister: en az L saatlik oturum sayısı, uygun
+            # saatlere sığabilecek ayrık L saatlik blok sayısını aşamaz
+            for length, need, alive in self._long_sessions(members, dead):
+                fit = self._packing(available, length)
+                if need > fit:
+                    lower_bound = max(lower_bound, alive - fit)
+                    reasons.append(f"{label}: en az {length} saatlik {need} oturum var, ancak uygun "
+                                   f"saatlere yalnızca {fit} tanesi sığıyor.")
+            proof.extend(reasons[:1])
+
+        full = (1 << model.slot_count) - 1
+        free = [full & ~model.room_busy[room.id] for room in model.classrooms]
+        room_hours = sum(popcount(mask) for mask in free)
+        reasons = []
+        hours = sum(session.length for session in self.sessions.values())
+        if hours > room_hours:
+            alive = [self.sessions[sid].length for sid in self.sessions if sid not in dead]
+            if alive:
+                lower_bound = max(lower_bound, -(-(sum(alive) - room_hours) // max(alive)))
+            reasons.append(f"{hours} saat ders için yalnızca {room_hours} boş (derslik, ders saati) çifti var "
+                           f"({len(model.classrooms)} derslik).")
+        for length, need, alive in self._long_sessions(set(self.sessions), dead):
+            fit = sum(self._packing(mask, length) for mask in free)
+            if need > fit:
+                lower_bound = max(lower_bound, alive - fit)
+                reasons.append(f"En az {length} saatlik {need} oturum var, ancak dersliklerin boş "
+                               f"saatlerine yalnızca {fit} tanesi sığıyor.")
+        proof.extend(reasons[:1])
+        return proof, dead, lower_bound
+
+    def _long_sessions(self, members, dead):
+        """Her oturum uzunluğu L için (L, en az L saatlik oturum sayısı, bunlardan yerleşebilecek olanlar)"""
+        for length in sorted({self.sessions[sid].length for sid in members}, reverse=True):
+            if length < 2:
+                continue
+            longer = [sid for sid in members if self.sessions[sid].length >= length]
+            yield length, len(longer), len([sid for sid in longer if sid not in dead])
+
+    def _packing(self, available, length):
+        """available bit kümesine sığabilecek en fazla ayrık, length saatlik ardışık blok sayısı"""
+        model = self.model
+        count, run = 0, 0
+        for bit in range(model.slot_count):
+            period = bit % len(model.periods)
+            if period == 0 or not model.contiguous[period - 1]:
+                count += run // length
+                run = 0
+            if available >> bit & 1:
+                run += 1
+            else:
+                count += run // length
+                run = 0
+        return count + run // length
+
+    def _select(self, active):
+        best, best_key = None, None
+        for sid in active:
+            if sid in self.assigned:
+                continue
+            session = self.sessions[sid]
+            key = (self.sizes[sid], -len(session.cohorts), -session.length, -len(self.neighbors[sid]), sid)
+            if best_key is None or key < best_key:
+                best, best_key = sid, key
+        return best
+
+    def _overlapping(self, sid, slot, length):
+        """sid oturumunun alanında, slot'tan başlayan length saatlik oturumla çakışan dilimler"""
+        domain = self.domains[sid]
+        first = slot - self.sessions[sid].length + 1
+        return [s for s in range(first, slot + length) if s in domain]
+
+    def _order(self, sid):
+        """En az kısıtlayan değer önce: komşuların alanından en az dilim silen dilimler"""
+        session = self.sessions[sid]
+        lab_first = session.practice > 0
+
+        def cost(slot):
+            return sum(len(self._overlapping(n, slot, session.length))
+                       for n in self.neighbors[sid] if n not in self.assigned)
+
+        def room_rank(room_id):
+            room = self.rooms[room_id]
+            return (0 if lab_first and room.type == 'LAB' else 1, room.capacity, room_id)
+
+        values = []
+        for slot in sorted(self.domains[sid], key=lambda slot: (cost(slot), slot)):
+            values.extend((slot, room_id) for room_id in sorted(self.domains[sid][slot], key=room_rank))
+        return values
+
+    def _discard(self, other, slot, room_ids, trail):
+        """Alandan (dilim, derslikler) çıkarır ve geri alma kaydına ekler"""
+        free = self.domains[other][slot]
+        removed = free & room_ids
+        if not removed:
+            return
+        free -= removed
+        self.sizes[other] -= len(removed)
+        if not free:
+            del self.domains[other][slot]
+        trail.append((other, slot, removed))
+
+    def _assign(self, sid, value, active, allow_skip):
+        """
+        Oturumu (dilim, derslik) değerine atar ve ileri kontrol yapar (value None ise atlanır)
+        :return: Geri alma kaydı veya bir oturumun alanı boşaldıysa None
+        """
+        self.assigned[sid] = value
+        trail = []
+        if value is None:
+            self.skipped += 1
+            return trail
+        slot, room_id = value
+        length = self.sessions[sid].length
+
+        for other in self.neighbors[sid]:
+            if other in self.assigned or other not in active:
+                continue
+            overlapping = self._overlapping(other, slot, length)
+            for s in overlapping:
+                self._discard(other, s, set(self.domains[other][s]), trail)
+            if overlapping and not self.domains[other] and not allow_skip:
+                self._undo(sid, trail)
+                return None
+
+        room = {room_id}
+        for other in self.room_users[room_id]:
+            if other in self.assigned or other not in active:
+                continue
+            overlapping = self._overlapping(other, slot, length)
+            for s in overlapping:
+                self._discard(other, s, room, trail)
+            if overlapping and not self.domains[other] and not allow_skip:
+                self._undo(sid, trail)
+                return None
+        return trail
+
+    def _undo(self, sid, trail):
+        value = self.assigned.pop(sid)
+        if value is None:
+            self.skipped -= 1
+            return
+        for other, slot, removed in reversed(trail):
+            self.domains[other].setdefault(slot, set()).update(removed)
+            self.sizes[other] += len(removed)
+
+    def _search(self, active, allow_skip, deadline, lower_bound=0):
+        """
+        Yinelemeli (özyinelemesiz) derinlik öncelikli arama
+        allow_skip=False: tam yerleşim arar; ağaç tükenirse tam yerleşim yoktur.
+        allow_skip=True: oturumları atlamaya izin verir ve atlanan oturum sayısını dal-sınır
+        (branch and bound) ile en aza indirir; imkansız durumlarda en iyi kısmi programı verir.
+        :return: (en iyi atama {session_id: (slot, room_id)}, arama ağacı tükendi mi)
+        """
+        self.skipped = 0
+        best, best_skipped = {}, len(active) + 1
+
+        frames = []
+        first = self._select(active)
+        if first is None:
+            return best, True
+        frames.append([first, self._values(first, allow_skip), 0, None])
+
+        while frames:
+            if self.nodes >= self.node_limit or time.monotonic() > deadline:
+                self._unwind(frames)
+                return best, False
+
+            frame = frames[-1]
+            sid, values, index, trail = frame
+            if trail is not None:
+                self._undo(sid, trail)
+                frame[3] = None
+            if index >= len(values):
+                frames.pop()
+                continue
+            frame[2] = index + 1
+
+            self.nodes += 1
+            if self.progress and self.nodes % 500 == 0:
+                self.progress('GERİ İZLEME', len(self.assigned) - self.skipped, len(self.sessions))
+            trail = self._assign(sid, values[index], active, allow_skip)
+            if trail is None:
+                continue
+            frame[3] = trail
+
+            if allow_skip:
+                # Alanı boşalan oturumlar kesin atlanacak; sınır en iyiden kötüyse dalı buda
+                doomed = sum(1 for other in active if other not in self.assigned and not self.domains[other])
+                if self.skipped + doomed >= best_skipped:
+                    continue
+
+            nxt = self._select(active)
+            if nxt is None:
+                placed = {s: v for s, v in self.assigned.items() if v is not None}
+                if len(placed) > len(best):
+                    best, best_skipped = placed, self.skipped
+                if not allow_skip or self.skipped <= lower_bound:
+                    self._unwind(frames)
+                    return best, True
+                continue
+            if not allow_skip and len(self.assigned) > len(best):
+                best = dict(self.assigned)
+            frames.append([nxt, self._values(nxt, allow_skip), 0, None])
+
+        return best, True
+
+    def _unwind(self, frames):
+        """Yarım kalan aramanın atamalarını geri alır"""
+        for sid, _, _, trail in reversed(frames):
+            if trail is not None:
+                self._undo(sid, trail)
+
+    def _values(self, sid, allow_skip):
+        values = self._order(sid)
+        if allow_skip:
+            values.append(None)
+        return values
+
+    def solve(self):
+        proof, dead, lower_bound = self.static_proof()
+        active = {sid for sid in self.sessions if sid not in dead}
+        deadline = time.monotonic() + self.time_limit
+        solution = {}
+        status = None
+
+        if not proof:
+            solution, exhausted = self._search(active, False, deadline)
+            if len(solution) == len(self.sessions):
+                status = 'complete'
+            elif exhausted:
+                status = 'infeasible'
+                proof.append(f"Arama uzayı tamamen tarandı ({self.nodes} düğüm): tüm oturumları çakışmasız "
+                             f"yerleştiren bir program yok.")
+            else:
+                status = 'limit'
+
+        if status != 'complete':
+            # Tam yerleşim yok ya da bulunamadı: en çok oturumu yerleştiren programı ara
+            status = status or 'infeasible'
+            self.node_limit = self.nodes + self.node_limit
+            deadline = max(deadline, time.monotonic() + self.time_limit / 2)
+            partial, _ = self._search(active, True, deadline, lower_bound)
+            if len(partial) > len(solution):
+                solution = partial
+
+        for sid, (slot, room_id) in solution.items():
+            self.model.place(self.sessions[sid], self.rooms[room_id], slot)
+        unplaced = [session for sid, session in self.sessions.items() if sid not in solution]
+        return SolverResult(status, unplaced, proof, self.nodes)
+
+
+def solve_backtracking(model, phases, node_limit=200000, time_limit=30.0, progress=None, **options):
+    """
+    Tam (complete) çözücü: bir yerleşim varsa tüm oturumları yerleştirir, yoksa gerekçesini
+    döndürür. Aşama sırası yalnızca eşitlik durumlarında oturum sırasını belirler.
+    """
+    sessions = phase_sessions(phases)
+
+    print("\n=== GERİ İZLEMELİ ÇÖZÜCÜ ÇALIŞIYOR ===")
+    result = BacktrackingSolver(model, sessions, node_limit, time_limit, progress).solve()
+    if progress:
+        progress('GERİ İZLEME', len(sessions) - len(result.unplaced), len(sessions))
+    print(f"Arama düğümü sayısı: {result.nodes}, durum: {result.status}")
+    for reason in result.proof:
+        print(f"GEREKÇE: {reason}")
+    return result
+
+
+# =====================================================================================
+# Yumuşak Kısıt Puanlaması
+# Sert kısıtları sağlayan bir programın kalitesi ağırlıklı ceza toplamıyla ölçülür (düşük
+# olan daha iyi). Cezalar iki türdür:
+# - Oturuma özgü: tercih edilmeyen gün, tercih edilen saatlerin dışı, büyük derslik israfı
+# - Gruba özgü (gün bazında): bölüm-yarıyıl grubunun dersleri arasındaki boş saatler,
+#   öğretim üyesinin günlük ders yükü, aynı dersin aynı güne düşen oturumları
+# Bir oturum taşındığında yalnızca oturumun kendisi ve eski/yeni günündeki grupları yeniden
+# hesaplanır (artımlı delta); yerel arama saniyede on binlerce hamle deneyebilir.
+# =====================================================================================
+
+# Ceza ağırlıkları
+SOFT_WEIGHTS = {
+    'preferred_day': 3.0,     # Tercih edilmeyen güne düşen oturum başına
+    'preferred_time': 1.0,    # Tercih edilen saat aralıkları dışında kalan ders saati başına
+    'oversize': 1.0,          # Derslik kapasitesi / ders kontenjanı oranının OVERSIZE_RATIO'yu aşan kısmı
+    'cohort_gap': 1.0,        # Bölüm-yarıyıl grubunun aynı gündeki dersleri arasındaki boş ders saati başına
+    'instructor_load': 2.0,   # Öğretim üyesinin MAX_DAILY_HOURS'u aşan günlük ders saati başına
+    'course_day': 2.0,        # Aynı dersin aynı güne düşen her ek oturumu
+}
+
+# Kontenjana göre bu orana kadar büyük derslikler ceza almaz
+OVERSIZE_RATIO = 1.5
+
+# Öğretim üyesinin ceza almadan bir günde verebileceği ders saati
+MAX_DAILY_HOURS = 4
+
+
+def day_gaps(mask):
+    """Gün içi ders saati maskesinde ilk ve son ders arasındaki boş saat sayısı"""
+    if not mask:
+        return 0
+    return mask.bit_length() - (mask & -mask).bit_length() + 1 - popcount(mask)
+
+
+class SoftScore:
+    """
+    Modeldeki yerleşimlerin ağırlıklı yumuşak kısıt cezası
+    total her zaman güncel toplamı verir; delta() bir taşımanın cezaya etkisini modeli
+    değiştirmeden hesaplar, apply() taşımayı puana işler (model ayrıca taşınmalıdır).
+    Dersin kontenjanı olarak kontenjan ile min_students'ın büyüğü kullanılır.
+    """
+
+    def __init__(self, model, weights=None, max_daily_hours=MAX_DAILY_HOURS,
+                 oversize_ratio=OVERSIZE_RATIO):
+        self.model = model
+        self.weights = dict(SOFT_WEIGHTS, **(weights or {}))
+        self.max_daily_hours = max_daily_hours
+        self.oversize_ratio = oversize_ratio
+        self.per_day = len(model.periods)
+        self.period_minutes = [(time_to_minutes(start), time_to_minutes(end)) for start, end in model.periods]
+        self.groups = defaultdict(int)  # (tür, anahtar, gün) -> gün içi ders saati maskesi veya oturum sayısı
+
+        self.total = 0.0
+        for session, classroom, slot in model.assignments.values():
+            self.total += self.local(session, classroom, slot)
+            self._toggle(session, slot, True)
+        self.total += sum(self._penalty(key, value) for key, value in self.groups.items())
+
+    def local(self, session, classroom, slot):
+        """Oturumun kendi yerleşiminden gelen ceza (tercihler ve derslik israfı)"""
+        weights = self.weights
+        day, period = divmod(slot, self.per_day)
+        penalty = 0.0
+        if session.preferred_days is not None and self.model.days[day] not in session.preferred_days:
+            penalty += weights['preferred_day']
+        if session.preferred_times:
+            outside = sum(1 for start, end in self.period_minutes[period:period + session.length]
+                          if not any(low <= start and end <= high for low, high in session.preferred_times))
+            penalty += weights['preferred_time'] * outside
+        ratio = classroom.capacity / max(session.capacity, session.min_students, 1)
+        if ratio > self.oversize_ratio:
+            penalty += weights['oversize'] * (ratio - self.oversize_ratio)
+        return penalty
+
+    def _keys(self, session, slot):
+        day = slot // self.per_day
+        keys = [('cohort', cohort, day) for cohort in session.cohorts]
+        if session.instructor_id:
+            keys.append(('instructor', session.instructor_id, day))
+        keys.append(('course', session.course_id, day))
+        return keys
+
+    def _toggle(self, session, slot, add):
+        """Oturumu grup kayıtlarına ekler veya çıkarır"""
+        bits = ((1 << session.length) - 1) << (slot % self.per_day)
+        for key in self._keys(session, slot):
+            if key[0] == 'course':
+                self.groups[key] += 1 if add else -1
+            elif add:
+                self.groups[key] |= bits
+            else:
+                self.groups[key] &= ~bits
+
+    def _penalty(self, key, value):
+        kind = key[0]
+        if kind == 'cohort':
+            return self.weights['cohort_gap'] * day_gaps(value)
+        if kind == 'instructor':
+            return self.weights['instructor_load'] * max(popcount(value) - self.max_daily_hours, 0)
+        return self.weights['course_day'] * max(value - 1, 0)
+
+    def delta(self, session, old_room, old_slot, new_room, new_slot):
+        """Oturumun (old_room, old_slot) yerleşiminden (new_room, new_slot)'a taşınmasının ceza farkı"""
+        keys = set(self._keys(session, old_slot))
+        keys.update(self._keys(session, new_slot))
+        before = sum(self._penalty(key, self.groups[key]) for key in keys)
+        self._toggle(session, old_slot, False)
+        self._toggle(session, new_slot, True)
+        after = sum(self._penalty(key, self.groups[key]) for key in keys)
+        self._toggle(session, new_slot, False)
+        self._toggle(session, old_slot, True)
+        return (after - before + self.local(session, new_room, new_slot)
+                - self.local(session, old_room, old_slot))
+
+    def apply(self, session, old_slot, new_slot, delta):
+        """delta() ile hesaplanmış bir taşımayı puana işler"""
+        self._toggle(session, old_slot, False)
+        self._toggle(session, new_slot, True)
+        self.total += delta
+
+
+def soft_penalty(model, weights=None):
+    """Programın ağırlıklı yumuşak kısıt cezası (düşük olan daha iyi, bkz. SoftScore)"""
+    return SoftScore(model, weights).total
+
+
+def improve_schedule(model, time_limit=3.0, max_moves=200000, start_temperature=2.0,
+                     end_temperature=0.02, fixed=(), weights=None, rng=random):
+    """
+    Benzetimli tavlama (simulated annealing) ile yumuşak kısıt cezasını azaltır
+    Her hamlede rastgele bir oturum rastgele bir (dilim, uygun derslik) yerleşimine taşınmak
+    istenir; sert kısıtları bozan hamleler reddedilir. Cezayı azaltan hamleler her zaman,
+    artıranlar exp(-delta / sıcaklık) olasılığıyla kabul edilir; sıcaklık geometrik olarak
+    düşer. Sonunda görülen en iyi program modele geri yüklenir.
+    :param fixed: Yerinden oynatılmayacak session_id'ler
+    :return: (başlangıç cezası, son ceza, denenen hamle sayısı)
+    """
+    score = SoftScore(model, weights)
+    movable = [sid for sid in model.assignments if sid not in fixed]
+    initial = score.total
+    if not movable:
+        return initial, initial, 0
+
+    rooms = {sid: model.suitable_rooms(model.assignments[sid][0]) for sid in movable}
+    best = score.total
+    best_state = {sid: model.assignments[sid][1:] for sid in movable}
+    temperature = start_temperature
+    cooling = (end_temperature / start_temperature) ** (1.0 / max_moves)
+    deadline = time.monotonic() + time_limit
+    moves = 0
+
+    for moves in range(1, max_moves + 1):
+        if moves % 1000 == 0 and time.monotonic() > deadline:
+            break
+        temperature *= cooling
+        sid = rng.choice(movable)
+        session, room, slot = model.assignments[sid]
+        new_slot = rng.choice(model.starts(session.length))
+        new_room = rng.choice(rooms[sid])
+        if (new_slot == slot and new_room.id == room.id) or not model.can_move(sid, new_room, new_slot):
+            continue
+
+        delta = score.delta(session, room, slot, new_room, new_slot)
+        if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+            continue
+        score.apply(session, slot, new_slot, delta)
+        model.move(sid, new_room, new_slot)
+
+        if score.total < best - 1e-9:
+            best = score.total
+            best_state = {sid: model.assignments[sid][1:] for sid in movable}
+
+    # En iyi programı geri yükle: önce değişen oturumları çıkar, sonra yerleştir
+    changed = [sid for sid in movable if model.assignments[sid][1:] != best_state[sid]]
+    sessions = {sid: model.assignments[sid][0] for sid in changed}
+    for sid in changed:
+        model.remove(sid)
+    for sid in changed:
+        classroom, slot = best_state[sid]
+        model.place(sessions[sid], classroom, slot)
+    return initial, soft_penalty(model, weights), moves
+
+
+def _multi_start_worker(state, phases, seeds, deadline):
+    """
+    Bir işlemde sırayla tohumlanmış rastgele aramalar yapar ve en iyisini döndürür
+    Model ve aşamalar düz veri olarak gelir (ScheduleModel.state, CourseInfo.fields) ve
+    işlemde yeniden kurulur; her deneme bu modelin tam kopyasıyla (sabit öğeler ve tüm bit
+    kümeleri dahil) başlar.
+    :param deadline: Yeni deneme başlatılmayacak duvar saati anı (time.time())
+    :return: (skor, tohum, [(session_id, classroom_id, slot), ...])
+    """
+    model = ScheduleModel.from_state(state)
+    phases = [(name, [CourseInfo(*fields) for fields in courses]) for name, courses in phases]
+    best = None
+    base = len(model.assignments)
+    for seed in seeds:
+        # En az bir deneme yapılır; süre dolduysa yeni deneme başlatılmaz
+        if best is not None and time.time() > deadline:
+            break
+        trial = model.copy()
+        solve_random(trial, phases, rng=random.Random(seed), verbose=False)
+
+        placed = len(trial.assignments) - base
+        score = (placed, -soft_penalty(trial))
+        if best is None or score > best[0]:
+            best = (score, seed, [(session.id, classroom.id, slot)
+                                  for session, classroom, slot in trial.assignments.values()])
+    return best
+
+
+def solve_parallel(model, phases, workers=None, restarts=8, time_limit=20.0, seed=None, progress=None,
+                   **options):
+    """
+    Çok başlangıçlı paralel arama: her çekirdekte bağımsız, tohumlanmış rastgele aramalar
+    çalıştırır; sonuçlar yerleşen oturum sayısı ve yumuşak kısıt cezasına göre
+    puanlanır, yalnızca kazanan program modele yazılır. Kazanan yerleşimler modele
+    yazılmadan önce placement_valid ile yeniden doğrulanır.
+    :param workers: İşlem sayısı (varsayılan: çekirdek sayısı)
+    :param restarts: Her işlemin deneyeceği tohum sayısı
+    :param time_limit: Toplam duvar saati sınırı (saniye); işlemler bu süreden sonra yeni
+                       deneme başlatmaz, havuz kapatılırken çalışan denemelerin bitmesi beklenir
+    """
+    workers = workers or os.cpu_count() or 1
+    base_seed = seed if seed is not None else random.randrange(1 << 30)
+    seed_groups = [[base_seed + w * restarts + i for i in range(restarts)] for w in range(workers)]
+
+    print(f"\n=== ÇOK BAŞLANGIÇLI ARAMA: {workers} işlem x {restarts} deneme ===")
+    sessions = {session.id: session for session in phase_sessions(phases)}
+    total = len(sessions)
+    if progress:
+        progress('PARALEL', 0, total)
+    # İşlemlere yalnızca düz veri gönderilir. İşlemler 'spawn' ile başlatılır: çok iş
+    # parçacıklı web sürecinden (arka plan işi) fork, başka bir iş parçacığının tuttuğu
+    # kilitleri (veritabanı bağlantısı, günlük) kopyalayıp alt işlemi kilitleyebilir.
+    state = model.state()
+    plain_phases = [(name, [course.fields() for course in courses]) for name, courses in phases]
+    deadline = time.time() + time_limit
+    results = []
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        futures = [executor.submit(_multi_start_worker, state, plain_phases, seeds, deadline)
+                   for seeds in seed_groups]
+        done, _ = wait(futures, timeout=time_limit * 1.5)
+        results = [future.result() for future in done if future.exception() is None]
+    finally:
+        # Arka planda işlem bırakılmaz: başlamamış işler iptal edilir, çalışanlar süre
+        # dolduğu için en geç mevcut denemelerini bitirip döner
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    if not results:
+        # İşlem havuzu sonuç üretemediyse aynı aramayı bu işlemde yap
+        results = [_multi_start_worker(state, plain_phases, seed_groups[0][:1], deadline)]
+
+    score, winner_seed, placements = max(results, key=lambda r: r[0])
+    print(f"Kazanan tohum: {winner_seed}, yerleşen oturum: {score[0]}, yumuşak kısıt cezası: {-score[1]:.1f}")
+
+    for session, _, _ in model.assignments.values():
+        sessions[session.id] = session
+    rooms = {room.id: room for room in model.classrooms}
+    for session_id, classroom_id, slot in placements:
+        if session_id in model.assignments or session_id not in sessions:
+            continue
+        session, room = sessions[session_id], rooms[classroom_id]
+        if model.placement_valid(session, room, slot):
+            model.place(session, room, slot)
+
+    unplaced = [session for session in sessions.values() if session.id not in model.assignments]
+    if progress:
+        progress('PARALEL', total - len(unplaced), total)
+    return SolverResult('partial' if unplaced else 'complete', unplaced)
+
+
+# Seçilebilir çözücüler (/generate_schedule formundaki solver alanı)
+SOLVERS = {
+    'random': solve_random,
+    'backtracking': solve_backtracking,
+    'parallel': solve_parallel,
+}
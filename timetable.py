@@ -0,0 +1,513 @@
+from collections import OrderedDict
+from datetime import datetime
+import threading
+
+from sqlalchemy import update, select, union_all, literal
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import (db, User, Department, Schedule, Course, Classroom, ScheduleState, ScheduleVersion,
+                    UnavailableTime, course_department, DAYS, time_to_minutes)
+
+# =====================================================================================
+# Ders Programı Görünümleri
+# Program öğeleri ilişkileriyle birlikte sabit sayıda sorguda yüklenir ve şablonların
+# doğrudan dolaşacağı düz sözlüklere (Python nesnesi, ORM'den bağımsız) dönüştürülür.
+# Şablonlarda filtreleme, sıralama veya tembel (lazy) ilişki erişimi yapılmaz.
+# =====================================================================================
+
+# Sınıf sütunları: 1. sınıf = 1-2. yarıyıllar, 2. sınıf = 3-4. yarıyıllar, ...
+GRADES = [1, 2, 3, 4]
+
+
+def grade_of(semester):
+    """Yarıyıldan sınıfı hesaplar (örn: 3. yarıyıl -> 2. sınıf)"""
+    return min(max((int(semester or 1) + 1) // 2, GRADES[0]), GRADES[-1])
+
+
+def load_schedule_items():
+    """
+    Yayındaki programın tüm öğelerini ders, dersin bölümleri, öğretim üyesi ve derslik
+    bilgileriyle birlikte yükler (öğe sayısından bağımsız olarak sabit sayıda sorgu)
+    Öğeler gün ve başlangıç saatine göre sıralı döner.
+    """
+    return Schedule.query.options(
+        joinedload(Schedule.course).selectinload(Course.departments),
+        joinedload(Schedule.course).joinedload(Course.instructor),
+        joinedload(Schedule.classroom)
+    ).filter(live_schedule()).order_by(Schedule.day_index, Schedule.start_minute, Schedule.id).all()
+
+
+def schedule_cell(item):
+    """Bir program öğesini şablonda gösterilecek düz sözlüğe çevirir"""
+    course = item.course
+    return {
+        'id': item.id,
+        'course_id': course.id,
+        'course_code': course.code,
+        'course_name': course.name,
+        'semester': course.semester,
+        'instructor_id': course.instructor_id,
+        'classroom_id': item.classroom_id,
+        'day': item.day,
+        'start_time': item.start_time,
+        'end_time': item.end_time,
+        'classroom_code': item.classroom.code,
+        'instructor_name': course.instructor.name if course.instructor else None,
+        'department_codes': [dept.code for dept in course.departments]
+    }
+
+
+def cohort_index():
+    """
+    Ders -> grup (bölüm, yarıyıl) ilişki dizinini tek sorguda oluşturur
+    Bölüm tabloları ve Excel sayfaları bölüm başına sorgu yerine bu dizinden doldurulur.
+    :return: {'departments': [{'id', 'code', 'name'}, ...] (en az bir dersi olan bölümler, kod
+              sırasına göre), 'courses': {ders_id: [(bölüm_kodu, yarıyıl), ...]}}
+    """
+    rows = db.session.execute(
+        select(course_department.c.course_id, Course.semester, Department.id, Department.code, Department.name)
+        .join(Course, Course.id == course_department.c.course_id)
+        .join(Department, Department.id == course_department.c.department_id)
+        .order_by(Department.code, course_department.c.course_id)
+    ).all()
+
+    departments = {}
+    courses = {}
+    for course_id, semester, dept_id, code, name in rows:
+        departments.setdefault(dept_id, {'id': dept_id, 'code': code, 'name': name})
+        courses.setdefault(course_id, []).append((code, semester))
+    return {'departments': list(departments.values()), 'courses': courses}
+
+
+def department_timetable(items, index, days=DAYS):
+    """
+    Program öğelerini bölüm, gün ve sınıfa göre gruplar
+    :param items: load_schedule_items() çıktısı (gün ve saate göre sıralı)
+    :param index: cohort_index() çıktısı; dersin ait olduğu her bölümün tablosuna eklenir
+    :return: {bölüm_kodu: {gün: {sınıf: [hücre, ...]}}}; her liste başlangıç saatine göre sıralıdır
+    """
+    timetable = {dept['code']: {day: {grade: [] for grade in GRADES} for day in days}
+                 for dept in index['departments']}
+    for item in items:
+        cohorts = index['courses'].get(item.course_id)
+        if not cohorts or item.day not in days:
+            continue
+        cell = schedule_cell(item)
+        for code, semester in cohorts:
+            timetable[code][item.day][grade_of(semester)].append(cell)
+    return timetable
+
+
+# Haftalık tablo satırları (09:00 - 17:00 arası saat başları)
+GRID_HOURS = list(range(9, 18))
+
+
+def cell_hours(start_time, end_time, hours=GRID_HOURS):
+    """
+    Bir program öğesinin haftalık tabloda kapladığı saat satırlarını döndürür
+    Öğe, başlangıç saatinden bitişinden önceki son saat başına kadar tüm satırlarda
+    gösterilir (örn: 09:00-11:50 -> 9, 10, 11; 13:00-15:00 -> 13, 14).
+    """
+    first = time_to_minutes(start_time) // 60
+    last = (time_to_minutes(end_time) - 1) // 60
+    return [hour for hour in hours if first <= hour <= last]
+
+
+def weekly_grid(cells, days=DAYS, hours=GRID_HOURS):
+    """
+    Hücreleri gün ve saat satırına göre tek geçişte gruplar
+    :param cells: schedule_cell() sözlükleri (gün ve saate göre sıralı)
+    :return: {gün: {saat: [hücre, ...]}}; şablon yalnızca dolaşır
+    """
+    grid = {day: {hour: [] for hour in hours} for day in days}
+    for cell in cells:
+        if cell['day'] not in grid:
+            continue
+        for hour in cell_hours(cell['start_time'], cell['end_time'], hours):
+            grid[cell['day']][hour].append(cell)
+    return grid
+
+
+def schedule_cells():
+    """Tüm program öğelerini gün ve saate göre sıralı hücre listesi olarak döndürür"""
+    return [schedule_cell(item) for item in load_schedule_items()]
+
+
+# =====================================================================================
+# Program Önbelleği
+# Oluşturulmuş program verileri (düz sözlükler) süreç içinde LRU önbellekte tutulur.
+# Anahtar (görünüm, bölüm, öğretim üyesi, dönem, program sürümü) demetidir. Sürüm
+# veritabanında tek satırda tutulur ve programı değiştiren her yazma işlemiyle aynı
+# işlemde artırılır; böylece birden fazla sunucu sürecinde de eski veri gösterilmez.
+# =====================================================================================
+
+# Önbellekte tutulacak en fazla kayıt sayısı
+TIMETABLE_CACHE_SIZE = 256
+
+
+def schedule_version():
+    """Geçerli program sürümünü döndürür (kayıt yoksa 0)"""
+    state = db.session.get(ScheduleState, 1)
+    return state.revision if state else 0
+
+
+def bump_schedule_version():
+    """
+    Program sürümünü artırır; çağıranın işlemiyle birlikte commit edilir
+    Programda görünen verileri (program öğeleri, dersler, derslikler, bölümler,
+    öğretim üyesi adları) değiştiren her yazma yolunda commit'ten önce çağrılmalıdır.
+    """
+    result = db.session.execute(
+        update(ScheduleState).where(ScheduleState.id == 1)
+        .values(revision=ScheduleState.revision + 1, updated_at=datetime.utcnow())
+    )
+    if not result.rowcount:
+        db.session.add(ScheduleState(id=1, revision=1))
+
+
+def lock_schedule_state():
+    """
+    Program durum satırını işlem sonuna kadar kilitler (SELECT ... FOR UPDATE); satır yoksa
+    oluşturur. "Kontrol et, sonra yaz" adımlarını (ör. tek etkin program oluşturma işi)
+    eşzamanlı isteklere karşı sıraya sokar.
+    """
+    state = db.session.execute(
+        select(ScheduleState).where(ScheduleState.id == 1).with_for_update()
+    ).scalar_one_or_none()
+    if state is None:
+        state = ScheduleState(id=1, revision=0)
+        db.session.add(state)
+        db.session.flush()
+    return state
+
+
+class TimetableCache:
+    """
+    Boyut sınırlı, iş parçacığı güvenli LRU önbellek
+    Eski sürüme ait kayıtlar bir daha istenmez ve en az kullanılan olarak düşer.
+    """
+
+    def __init__(self, max_entries=TIMETABLE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, builder):
+        """
+        Anahtarın değerini döndürür; yoksa builder() ile oluşturup saklar
+        :param builder: Önbellekte yoksa çağrılacak, değeri üreten fonksiyon
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        value = builder()
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+timetable_cache = TimetableCache()
+
+
+def cached_timetable(view, builder, department=None, instructor=None, term=None):
+    """
+    Görünüm verisini önbellekten döndürür, yoksa oluşturur
+    :param view: Görünüm adı (örn: 'view_schedule', 'instructor', 'cells')
+    :param builder: Veriyi oluşturan fonksiyon (yalnızca düz Python nesneleri döndürmeli)
+    """
+    key = (view, department, instructor, term, schedule_version())
+    return timetable_cache.get(key, builder)
+
+
+def cached_schedule_cells():
+    """Tüm program hücrelerini önbellekten döndürür"""
+    return cached_timetable('cells', schedule_cells)
+
+
+def course_grid(course_ids):
+    """
+    Verilen derslerin haftalık tablosunu önbellekteki hücrelerden oluşturur
+    (program sürümü değişmedikçe veritabanına gidilmez)
+    :return: ({gün: {saat: [hücre, ...]}}, [hücre, ...])
+    """
+    course_ids = set(course_ids)
+    cells = [cell for cell in cached_schedule_cells() if cell['course_id'] in course_ids]
+    return weekly_grid(cells), cells
+
+
+def unavailable_hours(start_time, end_time, hours=GRID_HOURS):
+    """
+    Bir müsait olmama kaydının işaretlediği saat satırlarını döndürür
+    Saat başı kaydın başlangıç-bitiş aralığına düşen satırlar işaretlenir
+    (örn: 13:00-15:00 -> 13, 14).
+    """
+    start = time_to_minutes(start_time)
+    end = time_to_minutes(end_time)
+    return [hour for hour in hours if start <= hour * 60 < end]
+
+
+def instructor_weeks(instructor_ids, days=DAYS, hours=GRID_HOURS):
+    """
+    Öğretim üyelerinin haftalık tablolarını (dersler ve müsait olmama) tek geçişte oluşturur
+    Ders hücreleri önbellekteki program hücrelerinden öğretim üyesine göre gruplanır;
+    müsait olmama kayıtları tek sorguda yüklenir. Şablon her hücreye doğrudan erişir.
+    :param instructor_ids: Öğretim üyesi kimlik numaraları
+    :return: {öğretim_üyesi_id: {'cells': [hücre, ...], 'grid': {gün: {saat: [hücre, ...]}},
+              'unavailable': {gün: {saat, ...}}}}
+    """
+    instructor_ids = set(instructor_ids)
+    weeks = {instructor_id: {'cells': [],
+                             'grid': {day: {hour: [] for hour in hours} for day in days},
+                             'unavailable': {day: set() for day in days}}
+             for instructor_id in instructor_ids}
+    if not weeks:
+        return weeks
+
+    for cell in cached_schedule_cells():
+        week = weeks.get(cell['instructor_id'])
+        if week is None:
+            continue
+        week['cells'].append(cell)
+        if cell['day'] not in week['grid']:
+            continue
+        for hour in cell_hours(cell['start_time'], cell['end_time'], hours):
+            week['grid'][cell['day']][hour].append(cell)
+
+    unavailable = db.session.query(
+        UnavailableTime.instructor_id, UnavailableTime.day,
+        UnavailableTime.start_time, UnavailableTime.end_time
+    ).filter(UnavailableTime.instructor_id.in_(instructor_ids))
+    for instructor_id, day, start_time, end_time in unavailable:
+        marked = weeks[instructor_id]['unavailable'].get(day)
+        if marked is not None:
+            marked.update(unavailable_hours(start_time, end_time, hours))
+    return weeks
+
+
+def instructor_week(instructor_id):
+    """Tek bir öğretim üyesinin haftalık tablosunu döndürür (bkz. instructor_weeks)"""
+    return instructor_weeks([instructor_id])[instructor_id]
+
+
+# =====================================================================================
+# Öğretim Üyesi Doluluk Haritası
+# Her öğretim üyesinin haftası gün başına bir bit maskesi olarak tutulur: maskenin
+# i. biti GRID_HOURS[i] saat satırını temsil eder. Ders ve müsait olmama kayıtları tek
+# birleşik (UNION ALL) sorguyla okunur; sonuç program sürümüyle önbelleğe alınır.
+# Müsait olmama kayıtlarını değiştiren yazma yolları da program sürümünü artırır.
+# "Çarşamba 13:00'te kim boş?" sorusu öğretim üyesi başına tek bit kontrolüdür.
+# =====================================================================================
+
+# Doluluk türleri (maske sözlüğündeki anahtarlar)
+TEACHING = 'teaching'
+UNAVAILABLE = 'unavailable'
+
+
+def slot_mask(start_minute, end_minute, hours=GRID_HOURS):
+    """
+    Bir zaman aralığının kapladığı saat satırlarını bit maskesine çevirir
+    Aralık bir saat satırıyla kısmen de olsa örtüşüyorsa o satırın biti işaretlenir.
+    """
+    mask = 0
+    for slot, hour in enumerate(hours):
+        if start_minute < (hour + 1) * 60 and end_minute > hour * 60:
+            mask |= 1 << slot
+    return mask
+
+
+def hour_slot(hour, hours=GRID_HOURS):
+    """Saat satırının maskedeki bit sırasını döndürür (tabloda yoksa None)"""
+    return hours.index(hour) if hour in hours else None
+
+
+def instructor_occupancy():
+    """
+    Tüm öğretim üyelerinin haftalık doluluk maskelerini oluşturur
+    Ders ve müsait olmama aralıkları tek birleşik sorguda okunur.
+    :return: {'instructors': [{'id', 'name', 'department_code', 'teaching': [maske, ...],
+              'unavailable': [maske, ...], 'busy': [maske, ...], 'teaching_hours', 'slots'}, ...]}
+              Maske listeleri DAYS sırasındadır; 'slots' şablonlar için [gün][saat] durum tablosudur.
+    """
+    instructors = db.session.query(User.id, User.name, Department.code) \
+        .outerjoin(Department, User.department_id == Department.id) \
+        .filter(User.role == 'instructor').order_by(User.name, User.id).all()
+    rows = {instructor_id: {'id': instructor_id, 'name': name, 'department_code': code,
+                            TEACHING: [0] * len(DAYS), UNAVAILABLE: [0] * len(DAYS),
+                            'busy': [0] * len(DAYS), 'teaching_hours': 0}
+            for instructor_id, name, code in instructors}
+
+    teaching = select(
+        Course.instructor_id, Schedule.day_index, Schedule.start_minute, Schedule.end_minute,
+        literal(TEACHING).label('kind')
+    ).join(Course, Schedule.course_id == Course.id).where(Course.instructor_id.isnot(None), live_schedule())
+    unavailable = select(
+        UnavailableTime.instructor_id, UnavailableTime.day_index, UnavailableTime.start_minute,
+        UnavailableTime.end_minute, literal(UNAVAILABLE).label('kind')
+    )
+    for instructor_id, day_index, start_minute, end_minute, kind in db.session.execute(union_all(teaching, unavailable)):
+        row = rows.get(instructor_id)
+        if row is None or day_index is None or not 0 <= day_index < len(DAYS):
+            continue
+        mask = slot_mask(start_minute, end_minute)
+        row[kind][day_index] |= mask
+        row['busy'][day_index] |= mask
+        if kind == TEACHING:
+            row['teaching_hours'] += end_minute - start_minute
+
+    # Şablonların bit işlemi yapmadan dolaşacağı gün x saat durum tablosu
+    for row in rows.values():
+        row['teaching_hours'] = round(row['teaching_hours'] / 60, 2)
+        row['slots'] = [[slot_state(row, day_index, slot) for slot in range(len(GRID_HOURS))]
+                        for day_index in range(len(DAYS))]
+    return {'instructors': list(rows.values())}
+
+
+def slot_state(row, day_index, slot):
+    """Saat satırının durumunu döndürür: TEACHING, UNAVAILABLE veya None (boş)"""
+    if row[TEACHING][day_index] >> slot & 1:
+        return TEACHING
+    if row[UNAVAILABLE][day_index] >> slot & 1:
+        return UNAVAILABLE
+    return None
+
+
+def cached_instructor_occupancy():
+    """Öğretim üyesi doluluk maskelerini önbellekten döndürür"""
+    return cached_timetable('occupancy', instructor_occupancy)
+
+
+def is_free(row, day_index, slot):
+    """Öğretim üyesi verilen gün ve saat satırında boş mu (sabit zamanlı bit kontrolü)"""
+    return not row['busy'][day_index] >> slot & 1
+
+
+def free_instructors(occupancy, day, hour):
+    """
+    Verilen gün ve saatte dersi veya müsait olmama kaydı bulunmayan öğretim üyelerini döndürür
+    :param day: Gün adı (örn: 'Çarşamba')
+    :param hour: Saat satırı (örn: 13)
+    :return: Doluluk satırları listesi; gün veya saat tabloda yoksa boş liste
+    """
+    if day not in DAYS or hour_slot(hour) is None:
+        return []
+    day_index, slot = DAYS.index(day), hour_slot(hour)
+    return [row for row in occupancy['instructors'] if is_free(row, day_index, slot)]
+
+
+# =====================================================================================
+# Program Sürümleri
+# Program öğeleri bir sürüme (schedule_versions) aittir; yalnızca etkin sürümün öğeleri
+# yayındadır. Otomatik program oluşturma yeni bir taslak sürüme yazar; yayınlama ve geri
+# alma yalnızca ScheduleState.active_version_id işaretçisini değiştirir. Böylece okuyucular
+# hiçbir zaman yarım bir program görmez ve önceki sürüm anında geri alınabilir.
+# Yayındaki programı okuyan/değiştiren her sorgu live_schedule() koşulunu kullanmalıdır.
+# =====================================================================================
+
+def active_version_id():
+    """Yayındaki program sürümünün ID'si (henüz sürüm yayınlanmadıysa None)"""
+    state = db.session.get(ScheduleState, 1)
+    return state.active_version_id if state else None
+
+
+def version_filter(version_id):
+    """Verilen sürümün program öğelerini seçen koşul (None: sürüme bağlı olmayan öğeler)"""
+    if version_id is None:
+        return Schedule.version_id.is_(None)
+    return Schedule.version_id == version_id
+
+
+def live_schedule():
+    """Yayındaki programın öğelerini seçen koşul"""
+    return version_filter(active_version_id())
+
+
+def publish_version(version_id):
+    """
+    Sürümü yayınlar (taslak yayınlama veya eski sürüme geri alma); çağıranın işlemiyle
+    birlikte commit edilir. Yalnızca etkin sürüm işaretçisi değişir, program öğelerine
+    dokunulmaz. Önceki sürüm 'archived' olarak geri alma için saklanır.
+    """
+    previous = active_version_id()
+    if previous is not None and previous != version_id:
+        db.session.execute(update(ScheduleVersion).where(ScheduleVersion.id == previous)
+                           .values(status='archived'))
+    db.session.execute(update(ScheduleVersion).where(ScheduleVersion.id == version_id)
+                       .values(status='published', published_at=datetime.utcnow()))
+    result = db.session.execute(update(ScheduleState).where(ScheduleState.id == 1)
+                                .values(active_version_id=version_id))
+    if not result.rowcount:
+        db.session.add(ScheduleState(id=1, revision=0, active_version_id=version_id))
+    bump_schedule_version()
+
+
+def version_courses(version_id):
+    """
+    Bir sürümün derslerini ve yerleşimlerini tek sorguda yükler
+    :return: {ders_id: {'code', 'name', 'slots': ((gün_sırası, başlangıç, gün, başlangıç_saati,
+              bitiş_saati, derslik_kodu), ...)}}; slots sıralıdır
+    """
+    rows = db.session.query(
+        Schedule.course_id, Course.code, Course.name, Schedule.day_index, Schedule.start_minute,
+        Schedule.day, Schedule.start_time, Schedule.end_time, Classroom.code
+    ).join(Course, Course.id == Schedule.course_id) \
+     .join(Classroom, Classroom.id == Schedule.classroom_id) \
+     .filter(version_filter(version_id))
+
+    courses = {}
+    for course_id, code, name, *slot in rows:
+        course = courses.setdefault(course_id, {'code': code, 'name': name, 'slots': []})
+        course['slots'].append(tuple(slot))
+    for course in courses.values():
+        course['slots'] = tuple(sorted(course['slots'], key=lambda slot: (slot[0] if slot[0] is not None else -1,
+                                                                     slot[1] or 0, slot[5])))
+    return courses
+
+
+def slot_text(slot):
+    """Yerleşimi metne çevirir (örn: 'Pazartesi 09:00-11:50 (D101)')"""
+    return f"{slot[2]} {slot[3]}-{slot[4]} ({slot[5]})"
+
+
+def schedule_diff(version_id, base_version_id):
+    """
+    Bir sürümü başka bir sürümle (genellikle yayındaki sürüm) karşılaştırır
+    :return: {'added': [...], 'removed': [...], 'moved': [...], 'unchanged': sayı}; listelerdeki
+             her öğe {'code', 'name', 'before': [metin], 'after': [metin]} sözlüğüdür
+    """
+    new = version_courses(version_id)
+    base = version_courses(base_version_id) if base_version_id != version_id else new
+
+    def entry(before, after):
+        course = after or before
+        return {'code': course['code'], 'name': course['name'],
+                'before': [slot_text(slot) for slot in before['slots']] if before else [],
+                'after': [slot_text(slot) for slot in after['slots']] if after else []}
+
+    diff = {'added': [], 'removed': [], 'moved': [], 'unchanged': 0}
+    for course_id, course in new.items():
+        previous = base.get(course_id)
+        if previous is None:
+            diff['added'].append(entry(None, course))
+        elif previous['slots'] != course['slots']:
+            diff['moved'].append(entry(previous, course))
+        else:
+            diff['unchanged'] += 1
+    for course_id, course in base.items():
+        if course_id not in new:
+            diff['removed'].append(entry(course, None))
+    for key in ('added', 'removed', 'moved'):
+        diff[key].sort(key=lambda item: item['code'])
+    return diff